@@ -0,0 +1,100 @@
+import hashlib
+import logging
+import threading
+
+from portfolio_template import SNAPSHOT_PATH, STATIC_FILES, package_json, resume_snapshot
+
+
+def bundle_file(path, content):
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    return {
+        'file': path,
+        'data': data,
+        'sha': hashlib.sha1(data).hexdigest(),
+        'size': len(data),
+    }
+
+
+# The static part of the template is encoded and hashed once per process
+STATIC_BUNDLE = [bundle_file(path, content) for path, content in STATIC_FILES.items()]
+
+
+def snapshot_file(resume_info):
+    return bundle_file(SNAPSHOT_PATH, resume_snapshot(resume_info))
+
+
+def user_bundle(project_name, resume_info=None):
+    """Files for a user's deployment. Only the snapshot changes when the
+    resume does, so a redeploy uploads that one file."""
+    return STATIC_BUNDLE + [
+        bundle_file('package.json', package_json(project_name)),
+        snapshot_file(resume_info),
+    ]
+
+
+def deployment_files(files):
+    return [{'file': f['file'], 'sha': f['sha'], 'size': f['size']} for f in files]
+
+
+class FileUploader:
+    """Uploads bundle files to /v2/files, skipping SHAs this process has
+    already uploaded."""
+
+    def __init__(self):
+        self.known = set()
+        self._lock = threading.Lock()
+
+    def upload(self, vercel, files):
+        """Upload unknown files; returns the failed response, or None."""
+        for f in files:
+            with self._lock:
+                if f['sha'] in self.known:
+                    continue
+            # Files are stored by SHA, so sending one twice is harmless
+            response = vercel.post('/v2/files', data=f['data'], idempotent=True, headers={
+                'Content-Type': 'application/octet-stream',
+                'x-vercel-digest': f['sha'],
+            })
+            if response.status_code not in (200, 201):
+                logging.error(f"Uploading {f['file']} failed: {response.status_code} - {response.text}")
+                return response
+            with self._lock:
+                self.known.add(f['sha'])
+        return None
+
+    def forget(self, shas):
+        with self._lock:
+            self.known.difference_update(shas)
+
+
+def missing_files(response):
+    if response.status_code != 400:
+        return None
+    try:
+        error = response.json().get('error') or {}
+    except ValueError:
+        return None
+    if error.get('code') == 'missing_files':
+        return error.get('missing') or []
+    return None
+
+
+def deploy(vercel, uploader, deployment_data, files):
+    """Create a deployment that references `files` by SHA. If Vercel no
+    longer has some of them (e.g. after a cold start reused stale SHAs),
+    they are uploaded again and the deployment retried once."""
+    failed = uploader.upload(vercel, files)
+    if failed is not None:
+        return failed
+
+    body = dict(deployment_data, files=deployment_files(files))
+    response = vercel.post('/v13/deployments', json=body)
+
+    missing = missing_files(response)
+    if missing is not None:
+        uploader.forget(missing)
+        failed = uploader.upload(vercel, files)
+        if failed is not None:
+            return failed
+        response = vercel.post('/v13/deployments', json=body)
+    return response
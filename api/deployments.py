@@ -0,0 +1,189 @@
+import logging
+import threading
+import time
+
+# Vercel readyState -> our state
+STATES = {
+    'QUEUED': 'queued',
+    'INITIALIZING': 'building',
+    'BUILDING': 'building',
+    'READY': 'ready',
+    'ERROR': 'error',
+    'CANCELED': 'error',
+}
+FINISHED = {'ready', 'error'}
+
+# Finished deployments stay queryable this long
+FINISHED_TTL = 3600
+# Polling the list endpoint once is cheaper than this many single lookups
+LIST_THRESHOLD = 2
+LIST_LIMIT = 100
+
+
+class DeploymentTracker:
+    """Follows deployments from queued to ready/error on one background
+    thread. Each deployment is polled with its own adaptive interval that
+    grows while its state is unchanged and resets when it moves. A poll
+    also picks up deployments due within `coalesce_window` seconds, and
+    several due together are fetched with a single list call, so polling
+    cost doesn't grow with the number of users deploying."""
+
+    def __init__(self, get_client, on_ready=None, initial_interval=1.0, max_interval=15.0,
+                 factor=1.5, timeout=900, coalesce_window=None):
+        self.get_client = get_client
+        self.on_ready = on_ready
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.timeout = timeout
+        self.coalesce_window = initial_interval if coalesce_window is None else coalesce_window
+        self.polls = 0
+        self._deployments = {}
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def track(self, deployment, username=None):
+        """Start following a deployment (a Vercel deployment object)."""
+        deployment_id = deployment.get('id') or deployment.get('uid')
+        now = time.time()
+        with self._cond:
+            if deployment_id in self._deployments:
+                return self._public(self._deployments[deployment_id])
+            entry = {
+                'id': deployment_id,
+                'username': username,
+                'url': deployment.get('url'),
+                'state': STATES.get(deployment.get('readyState') or deployment.get('state'), 'queued'),
+                'error': None,
+                'created_at': now,
+                'updated_at': now,
+                'polls': 0,
+                '_created_ms': deployment.get('createdAt') or int(now * 1000),
+                '_interval': self.initial_interval,
+                '_next_poll': now + self.initial_interval,
+            }
+            self._deployments[deployment_id] = entry
+            self._prune(now)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+            status = self._public(entry)
+        if status['state'] == 'ready':
+            self._finish(status)
+        return status
+
+    def get(self, deployment_id):
+        with self._cond:
+            entry = self._deployments.get(deployment_id)
+            return self._public(entry) if entry else None
+
+    def wait(self, deployment_id, timeout=None):
+        """Block until the deployment is finished; returns its status."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while True:
+                entry = self._deployments.get(deployment_id)
+                if entry is None or entry['state'] in FINISHED:
+                    return self._public(entry) if entry else None
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return self._public(entry)
+                self._cond.wait(remaining)
+
+    def _public(self, entry):
+        return {key: value for key, value in entry.items() if not key.startswith('_')}
+
+    def _prune(self, now):
+        for deployment_id in [k for k, entry in self._deployments.items()
+                              if entry['state'] in FINISHED and entry['updated_at'] < now - FINISHED_TTL]:
+            del self._deployments[deployment_id]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    pending = [e for e in self._deployments.values() if e['state'] not in FINISHED]
+                    if not pending:
+                        self._cond.wait()
+                        continue
+                    now = time.time()
+                    if min(e['_next_poll'] for e in pending) <= now:
+                        due = [e['id'] for e in pending if e['_next_poll'] <= now + self.coalesce_window]
+                        break
+                    self._cond.wait(min(e['_next_poll'] for e in pending) - now)
+                since = min(self._deployments[d]['_created_ms'] for d in due)
+            try:
+                self._poll(due, since)
+            except Exception:
+                logging.exception("Polling deployment status failed")
+                with self._cond:
+                    for deployment_id in due:
+                        self._backoff(self._deployments[deployment_id], changed=False)
+
+    def _poll(self, due, since):
+        client = self.get_client()
+        found = {}
+        if len(due) >= LIST_THRESHOLD:
+            self.polls += 1
+            response = client.get('/v6/deployments', params={'since': since - 1, 'limit': LIST_LIMIT})
+            if response.status_code == 200:
+                wanted = set(due)
+                for deployment in response.json().get('deployments', []):
+                    deployment_id = deployment.get('uid') or deployment.get('id')
+                    if deployment_id in wanted:
+                        found[deployment_id] = deployment
+        for deployment_id in due:
+            if deployment_id in found:
+                continue
+            self.polls += 1
+            response = client.get(f'/v13/deployments/{deployment_id}')
+            if response.status_code == 200:
+                found[deployment_id] = response.json()
+            elif response.status_code == 404:
+                found[deployment_id] = {'readyState': 'ERROR', 'errorMessage': 'Deployment not found'}
+
+        with self._cond:
+            ready = []
+            for deployment_id in due:
+                entry = self._deployments[deployment_id]
+                self._update(entry, found.get(deployment_id))
+                if entry['state'] == 'ready':
+                    ready.append(self._public(entry))
+            self._cond.notify_all()
+        for status in ready:
+            self._finish(status)
+
+    def _update(self, entry, deployment):
+        now = time.time()
+        entry['polls'] += 1
+        if deployment is None:
+            self._backoff(entry, changed=False)
+            return
+        state = STATES.get(deployment.get('readyState') or deployment.get('state'), entry['state'])
+        changed = state != entry['state']
+        entry['state'] = state
+        entry['url'] = deployment.get('url') or entry['url']
+        if changed:
+            entry['updated_at'] = now
+        if state == 'error':
+            entry['error'] = deployment.get('errorMessage') or deployment.get('errorCode') or 'Deployment failed'
+        elif state != 'ready':
+            if now - entry['created_at'] > self.timeout:
+                entry['state'] = 'error'
+                entry['error'] = f"Deployment not ready after {self.timeout}s"
+                entry['updated_at'] = now
+            else:
+                self._backoff(entry, changed)
+
+    def _backoff(self, entry, changed):
+        entry['_interval'] = self.initial_interval if changed else min(
+            self.max_interval, entry['_interval'] * self.factor)
+        entry['_next_poll'] = time.time() + entry['_interval']
+
+    def _finish(self, status):
+        if self.on_ready and status['url']:
+            try:
+                self.on_ready(status)
+            except Exception:
+                logging.exception(f"on_ready for deployment {status['id']} failed")
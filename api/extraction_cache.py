@@ -0,0 +1,106 @@
+import copy
+import hashlib
+import logging
+import os
+import re
+import time
+
+from lru import TTLCache
+
+CACHE_COLLECTION = 'extraction_cache'
+
+
+HASH_CHUNK = 64 * 1024
+
+
+def pdf_key(pdf_file, model, prompt_version):
+    """Key for the PDF's bytes, given as bytes or a seekable file (hashed in
+    chunks so it isn't read into memory)."""
+    digest = hashlib.sha256()
+    if isinstance(pdf_file, (bytes, bytearray)):
+        digest.update(pdf_file)
+    else:
+        pdf_file.seek(0)
+        for chunk in iter(lambda: pdf_file.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+        pdf_file.seek(0)
+    return f"pdf:{model}:{prompt_version}:{digest.hexdigest()}"
+
+
+def normalize_text(text):
+    return re.sub(r'\s+', ' ', text or '').strip()
+
+
+def text_key(text, model, prompt_version):
+    digest = hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+    return f"text:{model}:{prompt_version}:{digest}"
+
+
+class FirestoreCacheStore:
+    """Persistent tier backed by a Firestore collection, one document per key."""
+
+    def __init__(self, get_db, collection=CACHE_COLLECTION, ttl=30 * 24 * 3600):
+        self._get_db = get_db
+        self.collection = collection
+        self.ttl = ttl
+
+    def _doc(self, key):
+        # Firestore document ids cannot contain '/'
+        return self._get_db().collection(self.collection).document(key.replace('/', '_'))
+
+    def get(self, key):
+        data = self._doc(key).get().to_dict()
+        if not data:
+            return None
+        if self.ttl and data.get('createdAt', 0) + self.ttl < time.time():
+            return None
+        return data.get('value')
+
+    def set(self, key, value):
+        self._doc(key).set({'value': value, 'createdAt': time.time()})
+
+
+class ExtractionCache:
+    """Two-tier cache of extraction results: a local LRU in front of an
+    optional persistent store. Values are copied in and out so callers can
+    mutate what they get back."""
+
+    def __init__(self, store=None, maxsize=512, ttl=6 * 3600):
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.store = store
+
+    def get(self, key):
+        """Return (value, tier) where tier is 'memory', 'store' or None on a miss."""
+        value = self.local.get(key)
+        if value is not None:
+            return copy.deepcopy(value), 'memory'
+        if self.store is None:
+            return None, None
+        try:
+            value = self.store.get(key)
+        except Exception as e:
+            logging.warning(f"Extraction cache store read failed: {str(e)}")
+            return None, None
+        if value is None:
+            return None, None
+        self.local.set(key, value)
+        return copy.deepcopy(value), 'store'
+
+    def set(self, key, value):
+        value = copy.deepcopy(value)
+        self.local.set(key, value)
+        if self.store is not None:
+            try:
+                self.store.set(key, value)
+            except Exception as e:
+                logging.warning(f"Extraction cache store write failed: {str(e)}")
+
+
+def create_extraction_cache(get_db):
+    backend = os.environ.get('EXTRACTION_CACHE_STORE', 'firestore')
+    store = FirestoreCacheStore(get_db) if backend == 'firestore' else None
+    return ExtractionCache(
+        store=store,
+        maxsize=int(os.environ.get('EXTRACTION_CACHE_SIZE', 512)),
+        ttl=int(os.environ.get('EXTRACTION_CACHE_TTL', 6 * 3600)),
+    )
@@ -1,49 +1,165 @@
 import uuid
-import requests
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, stream_with_context
 from flask_cors import CORS
-from openai import OpenAI
 from dotenv import load_dotenv
 import os
 import logging
-import firebase_admin
-from firebase_admin import credentials, firestore
-from PyPDF2 import PdfReader
 from io import BytesIO
-import re
-import uuid
 import json
-import requests
-from requests.exceptions import RequestException
+import hashlib
+import math
+import sys
+import time
+import queue
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from deploy_bundle import deploy, snapshot_file, user_bundle
+from deployments import DeploymentTracker
+from extraction_cache import create_extraction_cache, pdf_key, text_key
+from jobs import JobQueue, create_job_backend
+from json_recovery import (canonical_field, canonicalize_keys, find_json_object, normalize_resume_field,
+                           normalize_resume_schema, parse_sections)
+from lazy import memoized
+from limits import AdmissionController, Overloaded, create_limit_store
+from llm_backends import ChatBackend, HedgedRouter
+from lru import TTLCache
+import metrics
+from metrics import ADMISSION_REJECTIONS, LLM_HEDGES, LLM_REASKS, LLM_SECONDS, LLM_TOKENS, PDF_PAGES, TIME_TO_FIRST_FIELD, UPLOAD_BYTES, timed
+from origins import OriginAllowList
+from pdf_upload import UploadRejected, inspect_upload, open_pdf
+from prompt_builder import (build_fields_prompt, build_prompt, build_reask_prompt, chunk_text,
+                            count_tokens, merge_resume_info, messages_for, normalize_resume_text,
+                            trim_to_budget)
+from resume_schema import FIELD_SCHEMAS, coerce_resume, validate_resume
+from resume_store import create_resume_store
+from resume_sections import HEADER, affected_fields, changed_sections, sections_text, split_sections
+from resume_view import (DOCUMENT_FIELDS, MIN_COMPRESS_BYTES, compact_resume, compress, field_paths,
+                         negotiate_encoding, parse_fields)
+from singleflight import SingleFlight
+from skill_index import SkillIndex, create_snapshot_store, normalize_term
+from streaming_json import TopLevelFieldParser
 
 # Add these environment variables
 VERCEL_API_TOKEN = os.environ.get('vtoken')
 VERCEL_TEAM_ID = os.environ.get('VERCEL_TEAM_ID')
 
 app = Flask(__name__)
+# Per-stage Server-Timing headers and the histograms behind /metrics
+metrics.init_app(app)
 
 
-# Apply CORS globally (initial list)
-cors = CORS(app, resources={r"/*": {"origins": ["*"]}})
+# Apply CORS globally (initial list). With CORS_ORIGINS set to a comma
+# separated list, deployed portfolios are allowed as they become ready.
+CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*')
+cors = CORS(app, resources={r"/*": {"origins": CORS_ORIGINS.split(',')}})
 
 
-# OpenAI setup
-client = OpenAI(
-    api_key=os.environ.get("OPENAI"),
-)
+# OpenAI, Firebase and the Vercel API client are created on first use so
+# cold starts for routes that never touch them don't pay for the imports
+@memoized
+def get_openai_client():
+    from openai import OpenAI
+
+    client = OpenAI(
+        api_key=os.environ.get("OPENAI"),
+    )
+    print("openai client creted")
+    return client
+
+
+@memoized
+def get_fallback_client():
+    # Any OpenAI-compatible endpoint (another provider, region or proxy)
+    from openai import OpenAI
+
+    return OpenAI(
+        api_key=os.environ.get('LLM_FALLBACK_API_KEY') or os.environ.get("OPENAI"),
+        base_url=os.environ.get('LLM_FALLBACK_BASE_URL'),
+    )
+
+
+@memoized
+def get_db():
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    cred_dict = json.loads(os.environ['FIREBASE_CONFIG'])
+    cred = credentials.Certificate(cred_dict)
+    firebase_admin.initialize_app(cred)
+    db = firestore.client()
+    print("firebase client created")
+    return db
+
+
+@memoized
+def get_vercel_client():
+    from vercel_client import VERCEL_API_URL, VercelClient
+
+    return VercelClient(
+        VERCEL_API_TOKEN,
+        team_id=VERCEL_TEAM_ID,
+        base_url=os.environ.get('VERCEL_API_URL', VERCEL_API_URL),
+        connect_timeout=float(os.environ.get('VERCEL_CONNECT_TIMEOUT', 3.05)),
+        read_timeout=float(os.environ.get('VERCEL_READ_TIMEOUT', 30)),
+        max_retries=int(os.environ.get('VERCEL_MAX_RETRIES', 4)),
+        retry_after_max=float(os.environ.get('VERCEL_RETRY_AFTER_MAX', 60)),
+        deadline=float(os.environ.get('VERCEL_RETRY_DEADLINE', 90)),
+    )
 
-GITHUB_REPO = "https://github.com/alok1929/resume-template"
 
+@memoized
+def get_file_uploader():
+    from deploy_bundle import FileUploader
 
-print("openai client creted")
+    return FileUploader()
 
-# Firebase setup
-cred_dict = json.loads(os.environ['FIREBASE_CONFIG'])
-cred = credentials.Certificate(cred_dict)
-firebase_admin.initialize_app(cred)
-db = firestore.client()
 
-print("firebase client created")
+allowed_origins = OriginAllowList(get_db, ttl=int(os.environ.get('CORS_ALLOWLIST_TTL', 60)))
+
+
+def add_allowed_origin(origin):
+    allowed_origins.add(origin)
+    logging.info(f"Allowed CORS origin {origin}")
+
+
+@app.after_request
+def allow_registered_origin(response):
+    origin = request.headers.get('Origin')
+    if (origin and CORS_ORIGINS != '*' and 'Access-Control-Allow-Origin' not in response.headers
+            and allowed_origins.allows(origin)):
+        response.headers['Access-Control-Allow-Origin'] = origin
+        response.vary.add('Origin')
+    return response
+
+
+GITHUB_REPO = "https://github.com/alok1929/resume-template"
+
+OPENAI_MODEL = "gpt-3.5-turbo"
+# Bump whenever the extraction prompt changes so cached results are not reused
+PROMPT_VERSION = "5"
+
+extraction_cache = create_extraction_cache(get_db)
+
+# users/<username> documents: Firestore, a local SQLite file, or SQLite
+# flushed to Firestore in the background (RESUME_STORE)
+resume_store = create_resume_store(get_db)
+
+# Skills, project technologies and roles -> users, for /api/search. Built
+# from the shared snapshot (or a scan of the store) on the first search
+# and kept current by this instance's uploads, which every save merges
+# into the snapshot. Other instances' saves are merged in every
+# SKILL_INDEX_REFRESH seconds, and an index whose scan is older than
+# SKILL_INDEX_MAX_AGE is rebuilt to pick up uploads no instance saved
+skill_index = SkillIndex(
+    snapshot=create_snapshot_store(get_db),
+    max_age=int(os.environ.get('SKILL_INDEX_MAX_AGE', 3600)),
+    refresh=float(os.environ.get('SKILL_INDEX_REFRESH', 300)),
+    save_delay=float(os.environ.get('SKILL_INDEX_SAVE_DELAY', 30)),
+)
 
 
 @app.route('/', methods=['GET'])
@@ -51,177 +167,599 @@ def home():
     return jsonify({"message": "Welcome to the Flask API"}), 200
 
 
-def extract_text_from_pdf(pdf_file):
-    reader = PdfReader(pdf_file)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text()
-    return text
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return app.response_class(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 
-def parse_openai_response(response_text):
-    try:
-        return json.loads(response_text)
-    except json.JSONDecodeError:
-        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-        if json_match:
-            try:
-                return json.loads(json_match.group())
-            except json.JSONDecodeError:
-                pass
-
-    extracted_info = {
-        "Name": "",
-        "Email": "",
-        "GitHub": "",
-        "LinkedIn": "",
-        "Education": [],
-        "Professional Experience": [],
-        "Projects": [],
-        "Questions and Answers": [],
-        "Skills": [],
-    }
+def extract_text_from_pdf(pdf_file):
+    # PyPDF2 is only imported by the routes that parse PDFs
+    from pdf_text import extract_pdf_pages, join_page_texts
 
-    def standardize_project(project):
-        if isinstance(project, str):
-            return {
-                "Name": project,
-                "Description": "",
-                "Technologies": []
-            }
-        elif isinstance(project, dict):
-            return {
-                "Name": project.get("Name", ""),
-                "Description": project.get("Description", ""),
-                "Technologies": project.get("Technologies", [])
-            }
-        return {
-            "Name": "",
-            "Description": "",
-            "Technologies": []
-        }
+    # Uploads over MAX_UPLOAD_PAGES are rejected, so every accepted page is read
+    pages = extract_pdf_pages(pdf_file, max_pages=MAX_UPLOAD_PAGES)
+    PDF_PAGES.observe(len(pages))
+    return join_page_texts(pages)
 
-    current_section = None
-    for line in response_text.split('\n'):
-        line = line.strip()
-        if line in extracted_info:
-            current_section = line
-        elif current_section and line:
-            if current_section == "Projects":
-                extracted_info[current_section].append(
-                    standardize_project(line))
-            elif isinstance(extracted_info[current_section], list):
-                extracted_info[current_section].append(line)
-            else:
-                extracted_info[current_section] = line
 
-    # Ensure all projects are properly structured
-    extracted_info["Projects"] = [standardize_project(
-        p) for p in extracted_info["Projects"]]
+def parse_openai_response(response_text):
+    # The first JSON object in the completion, repaired if it was cut off
+    # or has trailing commas; otherwise fall back to scanning for headings
+    data = find_json_object(response_text)
+    if data is None:
+        data = parse_sections(response_text)
+    return normalize_resume_schema(data)
+
+
+# Input tokens above which a resume is split into chunks that are
+# extracted in parallel and merged (map-reduce)
+PROMPT_TOKEN_BUDGET = int(os.environ.get('PROMPT_TOKEN_BUDGET', 6000))
+MAP_CHUNK_TOKENS = int(os.environ.get('MAP_CHUNK_TOKENS', 3000))
+MAP_MAX_CHUNKS = int(os.environ.get('MAP_MAX_CHUNKS', 6))
+COMPLETION_MAX_TOKENS = 1000
+# Fields that fail validation are asked for again on their own, at most
+# this many times, with a completion budget per field
+REASK_MAX_ATTEMPTS = int(os.environ.get('REASK_MAX_ATTEMPTS', 1))
+REASK_TOKENS_PER_FIELD = 400
+# OpenAI JSON mode constrains completions to a single JSON object
+OPENAI_JSON_MODE = os.environ.get('OPENAI_JSON_MODE', '').lower() in ('1', 'true', 'yes')
+
+
+def estimate_llm_tokens(chunks):
+    # Every prompt that will be sent, plus its completion
+    parts = len(chunks)
+    return sum(count_tokens(build_prompt(chunk, *((i + 1, parts) if parts > 1 else ())), OPENAI_MODEL)
+               + COMPLETION_MAX_TOKENS for i, chunk in enumerate(chunks))
+
+
+def completion_options():
+    if OPENAI_JSON_MODE:
+        return {'response_format': {'type': 'json_object'}}
+    return {}
+
+
+def llm_backends():
+    backends = [ChatBackend('openai', get_openai_client, OPENAI_MODEL)]
+    fallback_model = os.environ.get('LLM_FALLBACK_MODEL')
+    if os.environ.get('LLM_FALLBACK_BASE_URL'):
+        backends.append(ChatBackend('fallback', get_fallback_client, fallback_model or OPENAI_MODEL))
+    elif fallback_model:
+        backends.append(ChatBackend('fallback', get_openai_client, fallback_model))
+    return backends
+
+
+def admit_extra_llm_attempt(backend, messages, options):
+    # Hedges and retries are extra spend on top of what the upload was
+    # admitted for; they go out only while the token budget covers them
+    tokens = sum(count_tokens(m['content'], OPENAI_MODEL) for m in messages)
+    if admission.charge_tokens(tokens + options.get('max_tokens', COMPLETION_MAX_TOKENS)):
+        return True
+    logging.info(f"Skipping extra LLM attempt to {backend.name}: token budget exhausted")
+    return False
+
+
+LLM_BACKENDS = llm_backends()
+# Completions slower than the backend's usual p95 get a second attempt,
+# charged to the token budget; on by default only with a fallback backend
+# to send it to. Every call has a deadline
+llm_router = HedgedRouter(
+    LLM_BACKENDS,
+    hedge=os.environ.get('LLM_HEDGE', '1' if len(LLM_BACKENDS) > 1 else '0').lower() in ('1', 'true', 'yes'),
+    default_delay=float(os.environ.get('LLM_HEDGE_DELAY', 8)),
+    min_delay=float(os.environ.get('LLM_HEDGE_MIN_DELAY', 0.5)),
+    max_delay=float(os.environ.get('LLM_HEDGE_MAX_DELAY', 20)),
+    deadline=float(os.environ.get('LLM_DEADLINE', 60)),
+    on_result=lambda backend, seconds, outcome: LLM_SECONDS.observe(seconds, backend=backend.name,
+                                                                    outcome=outcome),
+    on_hedge=lambda backend: LLM_HEDGES.inc(backend=backend.name),
+    admit_extra=admit_extra_llm_attempt,
+)
 
-    return extracted_info
 
+def usable_completion(response):
+    content = response.choices[0].message.content
+    return bool(content and parse_completion_fields(content.strip()))
 
-def extract_resume_info(text):
-    prompt = f"""
-    Extract the following information from the given resume text:
-    1. Name
-    2. Email
-    3. GitHub (if available)
-    4. LinkedIn (if available)
-    5. Education (list of degrees)
-    6. Professional Experience (list of roles with descriptions and durations)
-    7. Projects (list of project names with descriptions and technologies used)
-    8. Questions and Answers (list of relevant questions and their answers based on the resume)
-    9. Skills (list of skills)
-
-    Resume text:
-    {text}
-
-    Format the output as a JSON object with the above fields. Ensure that Professional Experience, Skills, Projects, and Questions and Answers are arrays.
-    """
-
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant that extracts information from resumes for an interviewer."},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=1000,
+
+def chat_completion(messages, max_tokens=COMPLETION_MAX_TOKENS, purpose='extract'):
+    """Return (content, tokens used)."""
+    response, _ = llm_router.complete(
+        messages,
+        accept=usable_completion,
+        max_tokens=max_tokens,
         n=1,
         stop=None,
         temperature=0.5,
+        **completion_options(),
     )
+    content = response.choices[0].message.content
+    usage = getattr(response, 'usage', None)
+    if usage:
+        prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+    else:
+        prompt_tokens = sum(count_tokens(m['content'], OPENAI_MODEL) for m in messages)
+        completion_tokens = count_tokens(content or "", OPENAI_MODEL)
+    LLM_TOKENS.observe(prompt_tokens, kind='prompt', purpose=purpose)
+    LLM_TOKENS.observe(completion_tokens, kind='completion', purpose=purpose)
+    return content, prompt_tokens + completion_tokens
+
+
+def chat_completion_stream(messages, max_tokens=COMPLETION_MAX_TOKENS):
+    # Not hedged (fields are forwarded as they arrive), but sent to the
+    # backend that has been fastest lately and bounded by the deadline
+    stream = llm_router.ranked()[0].create(
+        messages,
+        timeout=llm_router.deadline,
+        max_tokens=max_tokens,
+        n=1,
+        stop=None,
+        temperature=0.5,
+        stream=True,
+        **completion_options(),
+    )
+    parts = []
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+            yield chunk.choices[0].delta.content
+
+    # Streamed completions don't report usage
+    LLM_TOKENS.observe(sum(count_tokens(m['content'], OPENAI_MODEL) for m in messages),
+                       kind='prompt', purpose='extract')
+    LLM_TOKENS.observe(count_tokens("".join(parts), OPENAI_MODEL), kind='completion', purpose='extract')
+
+
+def parse_completion_fields(content):
+    # Like parse_openai_response, but without defaulting anything so
+    # broken fields can be told apart from empty ones
+    data = find_json_object(content)
+    if data is None:
+        # Headings that never appeared are defaults, not answers
+        data = {key: value for key, value in parse_sections(content).items() if value}
+    return coerce_resume(canonicalize_keys(data))
+
+
+def reask_text(text, errors, part=None):
+    """The sections of `text` the broken fields are extracted from, or all
+    of it when no headings are recognised."""
+    sections = split_sections(text)
+    # A later chunk starts in the middle of a section, so its untitled
+    # start may belong to any field
+    extra = (HEADER,) if part is not None and part > 1 else ()
+    relevant = sections_text(sections, errors, extra)
+    if len(sections) == 1 or not relevant.strip():
+        return text
+    return relevant
+
+
+def reask_fields(text, errors, part=None, parts=None):
+    """Ask again for just the broken fields, sending only the sections
+    they come from; returns (fields, tokens)."""
+    prompt = build_reask_prompt(reask_text(text, errors, part), errors, FIELD_SCHEMAS, part, parts)
+    max_tokens = min(COMPLETION_MAX_TOKENS, REASK_TOKENS_PER_FIELD * len(errors))
+    content, tokens = chat_completion(messages_for(prompt), max_tokens, purpose='reask')
+    data = find_json_object(content.strip()) or {}
+    fixed = coerce_resume(canonicalize_keys(data))
+    return {field: fixed[field] for field in errors if field in fixed}, tokens
+
+
+def normalized_field(key, value):
+    """A streamed top-level field in the shape the finished document has."""
+    key = canonical_field(key)
+    return key, normalize_resume_field(key, coerce_resume({key: value})[key])
+
+
+def request_resume_info(text, on_field=None, part=None, parts=None):
+    messages = messages_for(build_prompt(text, part, parts))
+    if on_field is None:
+        content, _ = chat_completion(messages)
+    else:
+        # Report each top-level field as soon as the model has finished it
+        parser = TopLevelFieldParser()
+        chunks = []
+        for delta in chat_completion_stream(messages):
+            chunks.append(delta)
+            for key, value in parser.feed(delta):
+                on_field(*normalized_field(key, value))
+        content = "".join(chunks)
 
     try:
-        extracted_info = parse_openai_response(
-            response.choices[0].message.content.strip())
+        data = parse_completion_fields(content.strip())
+    except Exception as e:
+        raise ValueError(f"Error in parsing OpenAI response: {str(e)}") from e
 
-        for key in ['Name', 'Email', 'GitHub', 'LinkedIn']:
-            if key not in extracted_info:
-                extracted_info[key] = ""
+    # Re-request only the fields that failed validation instead of the
+    # whole document
+    errors = validate_resume(data)
+    reasks = 0
+    reask_tokens = 0
+    while errors and reasks < REASK_MAX_ATTEMPTS:
+        reasks += 1
+        fixed, tokens = reask_fields(text, errors, part, parts)
+        reask_tokens += tokens
+        for field, value in fixed.items():
+            data[field] = value
+        still_broken = validate_resume(data, errors)
+        for field in errors:
+            if field not in still_broken:
+                LLM_REASKS.inc(field=field, outcome='fixed')
+                if on_field is not None:
+                    on_field(*normalized_field(field, data[field]))
+        errors = still_broken
+
+    for field in errors:
+        LLM_REASKS.inc(field=field, outcome='failed')
+    if reasks:
+        logging.info(f"Re-asked {reasks} time(s) for broken fields ({reask_tokens} tokens); "
+                     f"still broken: {sorted(errors) or 'none'}")
+    return normalize_resume_schema(data)
+
+
+def request_resume_fields(text, fields):
+    """Extract just `fields` from `text`; returns (values, errors)."""
+    prompt = build_fields_prompt(text, fields, FIELD_SCHEMAS)
+    max_tokens = min(COMPLETION_MAX_TOKENS, REASK_TOKENS_PER_FIELD * len(fields))
+    content, _ = chat_completion(messages_for(prompt), max_tokens, purpose='incremental')
+    data = parse_completion_fields(content.strip())
+    values = {field: data[field] for field in fields if field in data}
+    errors = validate_resume(values, fields)
+    if errors and REASK_MAX_ATTEMPTS:
+        fixed, _ = reask_fields(text, errors)
+        values.update(fixed)
+        errors = validate_resume(values, fields)
+    return values, errors
+
+
+# Re-extract only the fields whose sections changed since the user's last
+# upload, unless more than this many fields are affected
+INCREMENTAL_EXTRACTION = os.environ.get('INCREMENTAL_EXTRACTION', '1').lower() in ('1', 'true', 'yes')
+INCREMENTAL_MAX_FIELDS = int(os.environ.get('INCREMENTAL_MAX_FIELDS', 6))
+
+
+def extract_incremental(username, text):
+    """Diff `text` (normalized) section by section against the user's last
+    upload and extract only the fields of changed sections. Returns
+    (resume_info, changed_fields), or None when a full extraction is
+    needed."""
+    if not INCREMENTAL_EXTRACTION:
+        return None
+    with timed('db_read'):
+        previous = resume_store.get(username, [('resumeText',), ('resumeInfo',)])
+    if not previous or not previous.get('resumeText') or not previous.get('resumeInfo'):
+        return None
+
+    old_sections = split_sections(previous['resumeText'])
+    new_sections = split_sections(text)
+    # Without recognizable headings everything is one section
+    if len(old_sections) < 2 or len(new_sections) < 2:
+        return None
+    fields = sorted(affected_fields(changed_sections(old_sections, new_sections)))
+    if len(fields) > INCREMENTAL_MAX_FIELDS:
+        return None
+
+    resume_info = normalize_resume_schema(previous['resumeInfo'])
+    if fields:
+        values, errors = request_resume_fields(sections_text(new_sections, fields), fields)
+        if errors:
+            logging.info(f"Incremental extraction left {sorted(errors)} broken, extracting everything")
+            return None
+        resume_info.update(values)
+        resume_info = normalize_resume_schema(resume_info)
+    logging.info(f"Incremental extraction for {username}: re-extracted {fields or 'nothing'}")
+    return resume_info, fields
+
+
+def prompt_chunks(text):
+    """The resume text as it goes to the model: normalized, then either a
+    single prompt's worth or up to MAP_MAX_CHUNKS chunks to map-reduce."""
+    started = time.monotonic()
+    raw_tokens = count_tokens(text, OPENAI_MODEL)
+    text = normalize_resume_text(text)
+    tokens = count_tokens(text, OPENAI_MODEL)
+    logging.info(f"Prompt text: {raw_tokens} -> {tokens} tokens "
+                 f"({raw_tokens - tokens} saved) in {(time.monotonic() - started) * 1000:.1f}ms")
+
+    if tokens > PROMPT_TOKEN_BUDGET and MAP_MAX_CHUNKS <= 1:
+        # Map-reduce disabled: keep only what fits in a single prompt
+        logging.info(f"Trimmed prompt text from {tokens} to {PROMPT_TOKEN_BUDGET} tokens")
+        return [trim_to_budget(text, PROMPT_TOKEN_BUDGET, OPENAI_MODEL)]
+
+    if tokens <= PROMPT_TOKEN_BUDGET:
+        return [text]
+
+    chunks = chunk_text(text, MAP_CHUNK_TOKENS, OPENAI_MODEL)
+    if len(chunks) > MAP_MAX_CHUNKS:
+        logging.info(f"Dropping {len(chunks) - MAP_MAX_CHUNKS} of {len(chunks)} chunks over the limit")
+        chunks = chunks[:MAP_MAX_CHUNKS]
+    return chunks
+
+
+def extract_resume_info(text, on_field=None, chunks=None):
+    """`chunks` are the text's prompt_chunks(), when already known."""
+    if chunks is None:
+        chunks = prompt_chunks(text)
+    started = time.monotonic()
+
+    if len(chunks) == 1:
+        extracted_info = request_resume_info(chunks[0], on_field)
+        logging.info(f"Extraction: 1 request in {time.monotonic() - started:.2f}s")
+        return extracted_info
 
-        for key in ['Education', 'Professional Experience', 'Projects', 'Questions and Answers', 'Skills']:
-            if key not in extracted_info or not isinstance(extracted_info[key], list):
-                extracted_info[key] = []
+    with ThreadPoolExecutor(len(chunks)) as pool:
+        partials = list(pool.map(
+            lambda i: request_resume_info(chunks[i], part=i + 1, parts=len(chunks)), range(len(chunks))))
+    mapped = time.monotonic()
 
-        return extracted_info
-    except Exception as e:
-        raise ValueError(f"Error in parsing OpenAI response: {str(e)}") from e
+    extracted_info = merge_resume_info(partials)
+    logging.info(f"Extraction: map {len(chunks)} chunks in {mapped - started:.2f}s, "
+                 f"reduce in {(time.monotonic() - mapped) * 1000:.1f}ms")
+    return extracted_info
 
 
-@app.route('/api/upload', methods=['POST', 'OPTIONS'])
-def upload_file():
-    if request.method == 'OPTIONS':
-        # Preflight request. Reply successfully:
-        response = app.make_default_options_response()
-    else:
-        # Actual request
+# Bounds what reaches the model: concurrent extractions, estimated tokens
+# per minute (the OpenAI quota, shared with batches) and extractions per
+# user; uploads answered from the extraction cache are not counted.
+# Interactive uploads over a limit get a 429 with Retry-After; queued jobs
+# and batches wait. ADMISSION_STORE=sqlite shares the limits between
+# worker processes.
+admission = AdmissionController(
+    create_limit_store(),
+    max_concurrent=int(os.environ.get('LLM_MAX_CONCURRENT', 8)),
+    tokens_per_minute=int(os.environ.get('OPENAI_TPM', 60000)),
+    user_per_minute=float(os.environ.get('USER_UPLOADS_PER_MINUTE', 6)),
+    user_burst=int(os.environ.get('USER_UPLOAD_BURST', 3)),
+    lease_ttl=int(os.environ.get('ADMISSION_LEASE_TTL', 300)),
+)
+
+
+def overloaded_response(e):
+    ADMISSION_REJECTIONS.inc(reason=e.reason)
+    response = jsonify({'error': str(e), 'retry_after': round(e.retry_after, 1)})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(e.retry_after)))
+    return response
+
+
+@app.errorhandler(Overloaded)
+def handle_overloaded(e):
+    return overloaded_response(e)
+
+
+def admit_upload(ctx, wait=False):
+    """Charge the user's upload rate and reserve LLM capacity for a parsed
+    upload that missed the cache; cache hits cost neither."""
+    if ctx['resume_info'] is None and 'admission' not in ctx:
+        ctx['prompt_chunks'] = prompt_chunks(ctx['pdf_text'])
+        admission.check_user(ctx['username'], wait=wait)
         try:
-            if 'file' not in request.files:
-                return jsonify({'error': 'No file part in the request'}), 400
+            ctx['admission'] = admission.admit(estimate_llm_tokens(ctx['prompt_chunks']), wait=wait)
+        except Overloaded:
+            # Turned away by the global limits: the retry shouldn't also
+            # find the user's own limit used up
+            admission.refund_user(ctx['username'])
+            raise
+
+
+def parse_upload(ctx):
+    # Identical PDFs skip both the parse and the OpenAI call
+    ctx['file_key'] = pdf_key(ctx['file'], OPENAI_MODEL, PROMPT_VERSION)
+    with timed('cache'):
+        cached, ctx['cache_tier'] = extraction_cache.get(ctx['file_key'])
+    if cached is not None:
+        # The text comes along so the next upload can still be diffed
+        ctx['resume_info'], ctx['resume_text'] = cached['resumeInfo'], cached['resumeText']
+        return
+
+    # Extract text from PDF, read straight from the uploaded file
+    with timed('pdf'):
+        reader = open_pdf(ctx['file'], MAX_UPLOAD_PAGES)
+        ctx['pdf_text'] = extract_text_from_pdf(reader)
+    # Kept with the document so the next upload can be diffed against it
+    ctx['resume_text'] = normalize_resume_text(ctx['pdf_text'])
+
+    # Re-exported PDFs with the same text skip the OpenAI call
+    ctx['content_key'] = text_key(ctx['pdf_text'], OPENAI_MODEL, PROMPT_VERSION)
+    with timed('cache'):
+        ctx['resume_info'], ctx['cache_tier'] = extraction_cache.get(ctx['content_key'])
+
+
+def extract_upload(ctx):
+    # Streaming uploads are admitted before the response starts
+    admit_upload(ctx, wait=ctx.get('wait_for_admission', False))
+    admitted = ctx.pop('admission', None)
+    try:
+        extract_admitted_upload(ctx)
+    finally:
+        if admitted:
+            admitted.release()
+
+
+def extract_admitted_upload(ctx):
+    if 'content_key' not in ctx:
+        # The PDF itself was a cache hit
+        return
+
+    if ctx['resume_info'] is None:
+        # Extract resume information
+        with timed('llm'):
+            incremental = extract_incremental(ctx['username'], ctx['resume_text'])
+            if incremental is not None:
+                ctx['resume_info'], ctx['changed_fields'] = incremental
+            else:
+                ctx['resume_info'] = extract_resume_info(ctx['pdf_text'], ctx.get('on_field'),
+                                                         ctx['prompt_chunks'])
+        if incremental is not None:
+            # Merged into this user's stored resume, so not reusable by
+            # anyone else under the content keys
+            return
+        with timed('cache'):
+            extraction_cache.set(ctx['content_key'], ctx['resume_info'])
+
+    with timed('cache'):
+        extraction_cache.set(ctx['file_key'], {'resumeInfo': ctx['resume_info'],
+                                               'resumeText': ctx['resume_text']})
+
+
+def user_document(ctx):
+    document = {
+        'resumeInfo': ctx['resume_info'],
+        'filename': ctx['filename'],
+        'originalFilename': ctx['original_filename']
+    }
+    if ctx.get('resume_text'):
+        document['resumeText'] = ctx['resume_text']
+    return document
+
+
+def store_upload(ctx):
+    with timed('db_write'):
+        changed = ctx.get('changed_fields')
+        if changed is not None:
+            # Incremental extraction: write only the fields that changed
+            update = dict(zip(field_paths(changed), (ctx['resume_info'][f] for f in changed)))
+            update.update({
+                ('resumeText',): ctx['resume_text'],
+                ('filename',): ctx['filename'],
+                ('originalFilename',): ctx['original_filename']
+            })
+            resume_store.update(ctx['username'], update)
+        else:
+            resume_store.set(ctx['username'], user_document(ctx))
+    invalidate_resume(ctx['username'])
+    skill_index.index(ctx['username'], ctx['resume_info'])
+    publish_snapshot(ctx['username'], ctx['resume_info'])
+    ctx['cache'] = 'hit' if ctx['cache_tier'] else 'miss'
+
+
+def extract_queued_upload(ctx):
+    # Already accepted with a 202: wait for capacity instead of failing
+    ctx['wait_for_admission'] = True
+    extract_upload(ctx)
+
+
+UPLOAD_STAGES = [
+    ('parse', parse_upload),
+    ('extract', extract_upload),
+    ('store', store_upload),
+]
+
+upload_jobs = JobQueue(
+    create_job_backend(),
+    [('parse', parse_upload), ('extract', extract_queued_upload), ('store', store_upload)],
+    result_keys=['resume_info', 'cache', 'cache_tier', 'changed_fields'],
+    workers=int(os.environ.get('UPLOAD_WORKERS', 4)),
+)
 
-            file = request.files['file']
-            username = request.form.get('username')
-            filename = request.form.get('filename')
 
-            if file.filename == '' or not username or not filename:
-                return jsonify({'error': 'Missing file, username, or filename'}), 400
+def wants_async_upload():
+    flag = request.args.get('async', request.form.get('async', os.environ.get('UPLOAD_ASYNC', '')))
+    return flag.lower() in ('1', 'true', 'yes')
 
-            # Verify file is a PDF
-            if not file.filename.lower().endswith('.pdf'):
-                return jsonify({'error': 'Only PDF files are allowed'}), 400
 
-            # Process file here
-            file_content = file.read()
+# Uploads are spooled to a temporary file by werkzeug (in memory up to
+# 500KB) and read from there; anything over these limits gets a 413. Batch
+# requests are capped by MAX_REQUEST_BYTES as a whole.
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', 10 * 1024 * 1024))
+MAX_UPLOAD_PAGES = int(os.environ.get('MAX_UPLOAD_PAGES', os.environ.get('PDF_MAX_PAGES', 20)))
+MAX_REQUEST_BYTES = int(os.environ.get('MAX_REQUEST_BYTES', 100 * 1024 * 1024))
+# Room for the form fields and multipart boundaries around the file
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
 
-            # Extract text from PDF
-            pdf_text = extract_text_from_pdf(BytesIO(file_content))
 
-            # Extract resume information
-            resume_info = extract_resume_info(pdf_text)
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({'error': f'Request is larger than {MAX_REQUEST_BYTES} bytes'}), 413
 
-            # Save to Firestore
-            doc_ref = db.collection('users').document(username)
-            doc_ref.set({
-                'resumeInfo': resume_info,
-                'filename': filename,
-                'originalFilename': file.filename
-            })
 
-            response = jsonify({
-                'message': 'File uploaded, processed, and saved to database successfully!',
-                'username': username,
-                'filename': filename,
-                'original_filename': file.filename,
-                'size': len(file_content),
-                'type': file.content_type,
-                'resume_info': resume_info  # Make sure this is included
-            })
+@app.errorhandler(UploadRejected)
+def handle_upload_rejected(e):
+    return jsonify({'error': str(e)}), e.status
+
+
+def read_upload():
+    """Validate the multipart upload. Returns (upload, file, None) or
+    (None, None, error_response); `file` is the spooled upload stream."""
+    # Refuse oversized uploads before the body is read
+    if request.content_length and request.content_length > MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD:
+        return None, None, (jsonify({'error': f'File is larger than {MAX_UPLOAD_BYTES} bytes'}), 413)
+
+    if 'file' not in request.files:
+        return None, None, (jsonify({'error': 'No file part in the request'}), 400)
+
+    file = request.files['file']
+    username = request.form.get('username')
+    filename = request.form.get('filename')
+
+    if file.filename == '' or not username or not filename:
+        return None, None, (jsonify({'error': 'Missing file, username, or filename'}), 400)
+
+    # Verify file is a PDF
+    if not file.filename.lower().endswith('.pdf'):
+        return None, None, (jsonify({'error': 'Only PDF files are allowed'}), 400)
+
+    # Check the magic bytes and size without reading the file into memory
+    with timed('read'):
+        try:
+            size = inspect_upload(file.stream, MAX_UPLOAD_BYTES)
+        except UploadRejected as e:
+            return None, None, (jsonify({'error': str(e)}), e.status)
+    UPLOAD_BYTES.observe(size)
+
+    upload = {
+        'username': username,
+        'filename': filename,
+        'original_filename': file.filename,
+        'size': size,
+        'type': file.content_type,
+    }
+    return upload, file.stream, None
+
+
+@app.route('/api/upload', methods=['POST', 'OPTIONS'])
+def upload_file():
+    if request.method == 'OPTIONS':
+        # Preflight request. Reply successfully:
+        response = app.make_default_options_response()
+    else:
+        # Actual request
+        try:
+            upload, file, error = read_upload()
+            if error:
+                return error
+            if wants_async_upload():
+                # The job outlives the request (and its temporary file)
+                job_id = upload_jobs.submit(upload, file.read())
+                response = jsonify({
+                    'message': 'File accepted for processing',
+                    'job_id': job_id,
+                    'status_url': f'/api/upload/{job_id}',
+                    **upload
+                })
+                response.status_code = 202
+            else:
+                ctx = dict(upload, file=file)
+                for _, stage in UPLOAD_STAGES:
+                    stage(ctx)
+
+                response = jsonify({
+                    'message': 'File uploaded, processed, and saved to database successfully!',
+                    **upload,
+                    'resume_info': ctx['resume_info'],  # Make sure this is included
+                    'cache': ctx['cache'],
+                    'cache_tier': ctx['cache_tier'],
+                    'changed_fields': ctx.get('changed_fields')
+                })
+        except Overloaded as e:
+            response = overloaded_response(e)
+        except UploadRejected as e:
+            response = jsonify({'error': str(e)})
+            response.status_code = e.status
         except Exception as e:
             print(f"Error processing file: {str(e)}")
             response = jsonify(
-                {'error': f'Internal server error: {str(e)}'}), 500
+                {'error': f'Internal server error: {str(e)}'})
+            response.status_code = 500
 
     # Add CORS headers to the response
     response.headers.add('Access-Control-Allow-Origin',
@@ -232,18 +770,389 @@ def upload_file():
     return response
 
 
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_upload_events(ctx, stages=UPLOAD_STAGES):
+    """Run the upload stages on a worker thread and yield SSE events: one
+    'field' event per top-level field as the model completes it, then
+    'done' with the stored document (or 'error')."""
+    events = queue.Queue()
+    ctx['on_field'] = lambda key, value: events.put(('field', key, value))
+
+    def run():
+        try:
+            for _, stage in stages:
+                stage(ctx)
+            events.put(('done', None, None))
+        except Exception as e:
+            logging.exception("Streaming upload failed")
+            events.put(('error', None, str(e)))
+
+    started = time.monotonic()
+    ctx['stream_started'] = True
+    threading.Thread(target=run, daemon=True).start()
+
+    sent = set()
+    first_field = None
+    while True:
+        kind, key, value = events.get()
+        if kind == 'field':
+            if first_field is None:
+                first_field = time.monotonic() - started
+                TIME_TO_FIRST_FIELD.observe(first_field)
+            sent.add(key)
+            yield sse('field', {'field': key, 'value': value})
+        elif kind == 'error':
+            yield sse('error', {'error': f'Internal server error: {value}'})
+            return
+        else:
+            break
+
+    # Cache hits and map-reduce extractions have not streamed anything yet
+    for key, value in ctx['resume_info'].items():
+        if key not in sent:
+            if first_field is None:
+                first_field = time.monotonic() - started
+                TIME_TO_FIRST_FIELD.observe(first_field)
+            yield sse('field', {'field': key, 'value': value})
+
+    yield sse('done', {
+        'message': 'File uploaded, processed, and saved to database successfully!',
+        'username': ctx['username'],
+        'filename': ctx['filename'],
+        'original_filename': ctx['original_filename'],
+        'size': ctx['size'],
+        'resume_info': ctx['resume_info'],
+        'cache': ctx['cache'],
+        'cache_tier': ctx['cache_tier'],
+        'time_to_first_field_ms': round(first_field * 1000, 1) if first_field is not None else None,
+    })
+
+
+@app.route('/api/upload/stream', methods=['POST'])
+def upload_file_stream():
+    upload, file, error = read_upload()
+    if error:
+        return error
+    # Parse and admit up front so an overloaded server answers 429 (and a
+    # bad PDF 400/413) rather than an error event; this also finishes with
+    # the request's temporary file before the response starts
+    ctx = dict(upload, file=file)
+    parse_upload(ctx)
+    admit_upload(ctx)
+    response = app.response_class(stream_upload_events(ctx, UPLOAD_STAGES[1:]),
+                                  mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop proxies from buffering the event stream
+    response.headers['X-Accel-Buffering'] = 'no'
+
+    def release_unstarted():
+        # The stages release the admission when they finish; a client that
+        # goes away before the stream starts never runs them
+        admitted = ctx.get('admission')
+        if admitted and not ctx.get('stream_started'):
+            admitted.release()
+
+    response.call_on_close(release_unstarted)
+    return response
+
+
+@app.route('/api/upload/<job_id>', methods=['GET'])
+def get_upload_status(job_id):
+    job = upload_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Upload job not found'}), 404
+
+    result = job['result'] or {}
+    return jsonify({
+        'job_id': job['id'],
+        'status': job['status'],
+        'stage': job['stage'],
+        'timings': job['timings'],
+        'error': job['error'],
+        **job['upload'],
+        'resume_info': result.get('resume_info'),
+        'cache': result.get('cache'),
+        'cache_tier': result.get('cache_tier'),
+        'changed_fields': result.get('changed_fields'),
+    }), 200
+
+
+# Serialized resume documents keyed by (username, fields, compact); uploads
+# invalidate a user's entries on write, the TTL bounds staleness across
+# instances
+resume_cache = TTLCache(
+    maxsize=int(os.environ.get('RESUME_CACHE_SIZE', 1024)),
+    ttl=int(os.environ.get('RESUME_CACHE_TTL', 60)),
+)
+
+RESUME_CACHE_CONTROL = os.environ.get(
+    'RESUME_CACHE_CONTROL',
+    'public, max-age=60, s-maxage=300, stale-while-revalidate=86400')
+
+
+def invalidate_resume(username):
+    resume_cache.delete_matching(lambda key: key[0] == username)
+
+
+def load_resume(username, fields=None, compact=False):
+    """Return (body, etag, encoded) for a user's resume document, or None.
+    `fields` is pushed down to the store as a field mask; `encoded` holds
+    the compressed bodies made so far, by encoding."""
+    key = (username, fields, compact)
+    with timed('cache'):
+        cached = resume_cache.get(key)
+    if cached is not None:
+        return cached
+
+    with timed('db_read'):
+        # resumeText is kept for diffing uploads, not served
+        resume_data = resume_store.get(username, field_paths(fields or sorted(DOCUMENT_FIELDS)))
+    if resume_data is None or (not fields and not resume_data):
+        return None
+    if compact:
+        resume_data = compact_resume(resume_data)
+
+    with timed('serialize'):
+        body = json.dumps({"extracted_info": resume_data}, sort_keys=True,
+                          separators=(',', ':')).encode('utf-8')
+        etag = hashlib.sha256(body).hexdigest()
+    resume = (body, etag, {})
+    resume_cache.set(key, resume)
+    return resume
+
+
+BATCH_MAX_FILES = int(os.environ.get('BATCH_MAX_FILES', 200))
+BATCH_PARSE_WORKERS = int(os.environ.get('BATCH_PARSE_WORKERS', 4))
+BATCH_LLM_CONCURRENCY = int(os.environ.get('BATCH_LLM_CONCURRENCY', 8))
+# Extracted documents are committed together once this many are waiting,
+# or once the first has waited this many seconds
+BATCH_COMMIT_SIZE = int(os.environ.get('BATCH_COMMIT_SIZE', 50))
+BATCH_COMMIT_DELAY = float(os.environ.get('BATCH_COMMIT_DELAY', 0.5))
+
+
+def read_zip_entry(zf, name):
+    """Decompress one archive entry, stopping past MAX_UPLOAD_BYTES whatever
+    size its header claims."""
+    with zf.open(name) as entry:
+        data = entry.read(MAX_UPLOAD_BYTES + 1)
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise UploadRejected(f"{name} is larger than {MAX_UPLOAD_BYTES} bytes", 413)
+    return BytesIO(data)
+
+
+def read_manifest(zf):
+    try:
+        manifest = json.loads(zf.read('manifest.json'))
+    except (ValueError, zipfile.BadZipFile) as e:
+        raise UploadRejected(f"manifest.json is not valid JSON: {str(e)}")
+    if not isinstance(manifest, dict) or not all(isinstance(v, str) for v in manifest.values()):
+        raise UploadRejected('manifest.json must map file names to usernames')
+    return manifest
+
+
+def read_batch_uploads():
+    """Return a list of upload dicts from either a zip archive in 'archive'
+    or repeated 'files' parts. Usernames come from a matching repeated
+    'usernames' field, a manifest.json inside the archive ({"cv.pdf":
+    "username"}), or default to the PDF file name stem. Archive entries are
+    only decompressed when a parse worker picks them up ('open_file')."""
+    uploads = []
+    if 'archive' in request.files:
+        archive = request.files['archive']
+        # Left open for the parse workers; closed with the request's file
+        zf = zipfile.ZipFile(archive.stream)
+        manifest = read_manifest(zf) if 'manifest.json' in zf.namelist() else {}
+        for info in zf.infolist():
+            name = info.filename
+            if not name.lower().endswith('.pdf') or name.startswith('__MACOSX/'):
+                continue
+            base = os.path.basename(name)
+            # Checked before decompressing anything
+            if info.file_size > MAX_UPLOAD_BYTES:
+                raise UploadRejected(f"{name} is larger than {MAX_UPLOAD_BYTES} bytes", 413)
+            uploads.append({
+                'username': manifest.get(name) or manifest.get(base) or os.path.splitext(base)[0],
+                'filename': base,
+                'original_filename': name,
+                'size': info.file_size,
+                'open_file': lambda zf=zf, name=name: read_zip_entry(zf, name),
+            })
+    else:
+        files = request.files.getlist('files')
+        usernames = request.form.getlist('usernames')
+        for i, file in enumerate(files):
+            uploads.append({
+                'username': usernames[i] if i < len(usernames) else os.path.splitext(file.filename)[0],
+                'filename': file.filename,
+                'original_filename': file.filename,
+                'file': file.stream,
+            })
+        for upload in uploads:
+            upload['size'] = inspect_batch_file(upload)
+    return uploads
+
+
+def inspect_batch_file(upload):
+    try:
+        size = inspect_upload(upload['file'], MAX_UPLOAD_BYTES)
+    except UploadRejected as e:
+        raise UploadRejected(f"{upload['original_filename']}: {str(e)}", e.status)
+    UPLOAD_BYTES.observe(size)
+    return size
+
+
+def batch_parse(ctx):
+    open_file = ctx.pop('open_file', None)
+    if open_file:
+        ctx['file'] = open_file()
+        ctx['size'] = inspect_batch_file(ctx)
+    parse_upload(ctx)
+    # Not needed past parsing; don't hold every PDF until the batch commits
+    ctx['file'] = None
+    return ctx
+
+
+def batch_extract(ctx):
+    # Batches share the admission budget with interactive uploads
+    extract_queued_upload(ctx)
+    return ctx
+
+
+def commit_batch(contexts):
+    resume_store.set_many({ctx['username']: user_document(ctx) for ctx in contexts})
+    for ctx in contexts:
+        invalidate_resume(ctx['username'])
+        skill_index.index(ctx['username'], ctx['resume_info'])
+        publish_snapshot(ctx['username'], ctx['resume_info'])
+        ctx['cache'] = 'hit' if ctx['cache_tier'] else 'miss'
+
+
+def batch_result(ctx, error=None):
+    result = {
+        'index': ctx['index'],
+        'username': ctx['username'],
+        'filename': ctx['filename'],
+        'size': ctx['size'],
+    }
+    if error:
+        result.update(status='error', error=error)
+    else:
+        result.update(status='ok', resume_info=ctx['resume_info'], cache=ctx['cache'])
+    return json.dumps(result) + '\n'
+
+
+def commit_results(contexts):
+    try:
+        commit_batch(contexts)
+    except Exception as e:
+        logging.error(f"Batch commit failed: {str(e)}")
+        return [batch_result(ctx, error=f'Failed to save: {str(e)}') for ctx in contexts]
+    return [batch_result(ctx) for ctx in contexts]
+
+
+def run_batch(uploads):
+    """Parse in one pool, extract in a bounded LLM pool, and commit
+    extracted documents in WriteBatches of up to BATCH_COMMIT_SIZE (or
+    whatever is waiting after BATCH_COMMIT_DELAY), yielding NDJSON lines.
+    Failures are reported as soon as they happen."""
+    with ThreadPoolExecutor(BATCH_PARSE_WORKERS) as parse_pool, \
+            ThreadPoolExecutor(BATCH_LLM_CONCURRENCY) as llm_pool:
+        pending = {}
+        usernames = set()
+        for index, upload in enumerate(uploads):
+            ctx = dict(upload, index=index)
+            # One document per user: a later entry would silently replace
+            # an earlier one in the same commit
+            if ctx['username'] in usernames:
+                yield batch_result(ctx, error=f"Duplicate username in batch: {ctx['username']}")
+                continue
+            usernames.add(ctx['username'])
+            pending[parse_pool.submit(batch_parse, ctx)] = ctx
+
+        extracted = []
+        commit_at = None
+        while pending or extracted:
+            timeout = None if commit_at is None else max(0.0, commit_at - time.monotonic())
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                ctx = pending.pop(future)
+                try:
+                    future.result()
+                except Exception as e:
+                    yield batch_result(ctx, error=str(e))
+                    continue
+                if ctx.get('stage') == 'extracted':
+                    extracted.append(ctx)
+                    if commit_at is None:
+                        commit_at = time.monotonic() + BATCH_COMMIT_DELAY
+                else:
+                    ctx['stage'] = 'extracted'
+                    pending[llm_pool.submit(batch_extract, ctx)] = ctx
+
+            if extracted and (not pending or len(extracted) >= BATCH_COMMIT_SIZE
+                              or time.monotonic() >= commit_at):
+                yield from commit_results(extracted)
+                extracted, commit_at = [], None
+
+
+@app.route('/api/upload/batch', methods=['POST'])
+def upload_batch():
+    try:
+        uploads = read_batch_uploads()
+    except zipfile.BadZipFile:
+        return jsonify({'error': 'Archive is not a valid zip file'}), 400
+
+    if not uploads:
+        return jsonify({'error': 'No PDF files in the request'}), 400
+    if len(uploads) > BATCH_MAX_FILES:
+        return jsonify({'error': f'At most {BATCH_MAX_FILES} files per batch'}), 400
+    for upload in uploads:
+        if not upload['username'] or not upload['filename'].lower().endswith('.pdf'):
+            return jsonify({'error': f"Invalid entry: {upload['original_filename']}"}), 400
+
+    # One JSON object per line, in completion order
+    return app.response_class(stream_with_context(run_batch(uploads)),
+                              mimetype='application/x-ndjson')
+
+
 @app.route('/api/resume/<username>', methods=['GET'])
 def get_resume_info(username):
     logging.debug(f"Received request: {request.method} {request.path}")
 
     try:
-        # Retrieve the document reference from the Firestore 'users' collection
-        resume_ref = db.collection('users').document(username)
-        resume_data = resume_ref.get().to_dict()
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    compact = request.args.get('compact', '').lower() in ('1', 'true', 'yes')
+
+    try:
+        resume = load_resume(username, fields, compact)
 
         # If resume data exists, return it with a 200 status code
-        if resume_data:
-            return jsonify({"extracted_info": resume_data}), 200
+        if resume:
+            body, etag, encoded = resume
+            encoding = None
+            if len(body) >= MIN_COMPRESS_BYTES:
+                encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+            if encoding:
+                if encoding not in encoded:
+                    with timed('compress'):
+                        encoded[encoding] = compress(body, encoding)
+                body = encoded[encoding]
+                # Each encoding is a different representation
+                etag = f"{etag}-{encoding}"
+
+            response = app.response_class(body, mimetype='application/json')
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = RESUME_CACHE_CONTROL
+            # Turns the response into a 304 when If-None-Match matches
+            return response.make_conditional(request)
         else:
             return jsonify({"error": "Resume data not found"}), 404
 
@@ -253,424 +1162,350 @@ def get_resume_info(username):
         return jsonify({"error": str(e)}), 500
 
 
-@app.route('/api/create-vercel-project', methods=['POST'])
-def create_vercel_project():
-    try:
-        # Get JSON payload
-        data = request.get_json(force=True)
-        if not data or 'username' not in data:
-            return jsonify({"error": "Missing data", "details": "Username is required in the request body"}), 400
+SEARCH_MAX_TERMS = int(os.environ.get('SEARCH_MAX_TERMS', 10))
+SEARCH_MAX_LIMIT = 100
 
-        username = data['username']
-        base_project_name = f"{username}-resume"
-        project_name = base_project_name
 
-        headers = {
-            "Authorization": f"Bearer {VERCEL_API_TOKEN}",
-            "Content-Type": "application/json"
-        }
+def parse_search_terms(value):
+    terms = []
+    for term in (value or '').split(','):
+        term = normalize_term(term)
+        if term and term not in terms:
+            terms.append(term)
+    return terms
 
-        # Try to create the project, handle conflict if it exists
-        max_retries = 3
-        for attempt in range(max_retries):
-            create_project_data = {
-                "name": project_name,
-                "framework": "nextjs",
-                "environmentVariables": [
-                    {
-                        "key": "NEXT_PUBLIC_RESUME_USERNAME",
-                        "target": "production",
-                        "type": "plain",
-                        "value": username
-                    }
-                ],
-            }
-
-            create_response = requests.post(
-                "https://api.vercel.com/v9/projects",
-                headers=headers,
-                json=create_project_data
-            )
 
-            if create_response.status_code == 409:
-                project_name = f"{base_project_name}-{uuid.uuid4().hex[:6]}"
-                if attempt == max_retries - 1:
-                    return jsonify({"error": "Failed to create project after multiple attempts", "details": "Name conflict persists"}), 409
-            elif create_response.status_code in (200, 201):
-                break
-            else:
-                error_message = f"Vercel API error: {create_response.status_code} - {create_response.text}"
-                print(f"Project creation failed: {error_message}")
-                return jsonify({"error": "Failed to create project", "details": error_message}), create_response.status_code
-
-        project_info = create_response.json()
-        project_id = project_info['id']
-
-        # Get the latest deployment for the project
-        deployments_response = requests.get(
-            f"https://api.vercel.com/v6/deployments",
-            headers=headers,
-            params={"projectId": project_id, "limit": 1}
-        )
-
-        if deployments_response.status_code == 200:
-            deployments = deployments_response.json()
-            if deployments['deployments']:
-                deployment_url = deployments['deployments'][0].get('url')
-                if deployment_url:
-                    full_deployment_url = f"https://{deployment_url}"
-                    add_allowed_origin(full_deployment_url)
-
-                    return jsonify({
-                        "success": True,
-                        "project_id": project_id,
-                        "project_name": project_name,
-                        "deploymentUrl": deployment_url,
-                        "message": "Vercel project created and deployed successfully!"
-                    }), 200
-
-        # Define the files for the initial deployment
-        files = {
-            'package.json': json.dumps({
-                "name": project_name,
-                "version": "0.1.0",
-                "private": True,
-                "scripts": {
-                    "dev": "next dev",
-                    "build": "next build",
-                    "start": "next start",
-                    "lint": "next lint"
-                },
-                "dependencies": {
-                    "@radix-ui/react-icons": "^1.3.0",
-                    "@radix-ui/react-separator": "^1.1.0",
-                    "@radix-ui/react-slot": "^1.1.0",
-                    "class-variance-authority": "^0.7.0",
-                    "clsx": "^2.1.1",
-                    "lucide-react": "^0.453.0",
-                    "next": "14.2.15",
-                    "react": "^18",
-                    "react-dom": "^18",
-                    "tailwind-merge": "^2.5.4",
-                    "tailwindcss-animate": "^1.0.7"
-                },
-                "devDependencies": {
-                    "@types/node": "^20",
-                    "@types/react": "^18",
-                    "@types/react-dom": "^18",
-                    "eslint": "^8",
-                    "eslint-config-next": "14.2.15",
-                    "postcss": "^8",
-                    "tailwindcss": "^3.4.1",
-                    "typescript": "^5"
-                }
-            }, indent=2),
-            'tsconfig.json': json.dumps({
-                "compilerOptions": {
-                    "target": "es5",
-                    "lib": ["dom", "dom.iterable", "esnext"],
-                    "allowJs": True,
-                    "skipLibCheck": True,
-                    "strict": True,
-                    "noEmit": True,
-                    "esModuleInterop": True,
-                    "module": "esnext",
-                    "moduleResolution": "bundler",
-                    "resolveJsonModule": True,
-                    "isolatedModules": True,
-                    "jsx": "preserve",
-                    "incremental": True,
-                    "plugins": [
-                        {
-                            "name": "next"
-                        }
-                    ],
-                    "paths": {
-                        "@/*": ["./src/*"]
-                    }
-                },
-                "include": ["next-env.d.ts", "**/*.ts", "**/*.tsx", ".next/types/**/*.ts"],
-                "exclude": ["node_modules"]
-            }, indent=2),
-            'src/app/page.tsx': """
-'use client'
-
-import { useEffect, useState } from 'react'
-import { Mail, Linkedin, Book, Briefcase, Code, Star } from 'lucide-react'
-
-interface ResumeInfo {
-  Name: string
-  Email: string
-  GitHub: string
-  LinkedIn: string
-  Education: string[]
-  "Professional Experience": Array<{
-    Role: string
-    Duration: string
-    Description: string
-  }>
-  Projects: Array<{
-    Name: string
-    Description: string
-    Technologies: string[]
-  }>
-  Skills: string[]
-  "Questions and Answers": Array<{
-    Question: string
-    Answer: string
-  }>
-}
-
-export default function PortfolioResume() {
-  const [resumeInfo, setResumeInfo] = useState<ResumeInfo | null>(null)
-  const [loading, setLoading] = useState(true)
-  const [error, setError] = useState<string | null>(null)
-
-  useEffect(() => {
-    const fetchResumeData = async () => {
-      try {
-        const username = process.env.NEXT_PUBLIC_RESUME_USERNAME
-        if (!username) {
-          throw new Error('Username not configured')
-        }
+def parse_page_arg(name, default, minimum, maximum=None):
+    try:
+        value = int(request.args.get(name, default))
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+    if value < minimum or (maximum is not None and value > maximum):
+        raise ValueError(f"{name} must be between {minimum} and {maximum}" if maximum is not None
+                         else f"{name} must be at least {minimum}")
+    return value
+
+
+@app.route('/api/search', methods=['GET'])
+def search_resumes():
+    """Users by skill: ?skills=python,go&roles=&mode=all|any&limit=&offset=.
+    A skill matches the user's Skills or any project's Technologies."""
+    skills = parse_search_terms(request.args.get('skills'))
+    roles = parse_search_terms(request.args.get('roles'))
+    mode = request.args.get('mode', 'all').lower()
+    try:
+        if not skills and not roles:
+            raise ValueError("skills or roles is required")
+        if len(skills) + len(roles) > SEARCH_MAX_TERMS:
+            raise ValueError(f"At most {SEARCH_MAX_TERMS} search terms")
+        if mode not in ('all', 'any'):
+            raise ValueError("mode must be 'all' or 'any'")
+        limit = parse_page_arg('limit', 20, 1, SEARCH_MAX_LIMIT)
+        offset = parse_page_arg('offset', 0, 0)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    with timed('index_load'):
+        skill_index.ensure_loaded(resume_store.scan)
+    with timed('search'):
+        total, results = skill_index.search(skills, roles, mode=mode, offset=offset, limit=limit)
+    return jsonify({
+        'skills': skills,
+        'roles': roles,
+        'mode': mode,
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'results': results,
+    })
+
+
+# Deployed portfolios embed the resume as a static snapshot so page views
+# don't call back into this API. New uploads redeploy the user's portfolio
+# (if any) on a single background worker; the static template files are
+# deduplicated by SHA, so only the new snapshot is uploaded.
+PORTFOLIO_SNAPSHOT = os.environ.get('PORTFOLIO_SNAPSHOT', '1').lower() in ('1', 'true', 'yes')
+
+snapshot_pool = ThreadPoolExecutor(1)
+# username -> newest resume_info waiting to be deployed
+snapshot_pending = {}
+snapshot_lock = threading.Lock()
+
+
+def deployment_ready(status):
+    add_allowed_origin(f"https://{status['url']}")
+
+
+# Follows new deployments until Vercel reports them ready or failed
+deployment_tracker = DeploymentTracker(
+    get_vercel_client,
+    on_ready=deployment_ready,
+    initial_interval=float(os.environ.get('DEPLOY_POLL_INITIAL', 1.0)),
+    max_interval=float(os.environ.get('DEPLOY_POLL_MAX', 15.0)),
+    timeout=int(os.environ.get('DEPLOY_TIMEOUT', 900)),
+)
 
-        const response = await fetch(`https://portlinkpy.vercel.app/api/resume/${username}`)
-        if (!response.ok) {
-          throw new Error('Failed to fetch resume data')
-        }
 
-        const data = await response.json()
-        setResumeInfo(data.extracted_info.resumeInfo)
-      } catch (err) {
-        setError(err instanceof Error ? err.message : 'Failed to load resume')
-      } finally {
-        setLoading(false)
-      }
-    }
+def portfolio_ref(username):
+    return get_db().collection('portfolios').document(username)
 
-    fetchResumeData()
-  }, [])
-
-  if (loading) {
-    return <div className="flex justify-center items-center min-h-screen">Loading...</div>
-  }
-
-  if (error) {
-    return <div className="flex justify-center items-center min-h-screen text-red-500">{error}</div>
-  }
-
-  if (!resumeInfo) {
-    return <div className="flex justify-center items-center min-h-screen">No resume data found</div>
-  }
-
-  return (
-    <div className="bg-gray-50 min-h-screen">
-      <div className="container mx-auto px-4 py-8">
-        <div className="lg:flex lg:space-x-8">
-          {/* Sidebar */}
-          <aside className="lg:w-1/3 mb-8 lg:mb-0">
-            <div className="bg-white shadow rounded-lg p-6">
-              <h2 className="text-3xl font-bold text-center mb-4">{resumeInfo.Name}</h2>
-              <div className="space-y-4">
-                <a
-                  href={`mailto:${resumeInfo.Email}`}
-                  className="flex items-center justify-center text-blue-600 border border-blue-600 p-2 rounded-lg hover:bg-blue-50 transition"
-                >
-                  <Mail className="w-4 h-4 mr-2" />
-                  {resumeInfo.Email}
-                </a>
-                {resumeInfo.GitHub && (
-                  <a
-                    href={resumeInfo.GitHub}
-                    target="_blank"
-                    rel="noopener noreferrer"
-                    className="flex items-center justify-center text-blue-600 border border-blue-600 p-2 rounded-lg hover:bg-blue-50 transition"
-                  >
-                    GitHub
-                  </a>
-                )}
-                {resumeInfo.LinkedIn && (
-                  <a
-                    href={resumeInfo.LinkedIn}
-                    target="_blank"
-                    rel="noopener noreferrer"
-                    className="flex items-center justify-center text-blue-600 border border-blue-600 p-2 rounded-lg hover:bg-blue-50 transition"
-                  >
-                    <Linkedin className="w-4 h-4 mr-2" />
-                    LinkedIn
-                  </a>
-                )}
-              </div>
-              <hr className="my-6" />
-              <div>
-                <h3 className="text-xl font-semibold flex items-center">
-                  <Star className="w-5 h-5 mr-2" />
-                  Skills
-                </h3>
-                <div className="flex flex-wrap gap-2 mt-2">
-                  {resumeInfo.Skills.map((skill, index) => (
-                    <span key={index} className="px-2 py-1 bg-gray-200 rounded text-sm">
-                      {skill}
-                    </span>
-                  ))}
-                </div>
-              </div>
-              <hr className="my-6" />
-              <div>
-                <h3 className="text-xl font-semibold flex items-center">
-                  <Book className="w-5 h-5 mr-2" />
-                  Education
-                </h3>
-                <ul className="list-disc ml-6 mt-2 space-y-2">
-                  {resumeInfo.Education.map((edu, index) => (
-                    <li key={index} className="text-gray-600">{edu}</li>
-                  ))}
-                </ul>
-              </div>
-            </div>
-          </aside>
-
-          {/* Main Content */}
-          <main className="lg:w-2/3 space-y-8">
-            {/* Professional Experience Section */}
-            <div className="bg-white shadow rounded-lg p-6">
-              <h2 className="text-2xl font-bold flex items-center mb-6">
-                <Briefcase className="w-6 h-6 mr-2" />
-                Professional Experience
-              </h2>
-              {resumeInfo["Professional Experience"].map((exp, index) => (
-                <div key={index} className="mb-6">
-                  <h3 className="text-xl font-semibold">{exp.Role}</h3>
-                  <p className="text-gray-500 mb-2">{exp.Duration}</p>
-                  <p>{exp.Description}</p>
-                </div>
-              ))}
-            </div>
-
-            {/* Projects Section */}
-            <div className="bg-white shadow rounded-lg p-6">
-              <h2 className="text-2xl font-bold flex items-center mb-6">
-                <Code className="w-6 h-6 mr-2" />
-                Projects
-              </h2>
-              {resumeInfo.Projects.map((project, index) => (
-            <div key={index} className="mb-6">
-              <h3 className="text-xl font-semibold">{project.Name}</h3>
-              <p className="mb-2">{project.Description}</p>
-              <div className="flex flex-wrap gap-2">
-                {Array.isArray(project.Technologies) && project.Technologies.map((tech, techIndex) => (
-                  <span key={techIndex} className="px-2 py-1 border border-gray-300 rounded text-sm">
-                    {tech}
-                  </span>
-                ))}
-              </div>
-            </div>
-          ))}
-            </div>
-
-            {/* Q&A Section */}
-            <div className="bg-white shadow rounded-lg p-6">
-              <h2 className="text-2xl font-bold">Questions & Answers</h2>
-              {resumeInfo["Questions and Answers"].map((qa, index) => (
-                <div key={index} className="mb-6">
-                  <h3 className="text-xl font-semibold mb-2">Q: {qa.Question}</h3>
-                  <p>A: {qa.Answer}</p>
-                </div>
-              ))}
-            </div>
-          </main>
-        </div>
-      </div>
-    </div>
-  )
-}
-            """,
-            'src/app/layout.tsx': """
-import './globals.css'
-import type { Metadata } from 'next'
-import { Inter } from 'next/font/google'
-
-const inter = Inter({ subsets: ['latin'] })
-
-export const metadata: Metadata = {
-  title: 'Create Next App',
-  description: 'Generated by create next app',
-}
-
-export default function RootLayout({
-  children,
-}: {
-  children: React.ReactNode
-}) {
-  return (
-    <html lang="en">
-      <body className={inter.className}>{children}</body>
-    </html>
-  )
-}
-            """,
-            'src/app/globals.css': """
-@tailwind base;
-@tailwind components;
-@tailwind utilities;
-
-:root {
-  --foreground-rgb: 0, 0, 0;
-  --background-start-rgb: 214, 219, 220;
-  --background-end-rgb: 255, 255, 255;
-}
-
-@media (prefers-color-scheme: dark) {
-  :root {
-    --foreground-rgb: 255, 255, 255;
-    --background-start-rgb: 0, 0, 0;
-    --background-end-rgb: 0, 0, 0;
-  }
-}
-
-body {
-  color: rgb(var(--foreground-rgb));
-  background: linear-gradient(
-      to bottom,
-      transparent,
-      rgb(var(--background-end-rgb))
-    )
-    rgb(var(--background-start-rgb));
-}
-            """
-        }
 
-        # Create initial deployment with files
+# username -> {projectId, projectName, deploymentUrl, snapshotSha}, fronting
+# the 'portfolios' collection. Only existing projects are cached.
+portfolio_cache = TTLCache(
+    maxsize=int(os.environ.get('PORTFOLIO_CACHE_SIZE', 1024)),
+    ttl=int(os.environ.get('PORTFOLIO_CACHE_TTL', 300)),
+)
+
+
+def get_portfolio(username):
+    portfolio = portfolio_cache.get(username)
+    if portfolio is not None:
+        return portfolio
+    with timed('db_read'):
+        snapshot = portfolio_ref(username).get()
+    if not snapshot.exists:
+        return None
+    portfolio = snapshot.to_dict()
+    portfolio_cache.set(username, portfolio)
+    return portfolio
+
+
+def save_portfolio(username, portfolio, merge=False):
+    with timed('db_write'):
+        portfolio_ref(username).set(portfolio, merge=merge)
+    if merge:
+        portfolio = dict(portfolio_cache.get(username) or {}, **portfolio)
+    portfolio_cache.set(username, portfolio)
+
+
+def publish_snapshot(username, resume_info):
+    """Queue a redeploy of the user's portfolio with a new snapshot. Uploads
+    arriving while one is queued replace its data instead of queueing more."""
+    if not PORTFOLIO_SNAPSHOT:
+        return
+    with snapshot_lock:
+        queued = username in snapshot_pending
+        snapshot_pending[username] = resume_info
+    if not queued:
+        snapshot_pool.submit(redeploy_snapshot, username)
+
+
+def redeploy_snapshot(username):
+    with snapshot_lock:
+        resume_info = snapshot_pending.pop(username)
+    try:
+        portfolio = get_portfolio(username)
+        if portfolio is None:
+            return
+        sha = snapshot_file(resume_info)['sha']
+        if portfolio.get('snapshotSha') == sha:
+            return
+
         deployment_data = {
+            "name": portfolio['projectName'],
+            "target": "production",
+            "framework": "nextjs"
+        }
+        response = deploy(get_vercel_client(), get_file_uploader(), deployment_data,
+                          user_bundle(portfolio['projectName'], resume_info))
+        if response.status_code not in (200, 201):
+            logging.error(f"Snapshot redeploy for {username} failed: {response.status_code} - {response.text}")
+            return
+        deployment_info = response.json()
+        deployment_tracker.track(deployment_info, username)
+        save_portfolio(username, {
+            'snapshotSha': sha,
+            'deploymentId': deployment_info.get('id'),
+            'deploymentUrl': deployment_info.get('url'),
+        }, merge=True)
+        logging.info(f"Redeployed portfolio snapshot for {username}")
+    except Exception:
+        logging.exception(f"Snapshot redeploy for {username} failed")
+
+
+def load_snapshot_resume(username):
+    if not PORTFOLIO_SNAPSHOT:
+        return None
+    with timed('db_read'):
+        document = resume_store.get(username, [('resumeInfo',)])
+    return (document or {}).get('resumeInfo')
+
+
+def create_project(vercel, username):
+    """Create the user's Vercel project and record it in the portfolio index
+    straight away, so a retry after a failed first deployment reuses it.
+    Returns (project_id, project_name, error) with error a (body, status)."""
+    base_project_name = f"{username}-resume"
+    project_name = base_project_name
+
+    # Try to create the project, handle conflict if it exists
+    max_retries = 3
+    for attempt in range(max_retries):
+        create_project_data = {
             "name": project_name,
-            "files": [
+            "framework": "nextjs",
+            "environmentVariables": [
                 {
-                    "file": file,
-                    "data": content
-                } for file, content in files.items()
+                    "key": "NEXT_PUBLIC_RESUME_USERNAME",
+                    "target": "production",
+                    "type": "plain",
+                    "value": username
+                }
             ],
-            "target": "production",
-            "framework": "nextjs"
         }
 
-        deployment_response = requests.post(
-            "https://api.vercel.com/v13/deployments",
-            headers=headers,
-            json=deployment_data
-        )
+        with timed('vercel_project'):
+            create_response = vercel.post(
+                "/v9/projects",
+                json=create_project_data
+            )
 
-        if deployment_response.status_code not in (200, 201):
-            error_message = f"Vercel deployment error: {deployment_response.status_code} - {deployment_response.text}"
-            return jsonify({"error": "Failed to deploy project", "details": error_message}), deployment_response.status_code
+        if create_response.status_code == 409:
+            project_name = f"{base_project_name}-{uuid.uuid4().hex[:6]}"
+            if attempt == max_retries - 1:
+                return None, None, ({"error": "Failed to create project after multiple attempts",
+                                     "details": "Name conflict persists"}, 409)
+        elif create_response.status_code in (200, 201):
+            break
+        else:
+            error_message = f"Vercel API error: {create_response.status_code} - {create_response.text}"
+            print(f"Project creation failed: {error_message}")
+            return None, None, ({"error": "Failed to create project", "details": error_message},
+                                create_response.status_code)
 
-        deployment_info = deployment_response.json()
+    project_id = create_response.json()['id']
+    save_portfolio(username, {'projectId': project_id, 'projectName': project_name})
+    return project_id, project_name, None
 
-        return jsonify({
-            "success": True,
-            "message": "Vercel project created and deployed successfully!",
-            "projectName": project_name,
-            "deploymentUrl": deployment_info.get('url')
-        }), 201
+
+def provision_portfolio(username):
+    """Create the Vercel project (unless an earlier attempt already did) and
+    its first deployment, and record them in the portfolio index. Returns
+    (body, status)."""
+    vercel = get_vercel_client()
+
+    portfolio = get_portfolio(username)
+    if portfolio is not None:
+        project_id, project_name = portfolio['projectId'], portfolio['projectName']
+    else:
+        project_id, project_name, error = create_project(vercel, username)
+        if error:
+            return error
+
+    # A project created just now has no deployments to look up, so go
+    # straight to the initial deployment; the static template files are
+    # referenced by SHA and only uploaded the first time they are seen
+    deployment_data = {
+        "name": project_name,
+        "target": "production",
+        "framework": "nextjs"
+    }
+
+    # The resume is baked into the bundle as a static snapshot
+    resume_info = load_snapshot_resume(username)
+    with timed('vercel_deploy'):
+        deployment_response = deploy(vercel, get_file_uploader(), deployment_data,
+                                     user_bundle(project_name, resume_info))
+
+    if deployment_response.status_code not in (200, 201):
+        error_message = f"Vercel deployment error: {deployment_response.status_code} - {deployment_response.text}"
+        return {"error": "Failed to deploy project", "details": error_message}, deployment_response.status_code
+
+    deployment_info = deployment_response.json()
+    status = deployment_tracker.track(deployment_info, username)
+    save_portfolio(username, {
+        'projectId': project_id,
+        'projectName': project_name,
+        'deploymentId': deployment_info.get('id'),
+        'deploymentUrl': deployment_info.get('url'),
+        'snapshotSha': snapshot_file(resume_info)['sha'] if resume_info is not None else None,
+    })
+
+    return {
+        "success": True,
+        "message": "Vercel project created and deployed successfully!",
+        "projectId": project_id,
+        "projectName": project_name,
+        "deploymentId": deployment_info.get('id'),
+        "deploymentUrl": deployment_info.get('url'),
+        "status": status['state'],
+        "statusUrl": f"/api/deployments/{deployment_info.get('id')}"
+    }, 201
+
+
+# Concurrent requests for the same username share one provisioning call
+provisioning = SingleFlight()
+# (username, Idempotency-Key) -> (body, status) of the finished request
+idempotent_responses = TTLCache(maxsize=4096, ttl=int(os.environ.get('IDEMPOTENCY_TTL', 86400)))
+
+
+@app.route('/api/create-vercel-project', methods=['POST'])
+def create_vercel_project():
+    try:
+        # Get JSON payload
+        data = request.get_json(force=True)
+        if not data or 'username' not in data:
+            return jsonify({"error": "Missing data", "details": "Username is required in the request body"}), 400
+
+        username = data['username']
+
+        # A retried request gets the original answer instead of a new project
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key:
+            replay = idempotent_responses.get((username, idempotency_key))
+            if replay is not None:
+                body, status = replay
+                response = jsonify(body)
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response, status
+
+        # A project whose first deployment failed is provisioned again
+        portfolio = get_portfolio(username)
+        if portfolio is not None and portfolio.get('deploymentId'):
+            deployment_id = portfolio.get('deploymentId')
+            status = deployment_tracker.get(deployment_id) if deployment_id else None
+            return jsonify({
+                "success": True,
+                "message": "Vercel project already exists",
+                "projectId": portfolio['projectId'],
+                "projectName": portfolio['projectName'],
+                "deploymentId": deployment_id,
+                "deploymentUrl": portfolio.get('deploymentUrl'),
+                "status": status['state'] if status else None,
+                "statusUrl": f"/api/deployments/{deployment_id}" if deployment_id else None
+            }), 200
+
+        body, status = provisioning.do(username, provision_portfolio, username)[0]
+        # Failures (e.g. a Vercel outage) can be retried with the same key
+        if idempotency_key and 200 <= status < 300:
+            idempotent_responses.set((username, idempotency_key), (body, status))
+        return jsonify(body), status
 
     except Exception as e:
         return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@app.route('/api/deployments/<deployment_id>', methods=['GET'])
+def get_deployment_status(deployment_id):
+    try:
+        status = deployment_tracker.get(deployment_id)
+        if status is None:
+            # Started by another instance (or before a restart): look it up
+            # once and keep following it here if it is still building
+            with timed('vercel_deployment'):
+                response = get_vercel_client().get(f"/v13/deployments/{deployment_id}")
+            if response.status_code == 404:
+                return jsonify({"error": "Deployment not found"}), 404
+            if response.status_code != 200:
+                return jsonify({"error": "Failed to fetch deployment",
+                                "details": f"Vercel API error: {response.status_code} - {response.text}"}), 502
+            status = deployment_tracker.track(response.json())
+        return jsonify(status), 200
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+# Jobs queued (or left half done) by a previous process; started once every
+# stage's dependencies above are defined
+upload_jobs.resume()
@@ -0,0 +1,266 @@
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from io import BytesIO
+
+# Finished jobs are kept this long so clients can still poll for the result
+JOB_TTL = int(os.environ.get('UPLOAD_JOB_TTL', 3600))
+# A claimed job whose worker hasn't reported progress for this long (it
+# crashed, or its instance was recycled) is handed to another worker
+JOB_LEASE = int(os.environ.get('UPLOAD_JOB_LEASE', 300))
+# Claims before a job that keeps losing its worker is failed
+JOB_MAX_ATTEMPTS = int(os.environ.get('UPLOAD_JOB_MAX_ATTEMPTS', 3))
+
+
+class MemoryJobBackend:
+    """In-process queue; jobs are lost when the process exits."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._files = {}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+
+    def enqueue(self, job, file_content):
+        with self._lock:
+            self._prune()
+            self._jobs[job['id']] = job
+            self._files[job['id']] = file_content
+        self._queue.put(job['id'])
+
+    def dequeue(self, timeout=1.0):
+        try:
+            job_id = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        return job_id
+
+    def pending(self):
+        return not self._queue.empty()
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def load_file(self, job_id):
+        with self._lock:
+            return self._files.get(job_id)
+
+    def discard_file(self, job_id):
+        with self._lock:
+            self._files.pop(job_id, None)
+
+    def _prune(self):
+        cutoff = time.time() - JOB_TTL
+        for job_id in [k for k, job in self._jobs.items()
+                       if job['status'] in ('done', 'error') and job['updated_at'] < cutoff]:
+            del self._jobs[job_id]
+            self._files.pop(job_id, None)
+
+
+class SQLiteJobBackend:
+    """Queue stored in a SQLite file, so jobs survive restarts and can be
+    shared by several worker processes on the same host. A claim is a lease
+    renewed by every update; expired claims are queued again."""
+
+    def __init__(self, path, lease=JOB_LEASE, max_attempts=JOB_MAX_ATTEMPTS):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS upload_jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                job TEXT NOT NULL,
+                file BLOB,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                claimed_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        # Queues created before claims were leased
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(upload_jobs)")}
+        if 'claimed_at' not in columns:
+            conn.execute("ALTER TABLE upload_jobs ADD COLUMN claimed_at REAL")
+            conn.execute("ALTER TABLE upload_jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS upload_jobs_status ON upload_jobs (status, created_at)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, job, file_content):
+        conn = self._conn()
+        conn.execute("DELETE FROM upload_jobs WHERE status IN ('done', 'error') AND updated_at < ?",
+                     (time.time() - JOB_TTL,))
+        conn.execute(
+            "INSERT INTO upload_jobs (id, status, job, file, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job['id'], job['status'], json.dumps(job), file_content, job['created_at'], job['updated_at']))
+
+    def _claimable(self, conn, limit):
+        return conn.execute("""
+            SELECT id, job, attempts FROM upload_jobs
+            WHERE status = 'queued' OR (status IN ('claimed', 'running') AND claimed_at < ?)
+            ORDER BY created_at LIMIT ?
+        """, (time.time() - self.lease, limit)).fetchall()
+
+    def _claim(self, conn):
+        for job_id, job, attempts in self._claimable(conn, 10):
+            if attempts >= self.max_attempts:
+                job = json.loads(job)
+                job.update(status='error', error=f"Worker lost {attempts} times", updated_at=time.time())
+                conn.execute("UPDATE upload_jobs SET status = 'error', job = ?, file = NULL, updated_at = ? "
+                             "WHERE id = ?", (json.dumps(job), job['updated_at'], job_id))
+                continue
+            conn.execute("UPDATE upload_jobs SET status = 'claimed', claimed_at = ?, attempts = attempts + 1 "
+                         "WHERE id = ?", (time.time(), job_id))
+            return job_id
+        return None
+
+    def dequeue(self, timeout=1.0):
+        deadline = time.monotonic() + timeout
+        conn = self._conn()
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                job_id = self._claim(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            if job_id:
+                return job_id
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.05)
+
+    def pending(self):
+        return bool(self._claimable(self._conn(), 1))
+
+    def get(self, job_id):
+        row = self._conn().execute("SELECT job FROM upload_jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, job_id, **fields):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            job = json.loads(conn.execute(
+                "SELECT job FROM upload_jobs WHERE id = ?", (job_id,)).fetchone()[0])
+            job.update(fields)
+            # Progress renews the worker's lease
+            conn.execute("UPDATE upload_jobs SET status = ?, job = ?, updated_at = ?, claimed_at = ? WHERE id = ?",
+                         (job['status'], json.dumps(job), job['updated_at'], time.time(), job_id))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def load_file(self, job_id):
+        row = self._conn().execute("SELECT file FROM upload_jobs WHERE id = ?", (job_id,)).fetchone()
+        return bytes(row[0]) if row and row[0] is not None else None
+
+    def discard_file(self, job_id):
+        self._conn().execute("UPDATE upload_jobs SET file = NULL WHERE id = ?", (job_id,))
+
+
+class JobQueue:
+    """Runs a fixed list of (stage name, callable) pairs for each submitted
+    job on a pool of worker threads. Each stage receives and mutates a
+    context dict; `result_keys` are copied from it into the finished job."""
+
+    def __init__(self, backend, stages, result_keys, workers=4):
+        self.backend = backend
+        self.stages = stages
+        self.result_keys = result_keys
+        self.workers = workers
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, upload, file_content):
+        now = time.time()
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'queued',
+            'stage': 'queued',
+            'upload': upload,
+            'timings': {},
+            'result': None,
+            'error': None,
+            'created_at': now,
+            'updated_at': now,
+        }
+        self.backend.enqueue(job, file_content)
+        self.start()
+        return job['id']
+
+    def get(self, job_id):
+        return self.backend.get(job_id)
+
+    def resume(self):
+        """Start the workers if jobs are waiting from a previous process (or
+        a worker that was lost), instead of waiting for the next submit()."""
+        if self.backend.pending():
+            self.start()
+
+    def start(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            job_id = self.backend.dequeue()
+            if job_id is not None:
+                self.run(job_id)
+
+    def run(self, job_id):
+        job = self.backend.get(job_id)
+        ctx = dict(job['upload'], file=BytesIO(self.backend.load_file(job_id)))
+        timings = {}
+        started = time.monotonic()
+        try:
+            for name, stage in self.stages:
+                self.backend.update(job_id, status='running', stage=name,
+                                    timings=timings, updated_at=time.time())
+                stage_started = time.monotonic()
+                stage(ctx)
+                timings[name] = round(time.monotonic() - stage_started, 4)
+            timings['total'] = round(time.monotonic() - started, 4)
+            self.backend.update(job_id, status='done', stage='done', timings=timings,
+                                result={k: ctx.get(k) for k in self.result_keys},
+                                updated_at=time.time())
+        except Exception as e:
+            logging.exception(f"Upload job {job_id} failed")
+            self.backend.update(job_id, status='error', timings=timings,
+                                error=str(e), updated_at=time.time())
+        finally:
+            self.backend.discard_file(job_id)
+
+
+def create_job_backend():
+    backend = os.environ.get('UPLOAD_QUEUE_BACKEND', 'memory')
+    if backend == 'sqlite':
+        return SQLiteJobBackend(os.environ.get('UPLOAD_QUEUE_PATH', '/tmp/upload_jobs.sqlite3'))
+    return MemoryJobBackend()
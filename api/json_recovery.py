@@ -0,0 +1,202 @@
+import json
+import re
+
+from resume_schema import LIST_FIELDS, SCALAR_FIELDS
+
+# Spellings the model uses for our keys, compared lowercased without
+# spaces, underscores or dashes
+FIELD_ALIASES = {
+    'name': 'Name',
+    'fullname': 'Name',
+    'email': 'Email',
+    'emailaddress': 'Email',
+    'github': 'GitHub',
+    'linkedin': 'LinkedIn',
+    'education': 'Education',
+    'professionalexperience': 'Professional Experience',
+    'experience': 'Professional Experience',
+    'workexperience': 'Professional Experience',
+    'projects': 'Projects',
+    'questionsandanswers': 'Questions and Answers',
+    'qanda': 'Questions and Answers',
+    'qa': 'Questions and Answers',
+    'skills': 'Skills',
+}
+
+CODE_FENCE = re.compile(r'^\s*```[a-zA-Z]*\s*$', re.MULTILINE)
+# Give up after this many '{' candidates so prose full of braces stays linear
+MAX_CANDIDATES = 8
+
+_decoder = json.JSONDecoder()
+
+# Leading whitespace is folded into each token
+TOKEN = re.compile(r'''\s*(?:
+    (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<partial>"(?:[^"\\]|\\.)*\\?\Z)
+  | (?P<open>[{\[])
+  | (?P<close>[}\]])
+  | (?P<colon>:)
+  | (?P<comma>,)
+  | (?P<literal>[^\s{}\[\],:"]+)
+)''', re.VERBOSE | re.DOTALL)
+
+
+def repair_json(text, start):
+    """Single pass over text[start:] (which begins with '{') that drops
+    trailing commas and, if the text ends before the object is closed,
+    cuts back to the last complete value and closes the open arrays and
+    objects. Returns (repaired, end) where `end` is the index just past the
+    object in `text`. Whitespace between tokens is dropped."""
+    out = []
+    stack = []
+    # Per open container: what comes next ('key', 'colon', 'value', 'comma')
+    phase = []
+    # Last point where the output could be closed into valid JSON
+    safe = None
+    n = len(text)
+
+    for match in TOKEN.finditer(text, start):
+        kind = match.lastgroup
+        if kind == 'partial':
+            break
+        token = match.group(kind)
+        if kind == 'open':
+            stack.append(token)
+            phase.append('key' if token == '{' else 'value')
+            out.append(token)
+            safe = (len(out), stack[:])
+            continue
+        if kind == 'close':
+            # Trailing comma before a closer
+            if out and out[-1] == ',':
+                out.pop()
+            opener = stack.pop()
+            phase.pop()
+            out.append('}' if opener == '{' else ']')
+            if not stack:
+                return ''.join(out), match.end()
+        elif kind == 'colon':
+            phase[-1] = 'value'
+            out.append(token)
+            continue
+        elif kind == 'comma':
+            phase[-1] = 'key' if stack[-1] == '{' else 'value'
+            out.append(token)
+            continue
+        else:
+            out.append(token)
+            if kind == 'string' and phase[-1] == 'key':
+                phase[-1] = 'colon'
+                continue
+            # A literal running into the end of the text may be cut short
+            if kind == 'literal' and match.end() == n:
+                break
+        phase[-1] = 'comma'
+        safe = (len(out), stack[:])
+
+    # Truncated completion
+    if safe is None:
+        return ''.join(out), n
+    length, open_containers = safe
+    return ''.join(out[:length]) + ''.join(
+        '}' if c == '{' else ']' for c in reversed(open_containers)), n
+
+
+def find_json_object(text):
+    """Return the first JSON object in `text` that parses, directly or after
+    repair, or None. Each candidate is scanned once from its '{'."""
+    text = CODE_FENCE.sub('', text)
+    pos = text.find('{')
+    candidates = 0
+    while pos != -1 and candidates < MAX_CANDIDATES:
+        candidates += 1
+        try:
+            value, _ = _decoder.raw_decode(text, pos)
+            if isinstance(value, dict):
+                return value
+        except json.JSONDecodeError:
+            pass
+        repaired, end = repair_json(text, pos)
+        try:
+            value = json.loads(repaired)
+            if isinstance(value, dict):
+                return value
+        except json.JSONDecodeError:
+            pass
+        # Skip past the whole candidate so nested objects aren't mistaken
+        # for the document
+        pos = text.find('{', end)
+    return None
+
+
+KEY_PUNCTUATION = re.compile(r'[\s_\-&]')
+
+
+def canonical_field(key):
+    return FIELD_ALIASES.get(KEY_PUNCTUATION.sub('', str(key)).lower(), key)
+
+
+def standardize_project(project):
+    if isinstance(project, str):
+        return {"Name": project, "Description": "", "Technologies": []}
+    if isinstance(project, dict):
+        technologies = project.get("Technologies", [])
+        if isinstance(technologies, str):
+            technologies = [t.strip() for t in technologies.split(',') if t.strip()]
+        return {
+            "Name": project.get("Name", ""),
+            "Description": project.get("Description", ""),
+            "Technologies": technologies if isinstance(technologies, list) else []
+        }
+    return {"Name": "", "Description": "", "Technologies": []}
+
+
+def canonicalize_keys(data):
+    return {canonical_field(key): value for key, value in data.items()}
+
+
+def normalize_resume_field(key, value):
+    """Normalize one (already canonical) top-level field the way
+    normalize_resume_schema does."""
+    if key in SCALAR_FIELDS:
+        if value is None:
+            return ""
+        if not isinstance(value, str):
+            return str(value) if not isinstance(value, (list, dict)) else ""
+        return value
+    if key in LIST_FIELDS:
+        if not isinstance(value, list):
+            value = [value] if isinstance(value, (str, dict)) and value else []
+        if key == "Projects":
+            value = [standardize_project(p) for p in value]
+    return value
+
+
+def normalize_resume_schema(data):
+    """Map aliased keys onto ours, default missing fields, wrap stray
+    scalars in lists and standardize projects. Unknown keys are kept."""
+    info = canonicalize_keys(data)
+    for key in SCALAR_FIELDS + LIST_FIELDS:
+        info[key] = normalize_resume_field(key, info.get(key))
+    return info
+
+
+def parse_sections(text):
+    """Last resort for non-JSON completions: lines under a bare field
+    heading become that field's value(s)."""
+    info = {key: "" for key in SCALAR_FIELDS}
+    info.update({key: [] for key in LIST_FIELDS})
+
+    current_section = None
+    for line in text.split('\n'):
+        line = line.strip()
+        if line in info:
+            current_section = line
+        elif current_section and line:
+            if current_section == "Projects":
+                info[current_section].append(standardize_project(line))
+            elif isinstance(info[current_section], list):
+                info[current_section].append(line)
+            else:
+                info[current_section] = line
+    return info
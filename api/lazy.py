@@ -0,0 +1,31 @@
+import functools
+import threading
+
+_lock = threading.RLock()
+
+
+def memoized(factory):
+    """Turn a zero-argument factory into a lazily created, process-wide
+    singleton. `get.set(instance)` replaces it (e.g. with a fake) and
+    `get.reset()` forces the next call to build it again."""
+    instance = []
+
+    @functools.wraps(factory)
+    def get():
+        if not instance:
+            with _lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+
+    def set(value):
+        with _lock:
+            instance[:] = [value]
+
+    def reset():
+        with _lock:
+            instance.clear()
+
+    get.set = set
+    get.reset = reset
+    return get
@@ -0,0 +1,302 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate` tokens per second up to
+    `capacity`. Used to keep LLM traffic inside a tokens-per-minute quota."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, amount):
+        """Take `amount` tokens if available. Returns 0 on success, otherwise
+        the number of seconds until enough tokens will have accumulated."""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.rate
+
+    def release(self, amount):
+        """Give back tokens taken for work that didn't go ahead."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    def acquire(self, amount, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(amount)
+            if not wait:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+# How often a waiting admission checks for a free concurrency slot
+SLOT_POLL_INTERVAL = 0.05
+
+
+class Overloaded(Exception):
+    """Raised instead of waiting when a limit is exhausted; `retry_after`
+    is the number of seconds until trying again may succeed."""
+
+    def __init__(self, message, retry_after, reason):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class MemoryLimitStore:
+    """Token buckets and concurrency leases for a single process."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, amount, rate, capacity):
+        """Take `amount` from the bucket `key`; returns 0 or the seconds to wait."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(rate, capacity)
+        return bucket.try_acquire(amount)
+
+    def give(self, key, amount, rate, capacity):
+        """Return `amount` taken from the bucket `key`."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.release(amount)
+
+    def acquire_slot(self, key, limit, ttl):
+        """Return a lease id if fewer than `limit` unexpired leases exist."""
+        now = time.time()
+        with self._lock:
+            leases = self._slots.setdefault(key, {})
+            for lease, expires_at in list(leases.items()):
+                if expires_at < now:
+                    del leases[lease]
+            if len(leases) >= limit:
+                return None
+            lease = uuid.uuid4().hex
+            leases[lease] = now + ttl
+            return lease
+
+    def release_slot(self, key, lease):
+        with self._lock:
+            self._slots.get(key, {}).pop(lease, None)
+
+
+class SQLiteLimitStore:
+    """The same limits kept in a SQLite file, so every worker process on
+    the host shares them. Leases expire after their ttl so a crashed
+    process can't hold a slot forever."""
+
+    # Buckets idle this long are full again and their rows are dropped
+    IDLE_TTL = 3600
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS limit_buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS limit_slots (
+                lease TEXT PRIMARY KEY,
+                key TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS limit_slots_key ON limit_slots (key, expires_at)")
+        conn.execute("DELETE FROM limit_buckets WHERE updated_at < ?", (time.time() - self.IDLE_TTL,))
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, fn, *args):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn, *args)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def take(self, key, amount, rate, capacity):
+        return self._transaction(self._take, key, min(amount, capacity), rate, capacity)
+
+    def _take(self, conn, key, amount, rate, capacity):
+        now = time.time()
+        row = conn.execute("SELECT tokens, updated_at FROM limit_buckets WHERE key = ?", (key,)).fetchone()
+        tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+        wait = 0.0
+        if tokens >= amount:
+            tokens -= amount
+        else:
+            wait = (amount - tokens) / rate
+        conn.execute("INSERT OR REPLACE INTO limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                     (key, tokens, now))
+        return wait
+
+    def give(self, key, amount, rate, capacity):
+        self._transaction(self._give, key, amount, rate, capacity)
+
+    def _give(self, conn, key, amount, rate, capacity):
+        now = time.time()
+        row = conn.execute("SELECT tokens, updated_at FROM limit_buckets WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return
+        tokens = min(capacity, row[0] + (now - row[1]) * rate + amount)
+        conn.execute("UPDATE limit_buckets SET tokens = ?, updated_at = ? WHERE key = ?", (tokens, now, key))
+
+    def acquire_slot(self, key, limit, ttl):
+        return self._transaction(self._acquire_slot, key, limit, ttl)
+
+    def _acquire_slot(self, conn, key, limit, ttl):
+        now = time.time()
+        conn.execute("DELETE FROM limit_slots WHERE key = ? AND expires_at < ?", (key, now))
+        held = conn.execute("SELECT COUNT(*) FROM limit_slots WHERE key = ?", (key,)).fetchone()[0]
+        if held >= limit:
+            return None
+        lease = uuid.uuid4().hex
+        conn.execute("INSERT INTO limit_slots (lease, key, expires_at) VALUES (?, ?, ?)", (lease, key, now + ttl))
+        return lease
+
+    def release_slot(self, key, lease):
+        self._conn().execute("DELETE FROM limit_slots WHERE lease = ?", (lease,))
+
+
+def create_limit_store():
+    store = os.environ.get('ADMISSION_STORE', 'memory')
+    if store == 'sqlite':
+        return SQLiteLimitStore(os.environ.get('ADMISSION_STORE_PATH', '/tmp/admission.sqlite3'))
+    return MemoryLimitStore()
+
+
+class Admission:
+    """A granted admission; release() (or leaving the with block) frees its
+    concurrency slot."""
+
+    def __init__(self, store=None, key=None, lease=None):
+        self._store = store
+        self._key = key
+        self._lease = lease
+
+    def release(self):
+        if self._lease is not None:
+            self._store.release_slot(self._key, self._lease)
+            self._lease = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class AdmissionController:
+    """Admission for LLM extractions: at most `max_concurrent` at a time
+    and `tokens_per_minute` estimated tokens, plus a per-user upload rate.
+    Limits of 0 are disabled."""
+
+    SLOTS_KEY = 'llm'
+    TOKENS_KEY = 'llm_tokens'
+
+    def __init__(self, store, max_concurrent=0, tokens_per_minute=0, user_per_minute=0, user_burst=1,
+                 lease_ttl=300, retry_after=1.0):
+        self.store = store
+        self.max_concurrent = max_concurrent
+        self.tokens_per_minute = tokens_per_minute
+        self.user_per_minute = user_per_minute
+        self.user_burst = user_burst
+        self.lease_ttl = lease_ttl
+        # Suggested wait when every slot is taken
+        self.retry_after = retry_after
+
+    def check_user(self, username, wait=False):
+        """Take one of the user's uploads; over the rate raise Overloaded,
+        or with `wait` block until the bucket refills."""
+        if not self.user_per_minute:
+            return
+        while True:
+            retry_after = self.store.take(f'user:{username}', 1, self.user_per_minute / 60.0, self.user_burst)
+            if not retry_after:
+                return
+            if not wait:
+                raise Overloaded(f"Too many uploads for {username}", retry_after, 'user')
+            time.sleep(retry_after)
+
+    def refund_user(self, username):
+        """Give back an upload taken by check_user for work that was then
+        turned away."""
+        if self.user_per_minute:
+            self.store.give(f'user:{username}', 1, self.user_per_minute / 60.0, self.user_burst)
+
+    def try_admit(self, tokens):
+        """Return an Admission for an extraction of about `tokens` tokens,
+        or raise Overloaded."""
+        admission = Admission()
+        if self.max_concurrent:
+            lease = self.store.acquire_slot(self.SLOTS_KEY, self.max_concurrent, self.lease_ttl)
+            if lease is None:
+                raise Overloaded("Too many extractions in progress", self.retry_after, 'concurrency')
+            admission = Admission(self.store, self.SLOTS_KEY, lease)
+        if self.tokens_per_minute:
+            wait = self.store.take(self.TOKENS_KEY, min(tokens, self.tokens_per_minute),
+                                   self.tokens_per_minute / 60.0, self.tokens_per_minute)
+            if wait:
+                admission.release()
+                raise Overloaded("LLM token budget exhausted", wait, 'tokens')
+        return admission
+
+    def charge_tokens(self, tokens):
+        """Take `tokens` from the token budget for work already admitted
+        (e.g. a hedged LLM request); False, taking nothing, when the
+        budget can't cover them now."""
+        if not self.tokens_per_minute:
+            return True
+        return not self.store.take(self.TOKENS_KEY, min(tokens, self.tokens_per_minute),
+                                   self.tokens_per_minute / 60.0, self.tokens_per_minute)
+
+    def admit(self, tokens, wait=False):
+        """Like try_admit, but with `wait` blocks until admitted (for work
+        that was already accepted, such as queued jobs and batches)."""
+        while True:
+            try:
+                return self.try_admit(tokens)
+            except Overloaded as e:
+                if not wait:
+                    raise
+                # Slots free up at unknown times; token refills are predictable
+                time.sleep(e.retry_after if e.reason == 'tokens' else SLOT_POLL_INTERVAL)
@@ -0,0 +1,189 @@
+import collections
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Latency samples kept per backend
+WINDOW = 200
+# Below this many samples a backend keeps its configured priority and the
+# default hedge delay is used
+MIN_SAMPLES = 20
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    pass
+
+
+class LatencyTracker:
+    """Recent call latencies and failures of one backend."""
+
+    def __init__(self, window=WINDOW):
+        self._samples = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok=True):
+        with self._lock:
+            self._samples.append((seconds, ok))
+
+    def count(self):
+        with self._lock:
+            return len(self._samples)
+
+    def quantile(self, q):
+        with self._lock:
+            latencies = sorted(seconds for seconds, ok in self._samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+
+    def error_rate(self):
+        with self._lock:
+            if not self._samples:
+                return 0.0
+            return sum(1 for _, ok in self._samples if not ok) / len(self._samples)
+
+
+class ChatBackend:
+    """An OpenAI-compatible chat completions endpoint and the model to ask.
+    `get_client` is called per request so the client can be swapped."""
+
+    def __init__(self, name, get_client, model):
+        self.name = name
+        self.get_client = get_client
+        self.model = model
+        self.latency = LatencyTracker()
+
+    def create(self, messages, timeout=None, **options):
+        return self.get_client().chat.completions.create(
+            model=self.model, messages=messages, timeout=timeout, **options)
+
+    def score(self):
+        """Lower is better; backends without enough samples sort last (in
+        configured order)."""
+        if self.latency.count() < MIN_SAMPLES:
+            return float('inf')
+        return self.latency.quantile(0.5) * (1 + 4 * self.latency.error_rate())
+
+
+class HedgedRouter:
+    """Sends a completion to the best backend and, if it hasn't answered
+    within its p95 latency (clamped to [min_delay, max_delay]), a hedge to
+    the next backend (the same one when there is only one). The first
+    response that `accept` likes wins; the loser is left to finish in the
+    background. Every call is bounded by `deadline` seconds."""
+
+    def __init__(self, backends, hedge=True, max_attempts=2, default_delay=8.0, min_delay=0.5,
+                 max_delay=20.0, deadline=60.0, workers=16, on_result=None, on_hedge=None,
+                 admit_extra=None):
+        self.backends = list(backends)
+        self.hedge = hedge
+        self.max_attempts = max_attempts
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        # on_result(backend, seconds, outcome) after every attempt
+        self.on_result = on_result
+        # on_hedge(backend) when a hedge is sent to it
+        self.on_hedge = on_hedge
+        # admit_extra(backend, messages, options) before any attempt after
+        # the first (a hedge, or a retry of a failed attempt); False skips it
+        self.admit_extra = admit_extra
+        self.hedges = 0
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='llm')
+
+    def ranked(self):
+        order = {id(b): i for i, b in enumerate(self.backends)}
+        return sorted(self.backends, key=lambda b: (b.score(), order[id(b)]))
+
+    def hedge_delay(self, backend):
+        if backend.latency.count() < MIN_SAMPLES:
+            return self.default_delay
+        return min(self.max_delay, max(self.min_delay, backend.latency.quantile(0.95)))
+
+    def _attempt(self, backend, messages, deadline, options):
+        started = time.monotonic()
+        try:
+            response = backend.create(messages, timeout=max(0.01, deadline - started), **options)
+        except Exception as e:
+            seconds = time.monotonic() - started
+            outcome = 'timeout' if isinstance(e, TimeoutError) or 'timeout' in type(e).__name__.lower() else 'error'
+            backend.latency.record(seconds, ok=False)
+            self._report(backend, seconds, outcome)
+            raise
+        seconds = time.monotonic() - started
+        backend.latency.record(seconds)
+        self._report(backend, seconds, 'ok')
+        return response
+
+    def _report(self, backend, seconds, outcome):
+        if self.on_result:
+            try:
+                self.on_result(backend, seconds, outcome)
+            except Exception:
+                logging.exception("LLM result hook failed")
+
+    def complete(self, messages, accept=None, deadline=None, **options):
+        """Return (response, backend). Raises the last error if every
+        attempt failed, or LLMDeadlineExceeded."""
+        budget = deadline or self.deadline
+        deadline = time.monotonic() + budget
+        ranked = self.ranked()
+        attempts = self.max_attempts if self.hedge else 1
+        targets = [ranked[i % len(ranked)] for i in range(attempts)]
+
+        pending = {}
+        fallback = None
+        error = None
+
+        def launch():
+            backend = targets[len(launched)]
+            if launched and self.admit_extra and not self.admit_extra(backend, messages, options):
+                # No more attempts for this call
+                del targets[len(launched):]
+                return False
+            launched.append(backend)
+            pending[self._pool.submit(self._attempt, backend, messages, deadline, options)] = backend
+            return True
+
+        launched = []
+        launch()
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            hedge_at = None
+            if len(launched) < len(targets):
+                hedge_at = self.hedge_delay(launched[-1])
+            done, _ = wait(list(pending), timeout=min(remaining, hedge_at) if hedge_at else remaining,
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                if hedge_at is not None and time.monotonic() < deadline:
+                    # Slower than usual: race a second attempt
+                    backend = targets[len(launched)]
+                    if launch():
+                        self.hedges += 1
+                        logging.info(f"Hedging LLM call to {backend.name} after {hedge_at:.2f}s")
+                        if self.on_hedge:
+                            self.on_hedge(backend)
+                continue
+            for future in done:
+                backend = pending.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if accept is None or accept(response):
+                    return response, backend
+                fallback = fallback or (response, backend)
+            # Failed or unusable: don't wait out the hedge delay
+            if not pending and len(launched) < len(targets):
+                launch()
+
+        if fallback:
+            return fallback
+        if error is not None and not pending:
+            raise error
+        raise LLMDeadlineExceeded(f"No LLM response within {budget}s")
@@ -0,0 +1,175 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def format_labels(labelnames, key, extra=None):
+    pairs = list(zip(labelnames, key))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Histogram:
+    """Cumulative-bucket histogram rendered in the Prometheus text format.
+    Observing is a bisect and a few additions under a lock."""
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total, count)
+                      for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{format_labels(self.labelnames, key, ('le', repr(float(bound))))} {cumulative}")
+            lines.append(f"{self.name}_bucket{format_labels(self.labelnames, key, ('le', '+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def histogram(self, name, help, buckets=DEFAULT_BUCKETS, labelnames=()):
+        metric = Histogram(name, help, buckets, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        metric = Counter(name, help, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'portlink_request_seconds', 'Time spent handling HTTP requests',
+    labelnames=('route', 'method', 'status'))
+STAGE_SECONDS = REGISTRY.histogram(
+    'portlink_stage_seconds', 'Time spent in each request stage', labelnames=('stage',))
+LLM_TOKENS = REGISTRY.histogram(
+    'portlink_llm_tokens', 'Tokens used per OpenAI request',
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000), labelnames=('kind', 'purpose'))
+LLM_REASKS = REGISTRY.counter(
+    'portlink_llm_reasks_total', 'Resume fields re-requested after failing validation',
+    labelnames=('field', 'outcome'))
+LLM_SECONDS = REGISTRY.histogram(
+    'portlink_llm_seconds', 'Latency of each LLM attempt, hedges included',
+    labelnames=('backend', 'outcome'))
+LLM_HEDGES = REGISTRY.counter(
+    'portlink_llm_hedges_total', 'Hedged LLM attempts sent after the first was slow',
+    labelnames=('backend',))
+ADMISSION_REJECTIONS = REGISTRY.counter(
+    'portlink_admission_rejections_total', 'Uploads turned away with a 429', labelnames=('reason',))
+PDF_PAGES = REGISTRY.histogram(
+    'portlink_pdf_pages', 'Pages extracted per PDF', buckets=(1, 2, 3, 5, 10, 20, 50, 100))
+UPLOAD_BYTES = REGISTRY.histogram(
+    'portlink_upload_bytes', 'Size of uploaded PDFs',
+    buckets=(10e3, 50e3, 100e3, 250e3, 500e3, 1e6, 2.5e6, 5e6, 10e6))
+TIME_TO_FIRST_FIELD = REGISTRY.histogram(
+    'portlink_time_to_first_field_seconds', 'Time until the first streamed resume field')
+
+
+@contextmanager
+def timed(stage):
+    """Time a block (or, as a decorator, a function) as `stage`. The duration
+    goes into the stage histogram and, inside a request, the Server-Timing
+    header of the response."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if has_request_context():
+            timings = g.setdefault('stage_timings', {})
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def server_timing(timings):
+    return ', '.join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+def init_app(app):
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_SECONDS.observe(elapsed, route=route, method=request.method,
+                                status=response.status_code)
+        timings = dict(g.get('stage_timings', {}), total=elapsed)
+        response.headers['Server-Timing'] = server_timing(timings)
+        return response
@@ -0,0 +1,56 @@
+import hashlib
+import logging
+import threading
+import time
+
+
+def normalize_origin(origin):
+    return origin.strip().rstrip('/').lower()
+
+
+class OriginAllowList:
+    """Origins allowed cross-origin access on top of the static CORS
+    config. Added origins are stored in Firestore so every instance learns
+    them; the local copy is reloaded at most every `ttl` seconds. When
+    Firestore can't be reached the last loaded origins keep being served
+    and the reload is tried again after another `ttl`."""
+
+    def __init__(self, get_db, collection='allowed_origins', ttl=60):
+        self.get_db = get_db
+        self.collection = collection
+        self.ttl = ttl
+        self._origins = set()
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def add(self, origin):
+        origin = normalize_origin(origin)
+        with self._lock:
+            if origin in self._origins:
+                return
+        doc_id = hashlib.sha1(origin.encode('utf-8')).hexdigest()
+        self.get_db().collection(self.collection).document(doc_id).set({'origin': origin})
+        with self._lock:
+            self._origins.add(origin)
+
+    def allows(self, origin):
+        origin = normalize_origin(origin)
+        with self._lock:
+            if origin in self._origins:
+                return True
+            stale = self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+        if stale:
+            self._reload()
+            with self._lock:
+                return origin in self._origins
+        return False
+
+    def _reload(self):
+        try:
+            origins = {doc.to_dict().get('origin') for doc in self.get_db().collection(self.collection).stream()}
+        except Exception:
+            logging.exception("Reloading allowed CORS origins failed")
+            origins = set()
+        with self._lock:
+            self._origins.update(o for o in origins if o)
+            self._loaded_at = time.monotonic()
@@ -0,0 +1,161 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from io import BytesIO
+
+from PyPDF2 import PdfReader
+
+# Only the first pages of a resume carry anything worth sending to the LLM
+MAX_PAGES = int(os.environ.get('PDF_MAX_PAGES', 20))
+# Page count above which pages are extracted in the process pool. Resumes
+# (up to MAX_PAGES) are cheaper to extract inline than to ship to a worker
+PARALLEL_THRESHOLD = int(os.environ.get('PDF_PARALLEL_THRESHOLD', MAX_PAGES))
+WORKERS = int(os.environ.get('PDF_WORKERS', min(4, os.cpu_count() or 1)))
+MAX_PAGE_CHARS = int(os.environ.get('PDF_MAX_PAGE_CHARS', 20000))
+MAX_TOTAL_CHARS = int(os.environ.get('PDF_MAX_TOTAL_CHARS', 100000))
+# Hard limits in the process pool. Inline (small documents, or no pool on
+# the runtime) a page can't be interrupted, so there they are best-effort:
+# checked between pages
+PAGE_TIMEOUT = float(os.environ.get('PDF_PAGE_TIMEOUT', 2.0))
+TOTAL_TIMEOUT = float(os.environ.get('PDF_TOTAL_TIMEOUT', 10.0))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def iter_page_texts(reader, start, stop, max_page_chars=MAX_PAGE_CHARS,
+                    page_timeout=PAGE_TIMEOUT, deadline=None):
+    """Yield the text of pages [start, stop), truncated to `max_page_chars`.
+
+    Stops early once `deadline` (a time.monotonic() value) has passed or a
+    single page takes longer than `page_timeout` seconds. Both are checked
+    between pages: a page that never finishes is only cut off when this
+    runs in a pool worker.
+    """
+    for index in range(start, stop):
+        if deadline is not None and time.monotonic() > deadline:
+            logging.warning(f"PDF extraction deadline reached at page {index}")
+            return
+        page_started = time.monotonic()
+        text = reader.pages[index].extract_text() or ""
+        yield text[:max_page_chars]
+        if time.monotonic() - page_started > page_timeout:
+            logging.warning(f"PDF page {index} exceeded {page_timeout}s, stopping extraction")
+            return
+
+
+def _extract_page_range(pdf_bytes, start, stop, max_page_chars, page_timeout, timeout):
+    reader = PdfReader(BytesIO(pdf_bytes))
+    deadline = time.monotonic() + timeout
+    return list(iter_page_texts(reader, start, stop, max_page_chars, page_timeout, deadline))
+
+
+def _read_bytes(pdf_file):
+    if isinstance(pdf_file, (bytes, bytearray)):
+        return bytes(pdf_file)
+    if isinstance(pdf_file, BytesIO):
+        return pdf_file.getvalue()
+    pdf_file.seek(0)
+    return pdf_file.read()
+
+
+def get_pool():
+    """The shared worker pool, started on first use. Workers come from a
+    forkserver (or spawn) rather than a fork of this process, which runs
+    other threads whose locks a forked child could inherit held."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            _pool = context.Pool(WORKERS)
+        return _pool
+
+
+def _retire_pool(pool, grace):
+    # A worker stuck on a pathological page can only be stopped by
+    # terminating its pool. Later documents get a new pool; this one takes
+    # no more work and is terminated once the extractions already in it
+    # are past their own deadlines
+    global _pool
+    with _pool_lock:
+        if _pool is not pool:
+            return
+        _pool = None
+    pool.close()
+    timer = threading.Timer(grace, pool.terminate)
+    timer.daemon = True
+    timer.start()
+
+
+def _extract_parallel(pdf_file, page_count, max_page_chars, page_timeout, total_timeout):
+    pdf_bytes = _read_bytes(pdf_file)
+    chunk_size = -(-page_count // WORKERS)
+    ranges = [(start, min(start + chunk_size, page_count))
+              for start in range(0, page_count, chunk_size)]
+
+    pool = get_pool()
+    deadline = time.monotonic() + total_timeout
+    results = [
+        pool.apply_async(_extract_page_range,
+                         (pdf_bytes, start, stop, max_page_chars, page_timeout, total_timeout))
+        for start, stop in ranges
+    ]
+
+    pages = []
+    for result in results:
+        try:
+            pages.extend(result.get(timeout=max(0.0, deadline - time.monotonic())))
+        except multiprocessing.TimeoutError:
+            logging.warning("PDF extraction timed out in worker pool, keeping pages extracted so far")
+            _retire_pool(pool, total_timeout)
+            break
+    return pages
+
+
+def extract_pdf_pages(pdf_file, max_pages=MAX_PAGES, parallel_threshold=PARALLEL_THRESHOLD,
+                      max_page_chars=MAX_PAGE_CHARS, page_timeout=PAGE_TIMEOUT,
+                      total_timeout=TOTAL_TIMEOUT):
+    """Return a list with the text of the first `max_pages` pages.
+
+    Large documents are split across the process pool, where the time limits
+    are enforced; if the pool cannot be used (e.g. no /dev/shm on the
+    serverless runtime) extraction falls back to the current thread, where
+    they are best-effort.
+    """
+    if isinstance(pdf_file, (bytes, bytearray)):
+        pdf_file = BytesIO(pdf_file)
+    # An already opened reader (e.g. after a page count check) is reused
+    if isinstance(pdf_file, PdfReader):
+        reader, pdf_file = pdf_file, pdf_file.stream
+    else:
+        reader = PdfReader(pdf_file)
+    page_count = min(len(reader.pages), max_pages)
+
+    if page_count > parallel_threshold and WORKERS > 1:
+        try:
+            return _extract_parallel(pdf_file, page_count, max_page_chars,
+                                     page_timeout, total_timeout)
+        except (OSError, ImportError) as e:
+            logging.warning(f"PDF worker pool unavailable, extracting inline: {str(e)}")
+
+    deadline = time.monotonic() + total_timeout
+    return list(iter_page_texts(reader, 0, page_count, max_page_chars, page_timeout, deadline))
+
+
+def join_page_texts(page_texts, max_total_chars=MAX_TOTAL_CHARS):
+    pages = []
+    total = 0
+    for text in page_texts:
+        if total + len(text) >= max_total_chars:
+            pages.append(text[:max_total_chars - total])
+            break
+        pages.append(text)
+        total += len(text)
+    return "".join(pages)
+
+
+def extract_pdf_text(pdf_file, max_total_chars=MAX_TOTAL_CHARS, **kwargs):
+    return join_page_texts(extract_pdf_pages(pdf_file, **kwargs), max_total_chars)
@@ -0,0 +1,53 @@
+import os
+
+# PDF readers accept the header anywhere in the first 1024 bytes
+PDF_MAGIC = b'%PDF-'
+SNIFF_BYTES = 1024
+
+
+class UploadRejected(ValueError):
+    """An upload refused before any real work; `status` is the HTTP status."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def file_size(stream):
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size
+
+
+def inspect_upload(stream, max_bytes):
+    """Check an uploaded file (a seekable stream, as spooled by werkzeug)
+    is a PDF within `max_bytes` without reading it into memory. Returns
+    its size; the stream is left at the start."""
+    size = file_size(stream)
+    if size > max_bytes:
+        raise UploadRejected(f"File is larger than {max_bytes} bytes", 413)
+    stream.seek(0)
+    head = stream.read(SNIFF_BYTES)
+    stream.seek(0)
+    if PDF_MAGIC not in head:
+        raise UploadRejected("File is not a PDF")
+    return size
+
+
+def open_pdf(stream, max_pages):
+    """Open a PdfReader on the stream itself (no copy) and check the page
+    count before any text is extracted."""
+    from PyPDF2 import PdfReader
+    from PyPDF2.errors import PdfReadError
+
+    stream.seek(0)
+    try:
+        reader = PdfReader(stream)
+        pages = len(reader.pages)
+    except PdfReadError as e:
+        raise UploadRejected(f"Could not read PDF: {str(e)}")
+    if pages > max_pages:
+        raise UploadRejected(f"PDF has {pages} pages, at most {max_pages} are allowed", 413)
+    return reader
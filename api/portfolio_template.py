@@ -0,0 +1,355 @@
+import json
+
+# Next.js portfolio template deployed by create_vercel_project. Only
+# package.json (its "name") and the resume snapshot vary per user;
+# everything else is static.
+
+PACKAGE_JSON = {
+    "version": "0.1.0",
+    "private": True,
+    "scripts": {
+        "dev": "next dev",
+        "build": "next build",
+        "start": "next start",
+        "lint": "next lint"
+    },
+    "dependencies": {
+        "@radix-ui/react-icons": "^1.3.0",
+        "@radix-ui/react-separator": "^1.1.0",
+        "@radix-ui/react-slot": "^1.1.0",
+        "class-variance-authority": "^0.7.0",
+        "clsx": "^2.1.1",
+        "lucide-react": "^0.453.0",
+        "next": "14.2.15",
+        "react": "^18",
+        "react-dom": "^18",
+        "tailwind-merge": "^2.5.4",
+        "tailwindcss-animate": "^1.0.7"
+    },
+    "devDependencies": {
+        "@types/node": "^20",
+        "@types/react": "^18",
+        "@types/react-dom": "^18",
+        "eslint": "^8",
+        "eslint-config-next": "14.2.15",
+        "postcss": "^8",
+        "tailwindcss": "^3.4.1",
+        "typescript": "^5"
+    }
+}
+
+TSCONFIG_JSON = {
+    "compilerOptions": {
+        "target": "es5",
+        "lib": ["dom", "dom.iterable", "esnext"],
+        "allowJs": True,
+        "skipLibCheck": True,
+        "strict": True,
+        "noEmit": True,
+        "esModuleInterop": True,
+        "module": "esnext",
+        "moduleResolution": "bundler",
+        "resolveJsonModule": True,
+        "isolatedModules": True,
+        "jsx": "preserve",
+        "incremental": True,
+        "plugins": [
+            {
+                "name": "next"
+            }
+        ],
+        "paths": {
+            "@/*": ["./src/*"]
+        }
+    },
+    "include": ["next-env.d.ts", "**/*.ts", "**/*.tsx", ".next/types/**/*.ts"],
+    "exclude": ["node_modules"]
+}
+
+PAGE_TSX = """
+'use client'
+
+import { useEffect, useState } from 'react'
+import { Mail, Linkedin, Book, Briefcase, Code, Star } from 'lucide-react'
+import snapshot from './resume-snapshot.json'
+
+interface ResumeInfo {
+  Name: string
+  Email: string
+  GitHub: string
+  LinkedIn: string
+  Education: string[]
+  "Professional Experience": Array<{
+    Role: string
+    Duration: string
+    Description: string
+  }>
+  Projects: Array<{
+    Name: string
+    Description: string
+    Technologies: string[]
+  }>
+  Skills: string[]
+  "Questions and Answers": Array<{
+    Question: string
+    Answer: string
+  }>
+}
+
+// Written into the bundle at deploy time; null when the resume wasn't
+// available then, in which case the page falls back to the API. Checked at
+// runtime: the JSON's inferred type rarely matches ResumeInfo exactly, so a
+// direct cast would fail the build
+function readSnapshot(value: unknown): ResumeInfo | null {
+  if (typeof value !== 'object' || value === null) {
+    return null
+  }
+  const info = (value as { resumeInfo?: unknown }).resumeInfo
+  return typeof info === 'object' && info !== null ? (info as ResumeInfo) : null
+}
+
+const snapshotInfo = readSnapshot(snapshot)
+
+export default function PortfolioResume() {
+  const [resumeInfo, setResumeInfo] = useState<ResumeInfo | null>(snapshotInfo)
+  const [loading, setLoading] = useState(snapshotInfo === null)
+  const [error, setError] = useState<string | null>(null)
+
+  useEffect(() => {
+    if (snapshotInfo !== null) {
+      return
+    }
+
+    const fetchResumeData = async () => {
+      try {
+        const username = process.env.NEXT_PUBLIC_RESUME_USERNAME
+        if (!username) {
+          throw new Error('Username not configured')
+        }
+
+        const response = await fetch(`https://portlinkpy.vercel.app/api/resume/${username}`)
+        if (!response.ok) {
+          throw new Error('Failed to fetch resume data')
+        }
+
+        const data = await response.json()
+        setResumeInfo(data.extracted_info.resumeInfo)
+      } catch (err) {
+        setError(err instanceof Error ? err.message : 'Failed to load resume')
+      } finally {
+        setLoading(false)
+      }
+    }
+
+    fetchResumeData()
+  }, [])
+
+  if (loading) {
+    return <div className="flex justify-center items-center min-h-screen">Loading...</div>
+  }
+
+  if (error) {
+    return <div className="flex justify-center items-center min-h-screen text-red-500">{error}</div>
+  }
+
+  if (!resumeInfo) {
+    return <div className="flex justify-center items-center min-h-screen">No resume data found</div>
+  }
+
+  return (
+    <div className="bg-gray-50 min-h-screen">
+      <div className="container mx-auto px-4 py-8">
+        <div className="lg:flex lg:space-x-8">
+          {/* Sidebar */}
+          <aside className="lg:w-1/3 mb-8 lg:mb-0">
+            <div className="bg-white shadow rounded-lg p-6">
+              <h2 className="text-3xl font-bold text-center mb-4">{resumeInfo.Name}</h2>
+              <div className="space-y-4">
+                <a
+                  href={`mailto:${resumeInfo.Email}`}
+                  className="flex items-center justify-center text-blue-600 border border-blue-600 p-2 rounded-lg hover:bg-blue-50 transition"
+                >
+                  <Mail className="w-4 h-4 mr-2" />
+                  {resumeInfo.Email}
+                </a>
+                {resumeInfo.GitHub && (
+                  <a
+                    href={resumeInfo.GitHub}
+                    target="_blank"
+                    rel="noopener noreferrer"
+                    className="flex items-center justify-center text-blue-600 border border-blue-600 p-2 rounded-lg hover:bg-blue-50 transition"
+                  >
+                    GitHub
+                  </a>
+                )}
+                {resumeInfo.LinkedIn && (
+                  <a
+                    href={resumeInfo.LinkedIn}
+                    target="_blank"
+                    rel="noopener noreferrer"
+                    className="flex items-center justify-center text-blue-600 border border-blue-600 p-2 rounded-lg hover:bg-blue-50 transition"
+                  >
+                    <Linkedin className="w-4 h-4 mr-2" />
+                    LinkedIn
+                  </a>
+                )}
+              </div>
+              <hr className="my-6" />
+              <div>
+                <h3 className="text-xl font-semibold flex items-center">
+                  <Star className="w-5 h-5 mr-2" />
+                  Skills
+                </h3>
+                <div className="flex flex-wrap gap-2 mt-2">
+                  {resumeInfo.Skills.map((skill, index) => (
+                    <span key={index} className="px-2 py-1 bg-gray-200 rounded text-sm">
+                      {skill}
+                    </span>
+                  ))}
+                </div>
+              </div>
+              <hr className="my-6" />
+              <div>
+                <h3 className="text-xl font-semibold flex items-center">
+                  <Book className="w-5 h-5 mr-2" />
+                  Education
+                </h3>
+                <ul className="list-disc ml-6 mt-2 space-y-2">
+                  {resumeInfo.Education.map((edu, index) => (
+                    <li key={index} className="text-gray-600">{edu}</li>
+                  ))}
+                </ul>
+              </div>
+            </div>
+          </aside>
+
+          {/* Main Content */}
+          <main className="lg:w-2/3 space-y-8">
+            {/* Professional Experience Section */}
+            <div className="bg-white shadow rounded-lg p-6">
+              <h2 className="text-2xl font-bold flex items-center mb-6">
+                <Briefcase className="w-6 h-6 mr-2" />
+                Professional Experience
+              </h2>
+              {resumeInfo["Professional Experience"].map((exp, index) => (
+                <div key={index} className="mb-6">
+                  <h3 className="text-xl font-semibold">{exp.Role}</h3>
+                  <p className="text-gray-500 mb-2">{exp.Duration}</p>
+                  <p>{exp.Description}</p>
+                </div>
+              ))}
+            </div>
+
+            {/* Projects Section */}
+            <div className="bg-white shadow rounded-lg p-6">
+              <h2 className="text-2xl font-bold flex items-center mb-6">
+                <Code className="w-6 h-6 mr-2" />
+                Projects
+              </h2>
+              {resumeInfo.Projects.map((project, index) => (
+            <div key={index} className="mb-6">
+              <h3 className="text-xl font-semibold">{project.Name}</h3>
+              <p className="mb-2">{project.Description}</p>
+              <div className="flex flex-wrap gap-2">
+                {Array.isArray(project.Technologies) && project.Technologies.map((tech, techIndex) => (
+                  <span key={techIndex} className="px-2 py-1 border border-gray-300 rounded text-sm">
+                    {tech}
+                  </span>
+                ))}
+              </div>
+            </div>
+          ))}
+            </div>
+
+            {/* Q&A Section */}
+            <div className="bg-white shadow rounded-lg p-6">
+              <h2 className="text-2xl font-bold">Questions & Answers</h2>
+              {resumeInfo["Questions and Answers"].map((qa, index) => (
+                <div key={index} className="mb-6">
+                  <h3 className="text-xl font-semibold mb-2">Q: {qa.Question}</h3>
+                  <p>A: {qa.Answer}</p>
+                </div>
+              ))}
+            </div>
+          </main>
+        </div>
+      </div>
+    </div>
+  )
+}
+            """
+
+LAYOUT_TSX = """
+import './globals.css'
+import type { Metadata } from 'next'
+import { Inter } from 'next/font/google'
+
+const inter = Inter({ subsets: ['latin'] })
+
+export const metadata: Metadata = {
+  title: 'Create Next App',
+  description: 'Generated by create next app',
+}
+
+export default function RootLayout({
+  children,
+}: {
+  children: React.ReactNode
+}) {
+  return (
+    <html lang="en">
+      <body className={inter.className}>{children}</body>
+    </html>
+  )
+}
+            """
+
+GLOBALS_CSS = """
+@tailwind base;
+@tailwind components;
+@tailwind utilities;
+
+:root {
+  --foreground-rgb: 0, 0, 0;
+  --background-start-rgb: 214, 219, 220;
+  --background-end-rgb: 255, 255, 255;
+}
+
+@media (prefers-color-scheme: dark) {
+  :root {
+    --foreground-rgb: 255, 255, 255;
+    --background-start-rgb: 0, 0, 0;
+    --background-end-rgb: 0, 0, 0;
+  }
+}
+
+body {
+  color: rgb(var(--foreground-rgb));
+  background: linear-gradient(
+      to bottom,
+      transparent,
+      rgb(var(--background-end-rgb))
+    )
+    rgb(var(--background-start-rgb));
+}
+            """
+
+STATIC_FILES = {
+    'tsconfig.json': json.dumps(TSCONFIG_JSON, indent=2),
+    'src/app/page.tsx': PAGE_TSX,
+    'src/app/layout.tsx': LAYOUT_TSX,
+    'src/app/globals.css': GLOBALS_CSS,
+}
+
+
+SNAPSHOT_PATH = 'src/app/resume-snapshot.json'
+
+
+def package_json(project_name):
+    return json.dumps({"name": project_name, **PACKAGE_JSON}, indent=2)
+
+
+def resume_snapshot(resume_info):
+    if resume_info is None:
+        return 'null'
+    return json.dumps({"resumeInfo": resume_info}, sort_keys=True, separators=(',', ':'))
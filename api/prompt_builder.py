@@ -0,0 +1,212 @@
+import json
+import logging
+import re
+import time
+import unicodedata
+from collections import Counter
+
+from resume_schema import LIST_FIELDS, SCALAR_FIELDS
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+SYSTEM_PROMPT = "You are a helpful assistant that extracts information from resumes for an interviewer."
+
+FIELDS_PROMPT = """Extract the following information from the given resume text:
+1. Name
+2. Email
+3. GitHub (if available)
+4. LinkedIn (if available)
+5. Education (list of degrees)
+6. Professional Experience (list of roles with descriptions and durations)
+7. Projects (list of project names with descriptions and technologies used)
+8. Questions and Answers (list of relevant questions and their answers based on the resume)
+9. Skills (list of skills)"""
+
+FORMAT_PROMPT = ("Format the output as a JSON object with the above fields. Ensure that Professional "
+                 "Experience, Skills, Projects, and Questions and Answers are arrays.")
+
+CHUNK_PROMPT = ("This is part {part} of {parts} of a longer resume. Only extract what appears in "
+                "this part; use empty strings and empty arrays for anything that does not.")
+
+REASK_PROMPT = ("An earlier extraction from this resume returned these fields missing or malformed:\n"
+                "{problems}\n\nExtract only these fields from the resume text. Return a JSON object "
+                "with exactly these keys:\n{schema}")
+
+FIELDS_ONLY_PROMPT = ("Extract only the following fields from these sections of a resume. Return a JSON "
+                      "object with exactly these keys:\n{schema}")
+
+PAGE_NUMBER = re.compile(r'^(page\s*)?\d+(\s*(of|/)\s*\d+)?$', re.IGNORECASE)
+# Short lines repeated this often are page headers/footers
+REPEATED_LINE_MIN = 3
+
+# Seconds before a failed encoding load is tried again, doubling with
+# each failure up to the maximum
+ENCODING_RETRY_MIN = 30
+ENCODING_RETRY_MAX = 900
+
+_encodings = {}
+# model -> (failures, monotonic time of the next attempt)
+_encoding_failures = {}
+
+
+def _encoding(model):
+    encoding = _encodings.get(model)
+    if encoding is not None:
+        return encoding
+    failures, retry_at = _encoding_failures.get(model, (0, 0.0))
+    if time.monotonic() < retry_at:
+        return None
+    # The BPE ranks are downloaded on first use (cached under
+    # TIKTOKEN_CACHE_DIR); until they load the estimate is used
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        delay = min(ENCODING_RETRY_MAX, ENCODING_RETRY_MIN * 2 ** failures)
+        logging.warning(f"tiktoken encoding for {model} unavailable, estimating tokens "
+                        f"for {delay}s: {str(e)}")
+        _encoding_failures[model] = (failures + 1, time.monotonic() + delay)
+        return None
+    _encodings[model] = encoding
+    _encoding_failures.pop(model, None)
+    return encoding
+
+
+def count_tokens(text, model="gpt-3.5-turbo"):
+    """Exact count with tiktoken, or ~4 chars/token when it (or its
+    encoding) is unavailable."""
+    encoding = _encoding(model) if tiktoken is not None else None
+    if not encoding:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+
+def normalize_resume_text(text):
+    """Collapse whitespace, drop page numbers and repeated headers/footers,
+    and remove duplicate lines, keeping the first occurrence."""
+    text = unicodedata.normalize('NFKC', text or '')
+    lines = [re.sub(r'[ \t]+', ' ', line).strip() for line in text.splitlines()]
+    lines = [line for line in lines if line and not PAGE_NUMBER.match(line)]
+
+    counts = Counter(lines)
+    seen = set()
+    kept = []
+    for line in lines:
+        if counts[line] >= REPEATED_LINE_MIN and len(line) < 80:
+            continue
+        if line in seen:
+            continue
+        seen.add(line)
+        kept.append(line)
+    return '\n'.join(kept)
+
+
+def build_prompt(text, part=None, parts=None):
+    sections = [FIELDS_PROMPT]
+    if part is not None:
+        sections.append(CHUNK_PROMPT.format(part=part, parts=parts))
+    sections.append(f"Resume text:\n{text}")
+    sections.append(FORMAT_PROMPT)
+    return "\n\n".join(sections)
+
+
+def _schema_lines(fields, schemas):
+    return "\n".join(f'- "{field}": {schemas[field]}' for field in fields)
+
+
+def build_reask_prompt(text, errors, schemas, part=None, parts=None):
+    """Prompt for just the fields in `errors` ({field: problem})."""
+    problems = "\n".join(f"- {field}: {problem}" for field, problem in errors.items())
+    sections = [REASK_PROMPT.format(problems=problems, schema=_schema_lines(errors, schemas))]
+    if part is not None:
+        sections.append(CHUNK_PROMPT.format(part=part, parts=parts))
+    sections.append(f"Resume text:\n{text}")
+    return "\n\n".join(sections)
+
+
+def build_fields_prompt(text, fields, schemas):
+    """Prompt for `fields` from part of a resume (the sections they come from)."""
+    return "\n\n".join([FIELDS_ONLY_PROMPT.format(schema=_schema_lines(fields, schemas)),
+                        f"Resume text:\n{text}"])
+
+
+def messages_for(prompt):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def trim_to_budget(text, budget, model="gpt-3.5-turbo"):
+    """Keep whole lines from the start of `text` while they fit in `budget` tokens."""
+    kept = []
+    used = 0
+    for line in text.split('\n'):
+        tokens = count_tokens(line, model) + 1
+        if used + tokens > budget:
+            break
+        kept.append(line)
+        used += tokens
+    return '\n'.join(kept)
+
+
+def chunk_text(text, budget, model="gpt-3.5-turbo"):
+    """Split `text` on line boundaries into chunks of at most `budget` tokens."""
+    chunks = []
+    current = []
+    used = 0
+    for line in text.split('\n'):
+        tokens = count_tokens(line, model) + 1
+        if current and used + tokens > budget:
+            chunks.append('\n'.join(current))
+            current = []
+            used = 0
+        current.append(line)
+        used += tokens
+    if current:
+        chunks.append('\n'.join(current))
+    return chunks
+
+
+def _identity(field, item):
+    if isinstance(item, dict):
+        if field == 'Projects':
+            return ('project', str(item.get('Name', '')).strip().lower())
+        if field == 'Professional Experience':
+            return ('role', str(item.get('Role', '')).strip().lower(),
+                    str(item.get('Duration', '')).strip().lower())
+        if field == 'Questions and Answers':
+            return ('question', str(item.get('Question', '')).strip().lower())
+        return json.dumps(item, sort_keys=True)
+    return str(item).strip().lower()
+
+
+def merge_resume_info(partials):
+    """Reduce per-chunk extractions into one document: the first non-empty
+    value wins for scalar fields, list fields are concatenated in chunk
+    order without duplicates."""
+    merged = {key: "" for key in SCALAR_FIELDS}
+    merged.update({key: [] for key in LIST_FIELDS})
+    seen = {key: set() for key in LIST_FIELDS}
+
+    for partial in partials:
+        for key in SCALAR_FIELDS:
+            value = partial.get(key)
+            if not merged[key] and isinstance(value, str) and value.strip():
+                merged[key] = value
+        for key in LIST_FIELDS:
+            values = partial.get(key)
+            if not isinstance(values, list):
+                continue
+            for item in values:
+                identity = _identity(key, item)
+                if identity in seen[key]:
+                    continue
+                seen[key].add(identity)
+                merged[key].append(item)
+    return merged
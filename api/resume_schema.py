@@ -0,0 +1,83 @@
+SCALAR_FIELDS = ['Name', 'Email', 'GitHub', 'LinkedIn']
+LIST_FIELDS = ['Education', 'Professional Experience', 'Projects', 'Questions and Answers', 'Skills']
+
+# Shape of each field, as described to the model in re-ask prompts
+FIELD_SCHEMAS = {
+    'Name': 'string',
+    'Email': 'string',
+    'GitHub': 'string (empty if not available)',
+    'LinkedIn': 'string (empty if not available)',
+    'Education': 'array of strings, one per degree',
+    'Professional Experience': 'array of {"Role": string, "Duration": string, "Description": string}',
+    'Projects': 'array of {"Name": string, "Description": string, "Technologies": array of strings}',
+    'Questions and Answers': 'array of {"Question": string, "Answer": string}',
+    'Skills': 'array of strings',
+}
+
+# Keys every item of these list fields must have, as strings
+ITEM_KEYS = {
+    'Professional Experience': ('Role', 'Duration', 'Description'),
+    'Projects': ('Name', 'Description'),
+    'Questions and Answers': ('Question', 'Answer'),
+}
+
+STRING_LIST_FIELDS = ('Education', 'Skills')
+
+
+def coerce_resume(data):
+    """Fix shapes that don't need the model: objects in string lists
+    (e.g. {"Degree": ..., "Institution": ...} in Education) are joined
+    into one string."""
+    for field in STRING_LIST_FIELDS:
+        value = data.get(field)
+        if isinstance(value, list):
+            data[field] = [", ".join(str(v) for v in item.values() if v) if isinstance(item, dict) else item
+                           for item in value]
+    return data
+
+
+def _item_error(field, item):
+    if field not in ITEM_KEYS:
+        return None if isinstance(item, str) else "items must be strings"
+    if not isinstance(item, dict):
+        return "items must be objects"
+    for key in ITEM_KEYS[field]:
+        if not isinstance(item.get(key), str):
+            return f'items need a "{key}" string'
+    if field == 'Projects':
+        # A comma separated string is split by normalize_resume_schema
+        technologies = item.get('Technologies', [])
+        if not isinstance(technologies, (str, list)) or (
+                isinstance(technologies, list) and not all(isinstance(t, str) for t in technologies)):
+            return '"Technologies" must be an array of strings'
+    return None
+
+
+def field_error(field, data):
+    """Why `field` of a parsed completion (keys already canonical) is not
+    usable, or None. Blank values are fine; the model is told to use them
+    for anything the resume doesn't have."""
+    if field not in data:
+        return "missing"
+    value = data[field]
+    if field in SCALAR_FIELDS:
+        if value is None or isinstance(value, (str, int, float)):
+            return None
+        return "expected a string"
+    if not isinstance(value, list):
+        return "expected an array"
+    for item in value:
+        error = _item_error(field, item)
+        if error:
+            return error
+    return None
+
+
+def validate_resume(data, fields=None):
+    """Return {field: error} for the broken fields of `data`."""
+    errors = {}
+    for field in fields or SCALAR_FIELDS + LIST_FIELDS:
+        error = field_error(field, data)
+        if error:
+            errors[field] = error
+    return errors
@@ -0,0 +1,96 @@
+import re
+
+# Heading (lowercased, without trailing ':') -> section
+SECTION_HEADINGS = {
+    'education': 'education',
+    'academic background': 'education',
+    'academics': 'education',
+    'experience': 'experience',
+    'work experience': 'experience',
+    'professional experience': 'experience',
+    'employment': 'experience',
+    'employment history': 'experience',
+    'work history': 'experience',
+    'internships': 'experience',
+    'projects': 'projects',
+    'personal projects': 'projects',
+    'academic projects': 'projects',
+    'selected projects': 'projects',
+    'skills': 'skills',
+    'technical skills': 'skills',
+    'core competencies': 'skills',
+    'technologies': 'skills',
+    'summary': 'summary',
+    'professional summary': 'summary',
+    'profile': 'summary',
+    'objective': 'summary',
+    'about me': 'summary',
+    'certifications': 'other',
+    'awards': 'other',
+    'achievements': 'other',
+    'publications': 'other',
+    'languages': 'other',
+    'interests': 'other',
+    'volunteering': 'other',
+}
+
+# Text before the first heading (name and contact details)
+HEADER = 'header'
+
+# Which sections each resume field is extracted from
+FIELD_SECTIONS = {
+    'Name': (HEADER,),
+    'Email': (HEADER,),
+    'GitHub': (HEADER,),
+    'LinkedIn': (HEADER,),
+    'Education': ('education',),
+    'Professional Experience': ('experience',),
+    'Projects': ('projects',),
+    'Skills': ('skills',),
+    'Questions and Answers': ('summary', 'experience', 'projects', 'other'),
+}
+
+HEADING_MAX_CHARS = 40
+
+
+def _heading(line):
+    line = line.strip().rstrip(':').strip()
+    if not line or len(line) > HEADING_MAX_CHARS:
+        return None
+    return SECTION_HEADINGS.get(re.sub(r'\s+', ' ', line).lower())
+
+
+def split_sections(text):
+    """Split resume text on known headings into {section: text}. Repeated
+    sections (e.g. two 'other' headings) are joined in order."""
+    sections = {HEADER: []}
+    current = HEADER
+    for line in (text or '').split('\n'):
+        section = _heading(line)
+        if section:
+            current = section
+            sections.setdefault(current, [])
+        sections[current].append(line)
+    return {key: '\n'.join(lines) for key, lines in sections.items()}
+
+
+def _normalized(text):
+    return re.sub(r'\s+', ' ', text or '').strip()
+
+
+def changed_sections(old, new):
+    """Sections added, removed or edited between two split_sections results."""
+    return {key for key in set(old) | set(new) if _normalized(old.get(key)) != _normalized(new.get(key))}
+
+
+def affected_fields(changed):
+    return {field for field, sections in FIELD_SECTIONS.items() if changed.intersection(sections)}
+
+
+def sections_text(sections, fields, extra=()):
+    """The text of the sections the given fields are extracted from (and
+    of the `extra` sections)."""
+    wanted = set(extra)
+    for field in fields:
+        wanted.update(FIELD_SECTIONS[field])
+    return '\n'.join(text for key, text in sections.items() if key in wanted)
@@ -0,0 +1,402 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Firestore allows at most 500 writes per batch
+FIRESTORE_BATCH_LIMIT = 500
+
+SIMPLE_SEGMENT = re.compile(r'^[_a-zA-Z][_a-zA-Z0-9]*$')
+
+
+class DocumentNotFound(KeyError):
+    pass
+
+
+def firestore_path(path):
+    """('resumeInfo', 'Professional Experience') -> resumeInfo.`Professional Experience`"""
+    return '.'.join(s if SIMPLE_SEGMENT.match(s) else "`" + s.replace('\\', '\\\\').replace('`', '\\`') + "`"
+                    for s in path)
+
+
+def mask_document(document, paths):
+    """Keep only `paths` (tuples of keys) of the document, like a Firestore
+    read with a field mask."""
+    masked = {}
+    for path in paths:
+        source, target = document, masked
+        for i, segment in enumerate(path):
+            if not isinstance(source, dict) or segment not in source:
+                break
+            if i == len(path) - 1:
+                target[segment] = source[segment]
+            else:
+                source = source[segment]
+                target = target.setdefault(segment, {})
+    return masked
+
+
+def apply_update(document, values):
+    """Set each {path: value} in the document, creating maps on the way."""
+    for path, value in values.items():
+        target = document
+        for segment in path[:-1]:
+            if not isinstance(target.get(segment), dict):
+                target[segment] = {}
+            target = target[segment]
+        target[path[-1]] = value
+    return document
+
+
+class FirestoreResumeStore:
+    """Resume documents in a Firestore collection, one per username."""
+
+    def __init__(self, get_db, collection='users'):
+        self.get_db = get_db
+        self.collection = collection
+
+    def _doc(self, username):
+        return self.get_db().collection(self.collection).document(username)
+
+    def get(self, username, paths=None):
+        if paths is None:
+            snapshot = self._doc(username).get()
+        else:
+            snapshot = self._doc(username).get(field_paths=[firestore_path(p) for p in paths])
+        return snapshot.to_dict() if snapshot.exists else None
+
+    def set(self, username, document):
+        self._doc(username).set(document)
+
+    def update(self, username, values):
+        try:
+            self._doc(username).update({firestore_path(p): v for p, v in values.items()})
+        except Exception as e:
+            if type(e).__name__ in ('NotFound', 'KeyError'):
+                raise DocumentNotFound(username) from e
+            raise
+
+    def set_many(self, documents):
+        """Write {username: document} in as few batched commits as possible."""
+        self.write_many({username: (document, None) for username, document in documents.items()})
+
+    def write_many(self, writes):
+        """Batched writes of {username: (document, paths)}: the whole
+        document when `paths` is None, otherwise only those paths (set with
+        a merge mask, so other fields written elsewhere are kept)."""
+        db = self.get_db()
+        items = list(writes.items())
+        for start in range(0, len(items), FIRESTORE_BATCH_LIMIT):
+            batch = db.batch()
+            for username, (document, paths) in items[start:start + FIRESTORE_BATCH_LIMIT]:
+                doc = db.collection(self.collection).document(username)
+                if paths is None:
+                    batch.set(doc, document)
+                else:
+                    batch.set(doc, mask_document(document, paths), merge=[firestore_path(p) for p in paths])
+            batch.commit()
+
+    def scan(self):
+        """(username, resumeInfo) for every document, streamed with a field
+        mask so resume text isn't downloaded."""
+        query = self.get_db().collection(self.collection).select(['resumeInfo'])
+        for snapshot in query.stream():
+            yield snapshot.id, (snapshot.to_dict() or {}).get('resumeInfo')
+
+
+class SQLiteResumeStore:
+    """Resume documents in a local SQLite file, as JSON. Reads are served
+    from the page cache in well under a millisecond, so the app can run
+    (and be load tested) without Firestore."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS resumes (
+                username TEXT PRIMARY KEY,
+                document TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        # Paths (JSON lists; [] for the whole document) written locally but
+        # not yet to the remote store (write-behind); `version` grows with
+        # every local write of the path
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS resume_changes (
+                username TEXT NOT NULL,
+                path TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                PRIMARY KEY (username, path)
+            )
+        """)
+        # Left by versions that only tracked whole documents
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'resume_outbox'").fetchone():
+            self._transaction(self._migrate_outbox)
+
+    def _migrate_outbox(self, conn):
+        conn.execute("""
+            INSERT OR REPLACE INTO resume_changes (username, path, version)
+            SELECT username, '[]', version FROM resume_outbox
+        """)
+        conn.execute("DROP TABLE resume_outbox")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # A write is acknowledged only once it is on disk
+            conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, fn, *args):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn, *args)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def _load(self, conn, username):
+        row = conn.execute("SELECT document FROM resumes WHERE username = ?", (username,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _store(self, conn, username, document, dirty_paths=()):
+        conn.execute("INSERT OR REPLACE INTO resumes (username, document, updated_at) VALUES (?, ?, ?)",
+                     (username, json.dumps(document), time.time()))
+        conn.executemany("""
+            INSERT INTO resume_changes (username, path, version) VALUES (?, ?, 1)
+            ON CONFLICT (username, path) DO UPDATE SET version = version + 1
+        """, [(username, json.dumps(list(path))) for path in dirty_paths])
+
+    def get(self, username, paths=None):
+        document = self._load(self._conn(), username)
+        if document is None or paths is None:
+            return document
+        return mask_document(document, paths)
+
+    def entry(self, username):
+        """(document, updated_at, dirty) of the local copy, or None."""
+        row = self._conn().execute("""
+            SELECT document, updated_at,
+                   EXISTS (SELECT 1 FROM resume_changes c WHERE c.username = r.username)
+            FROM resumes r WHERE username = ?
+        """, (username,)).fetchone()
+        return (json.loads(row[0]), row[1], bool(row[2])) if row else None
+
+    def set(self, username, document, dirty=False):
+        self._transaction(self._store, username, document, [()] if dirty else ())
+
+    def refresh(self, username, document):
+        """Replace the local copy with `document` (fetched from the remote
+        store) unless it has writes not yet flushed; returns the copy now
+        stored."""
+        def refresh(conn):
+            if conn.execute("SELECT 1 FROM resume_changes WHERE username = ? LIMIT 1", (username,)).fetchone():
+                return self._load(conn, username)
+            self._store(conn, username, document)
+            return document
+        return self._transaction(refresh)
+
+    def update(self, username, values, dirty=False):
+        def update(conn):
+            document = self._load(conn, username)
+            if document is None:
+                raise DocumentNotFound(username)
+            self._store(conn, username, apply_update(document, values), list(values) if dirty else ())
+        self._transaction(update)
+
+    def set_many(self, documents, dirty=False):
+        def set_many(conn):
+            for username, document in documents.items():
+                self._store(conn, username, document, [()] if dirty else ())
+        self._transaction(set_many)
+
+    def scan(self):
+        """(username, resumeInfo) for every document."""
+        cursor = self._conn().execute("SELECT username, json_extract(document, '$.resumeInfo') FROM resumes")
+        for username, resume_info in cursor:
+            yield username, json.loads(resume_info) if resume_info else None
+
+    def dirty(self, limit):
+        """Up to `limit` (username, {path: version}, document) waiting to be
+        flushed; the path () stands for the whole document."""
+        conn = self._conn()
+        rows = conn.execute("""
+            SELECT c.username, c.path, c.version, r.document FROM resume_changes c
+            JOIN resumes r ON r.username = c.username
+            WHERE c.username IN (SELECT DISTINCT username FROM resume_changes LIMIT ?)
+        """, (limit,)).fetchall()
+        pending = {}
+        for username, path, version, document in rows:
+            if username not in pending:
+                pending[username] = ({}, json.loads(document))
+            pending[username][0][tuple(json.loads(path))] = version
+        return [(username, paths, document) for username, (paths, document) in pending.items()]
+
+    def mark_clean(self, versions):
+        """Drop changes flushed as (username, path, version), unless the
+        path was written again since."""
+        def mark_clean(conn):
+            conn.executemany("DELETE FROM resume_changes WHERE username = ? AND path = ? AND version <= ?",
+                             [(username, json.dumps(list(path)), version) for username, path, version in versions])
+        self._transaction(mark_clean)
+
+
+def flushed_paths(paths):
+    """None (write the whole document) if it was set as a whole, else the
+    changed paths without any nested inside another."""
+    if () in paths:
+        return None
+    kept = []
+    for path in sorted(paths, key=len):
+        if not any(path[:len(parent)] == parent for parent in kept):
+            kept.append(path)
+    return kept
+
+
+class WriteBehindResumeStore:
+    """Local SQLite in front of Firestore. Writes return once they are
+    durable locally; a background thread coalesces them into batched
+    Firestore commits every `interval` seconds, or sooner once
+    `batch_size` users are waiting. Only the fields each user changed are
+    sent (merged into the remote document), so fields written by other
+    instances survive. Reads come from the local copy for `local_ttl`
+    seconds, then it is refreshed from Firestore (unless it has writes
+    still to flush).
+
+    Needs a long-lived process with its own disk: on serverless hosts
+    (Vercel) the instance can be frozen or discarded with writes still in
+    the outbox, so create_resume_store refuses this mode there."""
+
+    def __init__(self, local, remote, interval=1.0, batch_size=FIRESTORE_BATCH_LIMIT, max_backoff=60.0,
+                 local_ttl=60):
+        self.local = local
+        self.remote = remote
+        self.interval = interval
+        self.batch_size = min(batch_size, FIRESTORE_BATCH_LIMIT)
+        self.max_backoff = max_backoff
+        self.local_ttl = local_ttl
+        self.flushes = 0
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._pending = 0
+        # Left over from a previous process
+        if self.local.dirty(1):
+            self._written(0)
+
+    def get(self, username, paths=None):
+        document = self._current(username)
+        return document if document is None or paths is None else mask_document(document, paths)
+
+    def _current(self, username):
+        entry = self.local.entry(username)
+        if entry is not None:
+            document, updated_at, dirty = entry
+            if dirty or not self.local_ttl or time.time() - updated_at < self.local_ttl:
+                return document
+        document = self.remote.get(username)
+        if document is None:
+            return None
+        return self.local.refresh(username, document)
+
+    def set(self, username, document):
+        self.local.set(username, document, dirty=True)
+        self._written(1)
+
+    def update(self, username, values):
+        self._current(username)
+        self.local.update(username, values, dirty=True)
+        self._written(1)
+
+    def set_many(self, documents):
+        self.local.set_many(documents, dirty=True)
+        self._written(len(documents))
+
+    def scan(self):
+        """Local documents (the newest this host has), then remote ones it
+        hasn't seen."""
+        seen = set()
+        for username, resume_info in self.local.scan():
+            seen.add(username)
+            yield username, resume_info
+        for username, resume_info in self.remote.scan():
+            if username not in seen:
+                yield username, resume_info
+
+    def _written(self, count):
+        with self._thread_lock:
+            self._pending += count
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            if self._pending >= self.batch_size:
+                self._wake.set()
+
+    def _run(self):
+        backoff = self.interval
+        while True:
+            self._wake.wait(backoff)
+            self._wake.clear()
+            try:
+                while self.flush():
+                    pass
+                backoff = self.interval
+            except Exception:
+                logging.exception("Write-behind flush to Firestore failed")
+                backoff = min(self.max_backoff, backoff * 2)
+
+    def flush(self):
+        """Commit one batch of pending documents; returns how many."""
+        with self._flush_lock:
+            pending = self.local.dirty(self.batch_size)
+            if not pending:
+                return 0
+            self.remote.write_many({username: (document, flushed_paths(paths))
+                                    for username, paths, document in pending})
+            self.local.mark_clean([(username, path, version)
+                                   for username, paths, _ in pending for path, version in paths.items()])
+            self.flushes += 1
+            with self._thread_lock:
+                # Coalesced writes count towards _pending but not the batch
+                self._pending = 0 if len(pending) < self.batch_size else max(0, self._pending - len(pending))
+            return len(pending)
+
+    def drain(self, timeout=None):
+        """Flush until nothing is pending (e.g. before shutdown)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.flush():
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+        return True
+
+
+def create_resume_store(get_db):
+    backend = os.environ.get('RESUME_STORE', 'firestore')
+    if backend == 'firestore':
+        return FirestoreResumeStore(get_db)
+    local = SQLiteResumeStore(os.environ.get('RESUME_STORE_PATH', '/tmp/resumes.sqlite3'))
+    if backend == 'sqlite':
+        return local
+    if backend == 'write-behind':
+        if os.environ.get('VERCEL'):
+            raise ValueError("RESUME_STORE=write-behind needs a long-lived process; it is unsupported on Vercel")
+        return WriteBehindResumeStore(
+            local,
+            FirestoreResumeStore(get_db),
+            interval=float(os.environ.get('WRITE_BEHIND_INTERVAL', 1.0)),
+            batch_size=int(os.environ.get('WRITE_BEHIND_BATCH', FIRESTORE_BATCH_LIMIT)),
+            local_ttl=int(os.environ.get('WRITE_BEHIND_LOCAL_TTL', 60)),
+        )
+    raise ValueError(f"Unknown RESUME_STORE: {backend}")
@@ -0,0 +1,87 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Top-level fields of a users/<username> document; anything else asked for
+# is a field of resumeInfo
+DOCUMENT_FIELDS = {'resumeInfo', 'filename', 'originalFilename'}
+MAX_FIELDS = 20
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def parse_fields(value):
+    """Parse a comma separated ?fields= value into a sorted tuple of names.
+    Returns None when no projection was asked for; raises ValueError for
+    names Firestore can't address."""
+    if not value:
+        return None
+    fields = sorted({field.strip() for field in value.split(',') if field.strip()})
+    if not fields:
+        return None
+    if len(fields) > MAX_FIELDS:
+        raise ValueError(f"At most {MAX_FIELDS} fields can be requested")
+    for field in fields:
+        if '`' in field or '.' in field:
+            raise ValueError(f"Invalid field name: {field}")
+    return tuple(fields)
+
+
+def field_paths(fields):
+    """Document paths (tuples of keys, a field mask) for the requested fields."""
+    return [(field,) if field in DOCUMENT_FIELDS else ('resumeInfo', field) for field in fields]
+
+
+def _is_empty(value):
+    return value is None or value == "" or value == [] or value == {}
+
+
+def compact_resume(data):
+    """Drop empty sections (blank scalars, empty lists) from resumeInfo."""
+    resume_info = data.get('resumeInfo')
+    if not isinstance(resume_info, dict):
+        return data
+    return dict(data, resumeInfo={key: value for key, value in resume_info.items()
+                                  if not _is_empty(value)})
+
+
+def negotiate_encoding(accept_encoding):
+    """Pick 'br', 'gzip' or None from an Accept-Encoding header, preferring
+    brotli when it is installed and both are acceptable."""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+
+    wildcard = accepted.get('*', 0.0)
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best = None
+    best_q = 0.0
+    for coding in candidates:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output stable for a given body
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
@@ -0,0 +1,39 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key: the first caller runs
+    the function, callers arriving while it runs wait for and share its
+    result (or exception)."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key, fn, *args, **kwargs):
+        """Return (result, shared) where `shared` is True for callers that
+        joined an existing call."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
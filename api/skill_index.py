@@ -0,0 +1,595 @@
+import array
+import base64
+import bisect
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+import zlib
+
+from lru import TTLCache
+
+# Spellings of the same skill folded into one term
+ALIASES = {
+    'golang': 'go',
+    'k8s': 'kubernetes',
+    'js': 'javascript',
+    'ts': 'typescript',
+    'node.js': 'node',
+    'nodejs': 'node',
+    'react.js': 'react',
+    'reactjs': 'react',
+    'next': 'next.js',
+    'nextjs': 'next.js',
+    'postgres': 'postgresql',
+    'py': 'python',
+    'python3': 'python',
+    'amazon web services': 'aws',
+    'gcp': 'google cloud',
+}
+MAX_TERM_CHARS = 60
+# Separators inside one Skills entry ("Python, Go; Rust")
+TERM_SEPARATOR = re.compile(r'[,;|•]')
+
+# Key prefixes: listed under Skills, used in a project, held as a role
+SKILL, TECH, ROLE = 'skill', 'tech', 'role'
+
+# Terms with at least this many postings keep their bitset between queries
+BITSET_CACHE_MIN = 64
+SNAPSHOT_FORMAT = 2
+TYPECODE = 'I'
+
+
+# Firestore documents hold at most 1MiB
+SNAPSHOT_CHUNK_BYTES = 900 * 1024
+
+
+class FileSnapshotStore:
+    """Snapshot in a local file, for a single host (or tests)."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def generation(self):
+        """Changes whenever a different snapshot is written; None if there
+        is none."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_ino}-{stat.st_mtime_ns}"
+
+    def read(self):
+        """Return (data, generation), or (None, None)."""
+        try:
+            with open(self.path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                return f.read(), f"{stat.st_ino}-{stat.st_mtime_ns}"
+        except FileNotFoundError:
+            return None, None
+
+    def write(self, data, previous):
+        """Replace the snapshot if it is still generation `previous`;
+        returns the new generation, or None when it had changed."""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        if self.generation() != previous:
+            os.remove(tmp_path)
+            return None
+        os.replace(tmp_path, self.path)
+        return self.generation()
+
+
+class FirestoreSnapshotStore:
+    """Snapshot in Firestore next to the resumes, so every instance starts
+    from the last one saved instead of scanning the collection. The data
+    is split over chunk documents of a generation, which a `current`
+    document points at once they are all written (unless another
+    instance moved it on meanwhile)."""
+
+    def __init__(self, get_db, collection='skill_index', chunk_size=SNAPSHOT_CHUNK_BYTES):
+        self.get_db = get_db
+        self.collection = collection
+        self.chunk_size = chunk_size
+
+    def _collection(self):
+        return self.get_db().collection(self.collection)
+
+    def _current(self):
+        return self._collection().document('current').get().to_dict()
+
+    def generation(self):
+        return (self._current() or {}).get('generation')
+
+    def read(self):
+        current = self._current()
+        if not current:
+            return None, None
+        parts = []
+        for i in range(current['chunks']):
+            chunk = self._collection().document(f"{current['generation']}-{i}").get().to_dict()
+            if not chunk:
+                # Replaced (and cleaned up) by another instance meanwhile
+                return self.read()
+            parts.append(chunk['data'])
+        return b''.join(parts), current['generation']
+
+    def write(self, data, previous):
+        collection = self._collection()
+        generation = uuid.uuid4().hex
+        chunks = [data[start:start + self.chunk_size] for start in range(0, len(data), self.chunk_size)]
+        for i, chunk in enumerate(chunks):
+            collection.document(f"{generation}-{i}").set({'data': chunk})
+        # Not atomic, but the window is one read; an update lost to a
+        # racing instance is merged again on its next save
+        current = self._current()
+        if (current or {}).get('generation') != previous:
+            self._delete(generation, len(chunks))
+            return None
+        collection.document('current').set({'generation': generation, 'chunks': len(chunks)})
+        if current:
+            self._delete(current['generation'], current['chunks'])
+        return generation
+
+    def _delete(self, generation, chunks):
+        for i in range(chunks):
+            self._collection().document(f"{generation}-{i}").delete()
+
+
+def create_snapshot_store(get_db):
+    """SKILL_INDEX_SNAPSHOT is 'firestore' (shared by every instance), a
+    file path, or empty for no snapshot."""
+    location = os.environ.get('SKILL_INDEX_SNAPSHOT', 'firestore')
+    if location == 'firestore':
+        return FirestoreSnapshotStore(get_db)
+    return FileSnapshotStore(location) if location else None
+
+
+def normalize_term(term):
+    term = re.sub(r'\s+', ' ', str(term)).strip().strip('.,;:()[]').strip().lower()
+    return ALIASES.get(term, term)
+
+
+def split_terms(value):
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return set()
+    terms = set()
+    for item in value:
+        if isinstance(item, str):
+            terms.update(normalize_term(piece) for piece in TERM_SEPARATOR.split(item))
+    return {term for term in terms if term and len(term) <= MAX_TERM_CHARS}
+
+
+def resume_terms(resume_info):
+    """Index keys ('skill:go', 'tech:docker', 'role:sre', ...) of a resumeInfo."""
+    if not isinstance(resume_info, dict):
+        return set()
+    keys = {f'{SKILL}:{term}' for term in split_terms(resume_info.get('Skills'))}
+    for project in resume_info.get('Projects') or []:
+        if isinstance(project, dict):
+            keys.update(f'{TECH}:{term}' for term in split_terms(project.get('Technologies')))
+    for job in resume_info.get('Professional Experience') or []:
+        if isinstance(job, dict):
+            keys.update(f'{ROLE}:{term}' for term in split_terms(job.get('Role')))
+    return keys
+
+
+def popcount(bitset):
+    return bitset.bit_count() if hasattr(bitset, 'bit_count') else bin(bitset).count('1')
+
+
+def to_bitset(postings):
+    if not postings:
+        return 0
+    data = bytearray((postings[-1] >> 3) + 1)
+    for doc in postings:
+        data[doc >> 3] |= 1 << (doc & 7)
+    return int.from_bytes(data, 'little')
+
+
+def iter_bits(bitset, skip=0):
+    """Set bit positions in ascending order, after skipping `skip` of them.
+    Works a 64-bit word at a time so deep pages don't walk every bit."""
+    size = (bitset.bit_length() + 63) // 64 * 8
+    words = memoryview(bitset.to_bytes(size, sys.byteorder)).cast('Q')
+    for i, word in enumerate(words):
+        if not word:
+            continue
+        if skip:
+            count = popcount(word)
+            if skip >= count:
+                skip -= count
+                continue
+        while word:
+            low = word & -word
+            if skip:
+                skip -= 1
+            else:
+                yield i * 64 + low.bit_length() - 1
+            word ^= low
+
+
+def _add_to_counter(counter, bitset):
+    # Bit-sliced addition: counter[i] holds bit i of every document's count
+    carry = bitset
+    for i, digit in enumerate(counter):
+        if not carry:
+            return
+        counter[i], carry = digit ^ carry, digit & carry
+    if carry:
+        counter.append(carry)
+
+
+def _contains(postings, doc):
+    i = bisect.bisect_left(postings, doc)
+    return i < len(postings) and postings[i] == doc
+
+
+class SkillIndex:
+    """Inverted index from normalized skills, project technologies and
+    roles to usernames. Users get dense integer ids; each key has a sorted
+    array of ids, turned into an int bitset at query time (and cached for
+    common keys) so AND/OR and ranking are a few big-int operations.
+
+    Matching a query skill under Skills scores 2, only in a project's
+    Technologies 1; roles score 2. Results are ordered by score, then by
+    when the user was first indexed."""
+
+    def __init__(self, snapshot=None, max_age=3600, refresh=300, save_delay=30, bitset_cache_size=256):
+        # A snapshot store, or the path of a snapshot file
+        self.snapshot = FileSnapshotStore(snapshot) if isinstance(snapshot, str) else snapshot
+        # An index built from a scan longer ago than this is rebuilt, to
+        # pick up uploads no instance has merged into the snapshot
+        self.max_age = max_age
+        # How often a loaded index merges in other instances' saves
+        self.refresh = refresh
+        self.save_delay = save_delay
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._bitsets = TTLCache(maxsize=bitset_cache_size, ttl=0)
+        self._usernames = []
+        self._ids = {}
+        self._postings = {}
+        # When the scan this index started from began, and when each user
+        # indexed since was (re)indexed; merges keep the latest per user
+        self._built_at = 0.0
+        self._updated = {}
+        self._loaded = False
+        self._checked_at = 0.0
+        # Snapshot generation last read or written
+        self._generation = None
+        # Updates that arrive before the index is loaded
+        self._pending = {}
+        self._save_timer = None
+        self.version = 0
+        self.saved_version = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._ids)
+
+    def terms(self):
+        with self._lock:
+            return len(self._postings)
+
+    # Building and loading
+
+    def build(self, items):
+        """Replace the index with (username, resume_info) pairs."""
+        state = self._build(items, time.time())
+        with self._lock:
+            self._install(state)
+
+    def _build(self, items, built_at):
+        usernames, ids, postings = [], {}, {}
+        for username, resume_info in items:
+            if username in ids:
+                continue
+            doc = ids[username] = len(usernames)
+            usernames.append(username)
+            for key in resume_terms(resume_info):
+                postings.setdefault(key, array.array(TYPECODE)).append(doc)
+        return {'built_at': built_at, 'updated': {}, 'usernames': usernames, 'ids': ids, 'postings': postings}
+
+    def _state(self):
+        return {'built_at': self._built_at, 'updated': self._updated, 'usernames': self._usernames,
+                'ids': self._ids, 'postings': self._postings}
+
+    def _install(self, state):
+        self._built_at, self._updated = state['built_at'], dict(state['updated'])
+        self._usernames, self._ids, self._postings = state['usernames'], state['ids'], state['postings']
+        self._bitsets.clear()
+        self.version += 1
+
+    def _merge(self, other):
+        """Fold another copy of the index (a snapshot or a fresh scan) into
+        this one: the copy built from the later scan is kept, and each user
+        the other copy (re)indexed after that takes its keys from it."""
+        if other['built_at'] > self._built_at:
+            other, mine = self._state(), other
+            self._install(mine)
+        for username, at in other['updated'].items():
+            if at <= self._updated.get(username, self._built_at):
+                continue
+            doc = other['ids'].get(username)
+            keys = set() if doc is None else {
+                key for key, postings in other['postings'].items() if _contains(postings, doc)}
+            self._set_keys(username, keys, at)
+
+    def _stale(self, now):
+        return bool(self.max_age) and self._built_at < now - self.max_age
+
+    def _up_to_date(self, now):
+        return self._loaded and not self._stale(now) and (not self.refresh or now < self._checked_at + self.refresh)
+
+    def ensure_loaded(self, scan):
+        """Load the snapshot, or build from `scan()` (an iterable of
+        (username, resume_info)) when there is none or it is too old.
+        Once loaded, merges in newer snapshots every `refresh` seconds and
+        rebuilds after `max_age`, while other threads keep searching."""
+        now = time.time()
+        if self._up_to_date(now):
+            return
+        # Only the first load makes searches wait
+        if not self._load_lock.acquire(blocking=not self._loaded):
+            return
+        try:
+            if self._up_to_date(now):
+                return
+            started = time.monotonic()
+            loaded = self._loaded
+            source = 'snapshot'
+            if (not self._pull() and not loaded) or self._stale(now):
+                # Uploads indexed from here on win over what the scan saw
+                built_at = time.time()
+                state = self._build(scan(), built_at)
+                with self._lock:
+                    self._merge(state)
+                source = 'scan'
+                try:
+                    self.save()
+                except Exception:
+                    logging.exception("Saving the skill index snapshot failed")
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._loaded = True
+                for username, (resume_info, at) in pending.items():
+                    self._index(username, resume_info, at)
+            if pending:
+                self._schedule_save()
+            self._checked_at = now
+            if not loaded or source == 'scan':
+                logging.info(f"Skill index loaded from {source}: {len(self)} users, {self.terms()} terms "
+                             f"in {time.monotonic() - started:.2f}s")
+        finally:
+            self._load_lock.release()
+
+    def _encode(self):
+        snapshot = {
+            'format': SNAPSHOT_FORMAT,
+            'byteorder': sys.byteorder,
+            'itemsize': array.array(TYPECODE).itemsize,
+            'built_at': self._built_at,
+            'updated': self._updated,
+            'usernames': self._usernames,
+            'postings': {key: base64.b64encode(postings.tobytes()).decode('ascii')
+                         for key, postings in self._postings.items()},
+        }
+        return zlib.compress(json.dumps(snapshot, separators=(',', ':')).encode('utf-8'), 6)
+
+    def _decode(self, data):
+        try:
+            snapshot = json.loads(zlib.decompress(data))
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable skill index snapshot: {str(e)}")
+            return None
+        if snapshot.get('format') != SNAPSHOT_FORMAT or snapshot.get('itemsize') != array.array(TYPECODE).itemsize:
+            return None
+        postings = {}
+        for key, encoded in snapshot['postings'].items():
+            postings[key] = array.array(TYPECODE)
+            postings[key].frombytes(base64.b64decode(encoded))
+            if snapshot['byteorder'] != sys.byteorder:
+                postings[key].byteswap()
+        usernames = snapshot['usernames']
+        return {
+            'built_at': snapshot['built_at'],
+            'updated': snapshot['updated'],
+            'usernames': usernames,
+            'ids': {username: doc for doc, username in enumerate(usernames)},
+            'postings': postings,
+        }
+
+    def _pull(self):
+        """Merge in the snapshot if another instance has saved since we last
+        read or wrote it; False when there is no usable one."""
+        if not self.snapshot:
+            return False
+        try:
+            if self._generation is not None and self.snapshot.generation() == self._generation:
+                return True
+            data, generation = self.snapshot.read()
+        except Exception as e:
+            logging.warning(f"Reading the skill index snapshot failed: {str(e)}")
+            return False
+        state = None if data is None else self._decode(data)
+        with self._lock:
+            # An unusable snapshot is replaced by the next save
+            self._generation = generation
+            if state is None:
+                return False
+            if state['built_at'] > self._built_at or state['updated']:
+                self._merge(state)
+        return True
+
+    def save(self, attempts=3):
+        """Write the index to the snapshot, first merging in whatever other
+        instances saved since we last read it."""
+        if not self.snapshot:
+            return
+        for _ in range(attempts):
+            self._pull()
+            with self._lock:
+                version = self.version
+                previous = self._generation
+                data = self._encode()
+            generation = self.snapshot.write(data, previous)
+            if generation is not None:
+                with self._lock:
+                    self._generation = generation
+                    self.saved_version = version
+                return
+        logging.warning("Skill index snapshot kept changing while saving; trying again later")
+        self._schedule_save()
+
+    def load(self):
+        """Load the snapshot if it is recent enough; returns False when there
+        is no usable one."""
+        if not self._pull():
+            return False
+        return not self._stale(time.time())
+
+    def _schedule_save(self):
+        if not self.snapshot or not self.save_delay:
+            return
+        with self._lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.save_delay, self._save_later)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _save_later(self):
+        with self._lock:
+            self._save_timer = None
+            if self.version == self.saved_version:
+                return
+        try:
+            self.save()
+        except Exception:
+            logging.exception("Saving the skill index snapshot failed")
+
+    # Incremental updates
+
+    def index(self, username, resume_info):
+        """(Re)index one user's resumeInfo."""
+        with self._lock:
+            if not self._loaded:
+                self._pending[username] = (resume_info, time.time())
+                return
+            self._index(username, resume_info)
+        self._schedule_save()
+
+    def remove(self, username):
+        self.index(username, None)
+
+    def _index(self, username, resume_info, at=None):
+        self._set_keys(username, resume_terms(resume_info), at or time.time())
+
+    def _set_keys(self, username, keys, at):
+        self._updated[username] = at
+        doc = self._ids.get(username)
+        if doc is None:
+            if not keys:
+                return
+            doc = self._ids[username] = len(self._usernames)
+            self._usernames.append(username)
+            old = set()
+        else:
+            # Not stored per user to keep the index small; one bisect per key
+            old = {key for key, postings in self._postings.items() if _contains(postings, doc)}
+        for key in old - keys:
+            self._remove_posting(key, doc)
+        for key in keys - old:
+            self._add_posting(key, doc)
+        self.version += 1
+
+    def _add_posting(self, key, doc):
+        postings = self._postings.setdefault(key, array.array(TYPECODE))
+        if not postings or postings[-1] < doc:
+            postings.append(doc)
+        else:
+            postings.insert(bisect.bisect_left(postings, doc), doc)
+        bitset = self._bitsets.get(key)
+        if bitset is not None:
+            self._bitsets.set(key, bitset | (1 << doc))
+
+    def _remove_posting(self, key, doc):
+        postings = self._postings[key]
+        del postings[bisect.bisect_left(postings, doc)]
+        if not postings:
+            del self._postings[key]
+        bitset = self._bitsets.get(key)
+        if bitset is not None:
+            self._bitsets.set(key, bitset & ~(1 << doc))
+
+    # Queries
+
+    def _bitset(self, key):
+        postings = self._postings.get(key)
+        if not postings:
+            return 0
+        bitset = self._bitsets.get(key)
+        if bitset is None:
+            bitset = to_bitset(postings)
+            if len(postings) >= BITSET_CACHE_MIN:
+                self._bitsets.set(key, bitset)
+        return bitset
+
+    def search(self, skills=(), roles=(), mode='all', offset=0, limit=20):
+        """Return (total, results) for normalized skill and role terms;
+        mode 'all' needs every term, 'any' at least one."""
+        queries = [(f'{SKILL}:{term}', f'{TECH}:{term}') for term in skills]
+        queries += [(f'{ROLE}:{term}', None) for term in roles]
+        if not queries:
+            return 0, []
+        with self._lock:
+            matches = None
+            # Per document: one point per matched term, one more when strong
+            counter = []
+            for strong_key, weak_key in queries:
+                strong = self._bitset(strong_key)
+                match = strong | self._bitset(weak_key) if weak_key else strong
+                if matches is None:
+                    matches = match
+                else:
+                    matches = matches & match if mode == 'all' else matches | match
+                _add_to_counter(counter, match)
+                _add_to_counter(counter, strong)
+
+            total = popcount(matches)
+            results = []
+            skip = offset
+            for score in range(2 * len(queries), 0, -1):
+                if len(results) >= limit or not matches:
+                    break
+                if score >> len(counter):
+                    continue
+                level = matches
+                for i, digit in enumerate(counter):
+                    level = level & digit if score >> i & 1 else level & ~digit
+                count = popcount(level)
+                if skip >= count:
+                    skip -= count
+                    continue
+                for doc in iter_bits(level, skip):
+                    results.append(self._result(doc, score, queries))
+                    if len(results) >= limit:
+                        break
+                skip = 0
+        return total, results
+
+    def _result(self, doc, score, queries):
+        matched = []
+        for strong_key, weak_key in queries:
+            if _contains(self._postings.get(strong_key, ()), doc) or (
+                    weak_key and _contains(self._postings.get(weak_key, ()), doc)):
+                matched.append(strong_key.split(':', 1)[1])
+        return {'username': self._usernames[doc], 'score': score, 'matched': matched}
@@ -0,0 +1,55 @@
+import json
+
+
+class TopLevelFieldParser:
+    """Incrementally scans a streamed JSON object and returns each top-level
+    "key": value pair as soon as the value is complete. Anything before the
+    opening brace (e.g. a ```json fence) is skipped."""
+
+    def __init__(self):
+        self.buffer = ''
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.pair_start = None
+        self.done = False
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        fields = []
+        while self.pos < len(self.buffer) and not self.done:
+            ch = self.buffer[self.pos]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif self.depth == 0:
+                if ch == '{':
+                    self.depth = 1
+                    self.pair_start = self.pos + 1
+            elif ch == '"':
+                self.in_string = True
+            elif ch in '{[':
+                self.depth += 1
+            elif ch in '}]':
+                if self.depth == 1:
+                    fields.extend(self._pair(self.buffer[self.pair_start:self.pos]))
+                    self.done = True
+                self.depth -= 1
+            elif ch == ',' and self.depth == 1:
+                fields.extend(self._pair(self.buffer[self.pair_start:self.pos]))
+                self.pair_start = self.pos + 1
+            self.pos += 1
+        return fields
+
+    def _pair(self, text):
+        if not text.strip():
+            return []
+        try:
+            return list(json.loads('{' + text + '}').items())
+        except json.JSONDecodeError:
+            return []
@@ -0,0 +1,167 @@
+import email.utils
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+VERCEL_API_URL = 'https://api.vercel.com'
+
+# Statuses that mean the request was not acted on and can be sent again
+RETRY_ANY_METHOD = {429, 503}
+# Statuses that are only safe to retry for idempotent requests
+RETRY_IDEMPOTENT = {500, 502, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+
+def connection_refused(error):
+    """True when the request failed before a connection was established,
+    so nothing was sent (as opposed to e.g. a reset after the body went out)."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = error.args[0] if error.args else None
+    # requests wraps urllib3's MaxRetryError, which holds the actual cause
+    reason = getattr(reason, 'reason', reason)
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+def parse_retry_after(value):
+    """Return the delay in seconds from a Retry-After header, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class VercelClient:
+    """Vercel REST client sharing one keep-alive connection pool, with
+    explicit timeouts and jittered exponential backoff on 429/5xx.
+
+    A Retry-After from the server is waited out in full, up to
+    `retry_after_max` seconds; no retry starts later than `deadline`
+    seconds after the first attempt. When the wait would exceed either,
+    the last response (or error) is returned as is."""
+
+    def __init__(self, token, team_id=None, base_url=VERCEL_API_URL,
+                 connect_timeout=3.05, read_timeout=30, max_retries=4,
+                 backoff_base=0.5, backoff_max=8.0, retry_after_max=60.0, deadline=90.0,
+                 pool_maxsize=10):
+        self.base_url = base_url.rstrip('/')
+        self.team_id = team_id
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.deadline = deadline
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        })
+
+        self.calls = deque(maxlen=1000)
+        self._lock = threading.Lock()
+
+    def backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return retry_after
+        # Full jitter: uniform in [0, base * 2^attempt]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _should_retry(self, idempotent, status):
+        return status in RETRY_ANY_METHOD or (idempotent and status in RETRY_IDEMPOTENT)
+
+    def request(self, method, path, params=None, idempotent=None, **kwargs):
+        """Send a request, retrying what is safe to send again. Requests are
+        idempotent by method unless `idempotent` says otherwise (e.g. a
+        content-addressed POST); others are only retried when the server
+        never saw them."""
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        params = dict(params or {})
+        if self.team_id:
+            params.setdefault('teamId', self.team_id)
+        kwargs.setdefault('timeout', self.timeout)
+        url = f"{self.base_url}{path}"
+
+        attempt = 0
+        give_up_at = time.monotonic() + self.deadline
+        while True:
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, params=params, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self._record(method, path, None, time.monotonic() - started, attempt)
+                # A read timeout or a reset may mean the request was processed
+                retryable = idempotent or connection_refused(e)
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+                if time.monotonic() + delay > give_up_at:
+                    raise
+                logging.warning(f"Vercel {method} {path} failed ({str(e)}), retrying in {delay:.2f}s")
+            else:
+                self._record(method, path, response.status_code, time.monotonic() - started, attempt)
+                if not self._should_retry(idempotent, response.status_code) or attempt >= self.max_retries:
+                    return response
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                delay = self.backoff(attempt, retry_after)
+                if (retry_after is not None and retry_after > self.retry_after_max) or \
+                        time.monotonic() + delay > give_up_at:
+                    logging.warning(f"Vercel {method} {path} returned {response.status_code}, "
+                                    f"not retrying: {delay:.1f}s wait is past the deadline")
+                    return response
+                logging.warning(f"Vercel {method} {path} returned {response.status_code}, retrying in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def _record(self, method, path, status, seconds, attempt):
+        logging.debug(f"Vercel {method} {path} -> {status} in {seconds * 1000:.1f}ms (attempt {attempt})")
+        with self._lock:
+            self.calls.append({
+                'method': method,
+                'path': path,
+                'status': status,
+                'seconds': seconds,
+                'attempt': attempt,
+            })
+
+    def latency_summary(self):
+        """Per-endpoint call count and p50/max latency of recent calls in ms."""
+        with self._lock:
+            calls = list(self.calls)
+        by_endpoint = {}
+        for call in calls:
+            by_endpoint.setdefault(f"{call['method']} {call['path']}", []).append(call['seconds'])
+        summary = {}
+        for endpoint, samples in by_endpoint.items():
+            samples.sort()
+            summary[endpoint] = {
+                'count': len(samples),
+                'p50_ms': round(samples[len(samples) // 2] * 1000, 2),
+                'max_ms': round(samples[-1] * 1000, 2),
+            }
+        return summary
@@ -0,0 +1,109 @@
+"""Recovery rate and parse time of parse_openai_response against the
+original regex + line-scanner parser, over bench/malformed_corpus.py.
+
+    python bench/bench_parse_response.py [--size 200] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(BENCH_DIR, '..', 'api'), BENCH_DIR]
+
+from json_recovery import normalize_resume_schema
+from malformed_corpus import build_corpus
+
+
+def legacy_parse_openai_response(response_text):
+    try:
+        return json.loads(response_text)
+    except json.JSONDecodeError:
+        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        if json_match:
+            try:
+                return json.loads(json_match.group())
+            except json.JSONDecodeError:
+                pass
+
+    extracted_info = {"Name": "", "Email": "", "GitHub": "", "LinkedIn": "", "Education": [],
+                      "Professional Experience": [], "Projects": [], "Questions and Answers": [],
+                      "Skills": []}
+
+    def standardize_project(project):
+        if isinstance(project, str):
+            return {"Name": project, "Description": "", "Technologies": []}
+        elif isinstance(project, dict):
+            return {"Name": project.get("Name", ""), "Description": project.get("Description", ""),
+                    "Technologies": project.get("Technologies", [])}
+        return {"Name": "", "Description": "", "Technologies": []}
+
+    current_section = None
+    for line in response_text.split('\n'):
+        line = line.strip()
+        if line in extracted_info:
+            current_section = line
+        elif current_section and line:
+            if current_section == "Projects":
+                extracted_info[current_section].append(standardize_project(line))
+            elif isinstance(extracted_info[current_section], list):
+                extracted_info[current_section].append(line)
+            else:
+                extracted_info[current_section] = line
+
+    extracted_info["Projects"] = [standardize_project(p) for p in extracted_info["Projects"]]
+    return extracted_info
+
+
+def recovered(result, expected, complete):
+    if not isinstance(result, dict) or result.get("Name") != expected["Name"]:
+        return False
+    if not complete:
+        return True
+    return normalize_resume_schema(dict(result)) == normalize_resume_schema(dict(expected))
+
+
+def run(parser, corpus, repeat):
+    by_kind = defaultdict(lambda: [0, 0, 0.0])
+    for kind, text, expected, complete in corpus:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            parser(text)
+        by_kind[kind][2] += (time.perf_counter() - started) / repeat
+    for kind, text, expected, complete in corpus:
+        try:
+            ok = recovered(parser(text), expected, complete)
+        except Exception:
+            ok = False
+        by_kind[kind][0] += ok
+        by_kind[kind][1] += 1
+    return by_kind, sum(v[2] for v in by_kind.values()) / len(corpus)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    import index
+    corpus = build_corpus(args.size)
+    legacy, legacy_time = run(legacy_parse_openai_response, corpus, args.repeat)
+    current, current_time = run(index.parse_openai_response, corpus, args.repeat)
+
+    print(f"{'kind':<24} {'legacy':>8} {'current':>8} {'legacy us':>10} {'current us':>11}")
+    for kind in legacy:
+        total = legacy[kind][1]
+        print(f"{kind:<24} {legacy[kind][0]:>4}/{total:<3} {current[kind][0]:>4}/{total:<3} "
+              f"{legacy[kind][2] / total * 1e6:>10.1f} {current[kind][2] / total * 1e6:>11.1f}")
+    legacy_ok = sum(v[0] for v in legacy.values())
+    current_ok = sum(v[0] for v in current.values())
+    print(f"{'total':<24} {legacy_ok:>4}/{len(corpus):<3} {current_ok:>4}/{len(corpus):<3}")
+    print(f"mean parse time: legacy {legacy_time * 1e6:.1f}us, current {current_time * 1e6:.1f}us")
+
+
+if __name__ == '__main__':
+    main()
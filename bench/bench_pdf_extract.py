@@ -0,0 +1,55 @@
+"""Compare the page-pool extraction engine with the original
+`text += page.extract_text()` loop on 1, 10 and 200 page PDFs.
+
+    python bench/bench_pdf_extract.py [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+from PyPDF2 import PdfReader
+
+from pdf_text import WORKERS, extract_pdf_text
+from synthetic import make_resume_pdf
+
+
+def legacy_extract_text_from_pdf(pdf_file):
+    reader = PdfReader(pdf_file)
+    text = ""
+    for page in reader.pages:
+        text += page.extract_text()
+    return text
+
+
+def timed(fn, pdf_bytes, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(BytesIO(pdf_bytes))
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"process pool workers: {WORKERS}")
+    print(f"{'pages':>6} {'legacy ms':>10} {'engine ms':>10} {'engine (no cap) ms':>19}")
+    for pages in (1, 10, 200):
+        pdf_bytes = make_resume_pdf(pages)
+        legacy = timed(legacy_extract_text_from_pdf, pdf_bytes, args.repeat)
+        engine = timed(extract_pdf_text, pdf_bytes, args.repeat)
+        uncapped = timed(lambda f: extract_pdf_text(f, max_pages=pages, max_total_chars=10 ** 9),
+                         pdf_bytes, args.repeat)
+        print(f"{pages:>6} {legacy * 1000:>10.1f} {engine * 1000:>10.1f} {uncapped * 1000:>19.1f}")
+
+
+if __name__ == '__main__':
+    main()
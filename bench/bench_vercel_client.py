@@ -0,0 +1,67 @@
+"""Drive POST /api/create-vercel-project against the local fake Vercel
+server, with injected 429/503 responses, and report per-endpoint latency,
+how many TCP connections the pooled client opened, and the size of the
+deployment requests.
+
+    python bench/bench_vercel_client.py [--users 20] [--latency 0.01]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(BENCH_DIR, '..', 'api'), BENCH_DIR]
+
+from fake_vercel import FakeVercel
+from fakes import FakeFirestore
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.01)
+    args = parser.parse_args()
+
+    fake = FakeVercel(latency=args.latency).start()
+    os.environ['VERCEL_API_URL'] = fake.url
+    os.environ.setdefault('vtoken', 'fake-token')
+
+    import index
+    # Provisioning records each project in the portfolios collection
+    index.get_db.set(FakeFirestore())
+    client = index.app.test_client()
+
+    # Every fourth user hits a rate limit, every fifth a transient 503
+    statuses = []
+    started = time.perf_counter()
+    for i in range(args.users):
+        if i % 4 == 0:
+            fake.fail_next(429, retry_after=0.05)
+        if i % 5 == 0:
+            fake.fail_next(503)
+        response = client.post('/api/create-vercel-project', json={'username': f"user{i}"})
+        statuses.append(response.status_code)
+    elapsed = time.perf_counter() - started
+    fake.stop()
+
+    print(f"{args.users} provisions in {elapsed:.2f}s, statuses: {sorted(set(statuses))}")
+    print(f"HTTP requests: {len(fake.requests)}, TCP connections opened: {len(fake.connections)}")
+
+    # What the same deployments would have cost with every file inlined
+    from deploy_bundle import user_bundle
+    inline = len(json.dumps({'name': 'user0-resume', 'target': 'production', 'framework': 'nextjs', 'files': [
+        {'file': f['file'], 'data': f['data'].decode()} for f in user_bundle('user0-resume')]}))
+    deploys = [r['bytes'] for r in fake.requests if r['path'] == '/v13/deployments']
+    uploads = [r['bytes'] for r in fake.requests if r['path'] == '/v2/files']
+    print(f"/v13/deployments body: {sum(deploys) / len(deploys):.0f} bytes avg (inlined: {inline} bytes)")
+    print(f"/v2/files uploads: {len(uploads)} ({sum(uploads)} bytes total)")
+    for endpoint, summary in sorted(index.get_vercel_client().latency_summary().items()):
+        print(f"  {endpoint:<24} {summary}")
+    if any(status >= 400 for status in statuses):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
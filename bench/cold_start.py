@@ -0,0 +1,118 @@
+"""Cold-start report for the serverless entry point.
+
+Each measurement runs in a fresh interpreter: the import time of api/index.py
+broken down by module (python -X importtime), and the time to first
+response of each route with the network services replaced by fakes.
+
+    python bench/cold_start.py [--top 15] [--budget-ms 800]
+
+Exits non-zero when importing api/index.py takes longer than --budget-ms.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+API_DIR = os.path.join(BENCH_DIR, '..', 'api')
+
+ROUTES = [
+    ('GET', '/'),
+    ('GET', '/api/resume/ada'),
+    ('GET', '/api/upload/unknown-job'),
+]
+
+FIRST_REQUEST = """
+import json, sys, time
+started = time.perf_counter()
+sys.path[:0] = [{api!r}, {bench!r}]
+import index
+imported = time.perf_counter()
+from fakes import FakeFirestore, FakeOpenAI, SAMPLE_RESUME
+db = FakeFirestore()
+db.collection('users').document('ada').set({{'resumeInfo': SAMPLE_RESUME}})
+index.get_db.set(db)
+index.get_openai_client.set(FakeOpenAI())
+response = index.app.test_client().open({path!r}, method={method!r})
+done = time.perf_counter()
+heavy = [m for m in ('openai', 'PyPDF2', 'requests', 'firebase_admin') if m in sys.modules]
+print(json.dumps({{'import_ms': (imported - started) * 1000,
+                  'first_response_ms': (done - imported) * 1000,
+                  'status': response.status_code, 'heavy_modules': heavy}}))
+"""
+
+CLIENT_INIT = """
+import json, os, sys, time
+sys.path.insert(0, {api!r})
+import index
+timings = {{}}
+for name in ('get_openai_client', 'get_db', 'get_vercel_client'):
+    if name == 'get_db' and 'FIREBASE_CONFIG' not in os.environ:
+        continue
+    started = time.perf_counter()
+    getattr(index, name)()
+    timings[name] = (time.perf_counter() - started) * 1000
+print(json.dumps(timings))
+"""
+
+
+def import_breakdown(top):
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import index'],
+        cwd=API_DIR, capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # Nested imports are indented by two spaces per level; keep the
+        # modules imported directly by index.py
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            rows.append((int(cumulative_us), int(self_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def first_response(method, path):
+    code = FIRST_REQUEST.format(api=API_DIR, bench=BENCH_DIR, method=method, path=path)
+    proc = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--budget-ms', type=float, default=None)
+    args = parser.parse_args()
+
+    print("Modules imported by api/index.py (cumulative ms, self ms)")
+    for cumulative_us, self_us, name in import_breakdown(args.top):
+        print(f"  {cumulative_us / 1000:>8.1f} {self_us / 1000:>8.1f}  {name}")
+
+    print("\nFresh interpreter per route")
+    print(f"  {'route':<32} {'import ms':>10} {'first resp ms':>14}  status  heavy modules loaded")
+    worst_import = 0.0
+    for method, path in ROUTES:
+        result = first_response(method, path)
+        worst_import = max(worst_import, result['import_ms'])
+        print(f"  {method + ' ' + path:<32} {result['import_ms']:>10.1f} "
+              f"{result['first_response_ms']:>14.1f}  {result['status']:>6}  "
+              f"{', '.join(result['heavy_modules']) or '-'}")
+
+    print("\nLazy client construction (first call, no network)")
+    proc = subprocess.run([sys.executable, '-c', CLIENT_INIT.format(api=API_DIR)],
+                          capture_output=True, text=True, env=dict(os.environ, OPENAI=os.environ.get('OPENAI', 'cold-start')))
+    if proc.returncode == 0:
+        for name, ms in json.loads(proc.stdout.strip().splitlines()[-1]).items():
+            print(f"  {name:<32} {ms:>10.1f}")
+    else:
+        print("  skipped: " + proc.stderr.strip().splitlines()[-1])
+
+    if args.budget_ms is not None and worst_import > args.budget_ms:
+        print(f"\nFAIL: import took {worst_import:.1f} ms, budget is {args.budget_ms:.1f} ms")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""Local stand-in for the parts of api.vercel.com that index.py uses.
+
+    fake = FakeVercel().start()
+    os.environ['VERCEL_API_URL'] = fake.url
+    ...
+    fake.stop()
+"""
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeVercel:
+    """`build_time` is how long a deployment takes to become READY (a
+    quarter of it QUEUED, the rest BUILDING); with `fail_builds` it ends
+    in ERROR instead."""
+
+    def __init__(self, latency=0.0, build_time=0.0, fail_builds=False):
+        self.latency = latency
+        self.build_time = build_time
+        self.fail_builds = fail_builds
+        self.projects = {}
+        self.deployments = []
+        self.files = {}
+        self.requests = []
+        self.connections = set()
+        self._faults = deque()
+        self._lock = threading.Lock()
+        self._server = None
+
+    def fail_next(self, status, times=1, retry_after=None):
+        """Answer the next `times` requests with `status` (e.g. 429 or 503)."""
+        headers = {'Retry-After': str(retry_after)} if retry_after is not None else {}
+        with self._lock:
+            self._faults.extend([(status, headers)] * times)
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self, method):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                url = urlparse(self.path)
+                with fake._lock:
+                    fake.connections.add(self.client_address)
+                    fake.requests.append({'method': method, 'path': url.path,
+                                          'bytes': len(raw), 'headers': dict(self.headers)})
+                    fault = fake._faults.popleft() if fake._faults else None
+                if fake.latency:
+                    time.sleep(fake.latency)
+                if fault:
+                    status, headers = fault
+                    return self._send(status, {'error': {'code': 'fault_injected'}}, headers)
+                body = json.loads(raw) if raw and self.headers.get('Content-Type', '').startswith('application/json') else raw
+                status, payload = fake.route(method, url.path, parse_qs(url.query), body, self.headers)
+                self._send(status, payload)
+
+            def _send(self, status, payload, headers=None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._handle('GET')
+
+            def do_POST(self):
+                self._handle('POST')
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _with_state(self, deployment):
+        elapsed = time.time() - deployment['createdAt'] / 1000
+        if elapsed < self.build_time * 0.25:
+            state = 'QUEUED'
+        elif elapsed < self.build_time:
+            state = 'BUILDING'
+        else:
+            state = 'ERROR' if self.fail_builds else 'READY'
+        deployment = dict(deployment, readyState=state, state=state)
+        if state == 'ERROR':
+            deployment['errorMessage'] = 'Build failed'
+        return deployment
+
+    def route(self, method, path, query, body, headers):
+        if method == 'POST' and path == '/v9/projects':
+            with self._lock:
+                if body['name'] in self.projects:
+                    return 409, {'error': {'code': 'conflict'}}
+                project = {'id': f"prj_{uuid.uuid4().hex[:12]}", 'name': body['name']}
+                self.projects[body['name']] = project
+            return 200, project
+
+        if method == 'GET' and path == '/v6/deployments':
+            project_id = query.get('projectId', [None])[0]
+            since = int(query.get('since', [0])[0])
+            limit = int(query.get('limit', [20])[0])
+            with self._lock:
+                found = [self._with_state(d) for d in reversed(self.deployments)
+                         if (project_id is None or d['projectId'] == project_id) and d['createdAt'] > since]
+            return 200, {'deployments': found[:limit]}
+
+        if method == 'GET' and path.startswith('/v13/deployments/'):
+            deployment_id = path.rsplit('/', 1)[1]
+            with self._lock:
+                found = [d for d in self.deployments if d['id'] == deployment_id]
+            if not found:
+                return 404, {'error': {'code': 'not_found'}}
+            return 200, self._with_state(found[0])
+
+        if method == 'POST' and path == '/v2/files':
+            digest = headers.get('x-vercel-digest')
+            if hashlib.sha1(body).hexdigest() != digest:
+                return 400, {'error': {'code': 'invalid_digest'}}
+            with self._lock:
+                self.files[digest] = body
+            return 200, {}
+
+        if method == 'POST' and path == '/v13/deployments':
+            with self._lock:
+                missing = [f['sha'] for f in body.get('files', [])
+                           if 'sha' in f and f['sha'] not in self.files]
+            if missing:
+                return 400, {'error': {'code': 'missing_files', 'missing': missing}}
+            with self._lock:
+                project = self.projects.get(body['name'])
+                deployment_id = f"dpl_{uuid.uuid4().hex[:12]}"
+                deployment = {
+                    'id': deployment_id,
+                    'uid': deployment_id,
+                    'name': body['name'],
+                    'projectId': project['id'] if project else None,
+                    'url': f"{body['name']}-{deployment_id[4:10]}.vercel.app",
+                    'readyState': 'QUEUED',
+                    'createdAt': int(time.time() * 1000),
+                }
+                self.deployments.append(deployment)
+            return 200, deployment
+
+        return 404, {'error': {'code': 'not_found', 'message': f"{method} {path}"}}
@@ -0,0 +1,252 @@
+"""Offline stand-ins for the services api/index.py talks to."""
+import copy
+import json
+import re
+import threading
+import time
+import types
+
+SAMPLE_RESUME = {
+    "Name": "Ada Lovelace",
+    "Email": "ada@example.com",
+    "GitHub": "https://github.com/ada",
+    "LinkedIn": "",
+    "Education": ["BSc Mathematics"],
+    "Professional Experience": [
+        {"Role": "Software Engineer", "Duration": "2019 - present",
+         "Description": "Built analytical engines."}
+    ],
+    "Projects": [
+        {"Name": "Engine", "Description": "Difference engine firmware",
+         "Technologies": ["Python", "Go"]}
+    ],
+    "Questions and Answers": [
+        {"Question": "What is your focus?", "Answer": "Numerical computing."}
+    ],
+    "Skills": ["Python", "Go", "Kubernetes"],
+}
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+
+FIELD_PATH_SEGMENT = re.compile(r'`((?:[^`\\]|\\.)*)`|([^.`]+)')
+
+
+def _segments(path):
+    return [quoted or plain for quoted, plain in FIELD_PATH_SEGMENT.findall(path)]
+
+
+def _set_field(document, path, value):
+    segments = _segments(path)
+    for segment in segments[:-1]:
+        document = document.setdefault(segment, {})
+    document[segments[-1]] = value
+
+
+def _apply_field_mask(data, field_paths):
+    """Keep only the (dotted, backtick-quoted) field paths, like a
+    Firestore read with a field mask."""
+    masked = {}
+    for path in field_paths:
+        segments = _segments(path)
+        source, target = data, masked
+        for i, segment in enumerate(segments):
+            if not isinstance(source, dict) or segment not in source:
+                break
+            if i == len(segments) - 1:
+                target[segment] = source[segment]
+            else:
+                source = source[segment]
+                target = target.setdefault(segment, {})
+    return masked
+
+
+class FakeDocument:
+    def __init__(self, db, collection, doc_id):
+        self._db = db
+        self._collection = collection
+        self.id = doc_id
+
+    def _store(self):
+        return self._db.data.setdefault(self._collection, {})
+
+    def get(self, field_paths=None, **kwargs):
+        self._db.rpc()
+        self._db.reads += 1
+        with self._db.lock:
+            data = copy.deepcopy(self._store().get(self.id))
+        if data is not None and field_paths is not None:
+            data = _apply_field_mask(data, field_paths)
+        return FakeSnapshot(self.id, data)
+
+    def set(self, data, merge=False, rpc=True):
+        """`merge` may also be a list of field paths: only those are
+        replaced, with their values taken from `data`."""
+        if rpc:
+            self._db.rpc()
+        self._db.writes += 1
+        self._db.write_bytes += len(json.dumps(data, default=str))
+        with self._db.lock:
+            data = copy.deepcopy(data)
+            if isinstance(merge, list):
+                document = self._store().setdefault(self.id, {})
+                for path in merge:
+                    value = data
+                    for segment in _segments(path):
+                        value = value[segment]
+                    _set_field(document, path, value)
+            elif merge and self.id in self._store():
+                self._store()[self.id].update(data)
+            else:
+                self._store()[self.id] = data
+
+    def update(self, data):
+        """Keys are field paths, as in Firestore's update()."""
+        self._db.rpc()
+        self._db.writes += 1
+        self._db.write_bytes += len(json.dumps(data, default=str))
+        with self._db.lock:
+            if self.id not in self._store():
+                raise KeyError(f"No document to update: {self._collection}/{self.id}")
+            for path, value in data.items():
+                _set_field(self._store()[self.id], path, copy.deepcopy(value))
+
+    def delete(self):
+        self._db.rpc()
+        self._db.writes += 1
+        with self._db.lock:
+            self._store().pop(self.id, None)
+
+
+class FakeCollection:
+    def __init__(self, db, name):
+        self._db = db
+        self.name = name
+
+    def stream(self):
+        self._db.rpc()
+        self._db.reads += 1
+        with self._db.lock:
+            docs = copy.deepcopy(self._db.data.get(self.name, {}))
+        return [FakeSnapshot(doc_id, data) for doc_id, data in docs.items()]
+
+    def select(self, field_paths):
+        return FakeQuery(self, field_paths)
+
+    def document(self, doc_id):
+        return FakeDocument(self._db, self.name, doc_id)
+
+
+class FakeQuery:
+    def __init__(self, collection, field_paths):
+        self._collection = collection
+        self._field_paths = field_paths
+
+    def stream(self):
+        db = self._collection._db
+        db.rpc()
+        db.reads += 1
+        with db.lock:
+            docs = list(db.data.get(self._collection.name, {}).items())
+        for doc_id, data in docs:
+            yield FakeSnapshot(doc_id, copy.deepcopy(_apply_field_mask(data, self._field_paths)))
+
+
+class FakeWriteBatch:
+    def __init__(self, db):
+        self._db = db
+        self._writes = []
+
+    def set(self, document, data, merge=False):
+        self._writes.append((document, data, merge))
+
+    def commit(self):
+        self._db.rpc()
+        self._db.commits += 1
+        for document, data, merge in self._writes:
+            document.set(data, merge=merge, rpc=False)
+
+
+class FakeFirestore:
+    """Dict-backed replacement for the small part of firestore.Client we use.
+    Every RPC (a read, write or batch commit) takes `latency` seconds."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.data = {}
+        self.reads = 0
+        self.writes = 0
+        self.write_bytes = 0
+        self.commits = 0
+        self.lock = threading.Lock()
+
+    def rpc(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+
+class FakeOpenAI:
+    """Returns `content` (SAMPLE_RESUME by default) after `latency` seconds;
+    `content` may also be a function of the request's messages and
+    `latency` a function returning each call's latency (to inject slow
+    tails). A call slower than its `timeout` raises TimeoutError after
+    it. With stream=True the content arrives in `stream_chunks` deltas
+    spread evenly over the latency. Usage is estimated at ~4 characters
+    per token."""
+
+    def __init__(self, content=None, latency=0.0, stream_chunks=20):
+        self.content = content if content is not None else json.dumps(SAMPLE_RESUME)
+        self.latency = latency
+        self.stream_chunks = stream_chunks
+        self.calls = 0
+        self.tokens = 0
+        self.chat = types.SimpleNamespace(completions=self)
+
+    def _content(self, messages):
+        return self.content(messages) if callable(self.content) else self.content
+
+    def _latency(self):
+        return self.latency() if callable(self.latency) else self.latency
+
+    def create(self, messages=(), stream=False, timeout=None, **kwargs):
+        self.calls += 1
+        content = self._content(messages)
+        latency = self._latency()
+        if stream:
+            return self._stream(content, latency)
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Request timed out after {timeout}s")
+        if latency:
+            time.sleep(latency)
+        usage = types.SimpleNamespace(
+            prompt_tokens=sum(len(m['content']) for m in messages) // 4,
+            completion_tokens=len(content) // 4)
+        self.tokens += usage.prompt_tokens + usage.completion_tokens
+        message = types.SimpleNamespace(content=content)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=usage)
+
+    def _stream(self, content, latency):
+        size = -(-len(content) // self.stream_chunks)
+        for start in range(0, len(content), size):
+            if latency:
+                time.sleep(latency / self.stream_chunks)
+            delta = types.SimpleNamespace(content=content[start:start + size])
+            yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)])
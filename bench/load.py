@@ -0,0 +1,437 @@
+"""End-to-end load and soak test for api/index.py.
+
+The app is served by werkzeug's threaded server on a local port, with
+OpenAI, Firestore and Vercel replaced by the stand-ins in fakes.py and
+fake_vercel.py (each with a configurable latency), and driven over HTTP by
+`concurrency` closed-loop clients picking routes from a weighted mix.
+
+    python bench/load.py                                  # 10s at 8 clients
+    python bench/load.py --concurrency 1,4,16,32          # step up the load, 10s per step
+    python bench/load.py --mix resume=1 --duration 30     # reads only
+    python bench/load.py --duration 1800 --tracemalloc    # soak: watch memory over 30 min
+    python bench/load.py --slo upload.p95=1500 --slo resume.error_rate=0
+    python bench/load.py --save-baseline                  # record bench/load_baseline.json on this machine
+    python bench/load.py --compare                        # fail if p95 or throughput regressed
+    python bench/load.py --url http://localhost:3000      # an already running app (no memory tracking)
+
+Mix keys are `upload` (POST /api/upload), `resume` (GET /api/resume/<u>)
+and `deploy` (POST /api/create-vercel-project). Per route it reports
+throughput and p50/p95/p99/max latency; 429s from admission control are
+counted as rejected, any other 4xx/5xx or connection error as an error.
+RSS (and with --tracemalloc, traced Python memory) is sampled during the
+run; the growth after warmup, and the source lines that grew the most,
+show leaks on long runs.
+
+Results are written to --output as {"meta", "steps": [...], "memory"}.
+Exits non-zero when an --slo, --min-rps, --max-rss-growth-mb or the
+--compare baseline check fails.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+API_DIR = os.path.join(BENCH_DIR, '..', 'api')
+sys.path[:0] = [API_DIR, BENCH_DIR]
+
+from fake_vercel import FakeVercel
+from fakes import SAMPLE_RESUME, FakeFirestore, FakeOpenAI
+from synthetic import resume_corpus
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'load_baseline.json')
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, 'load_results.json')
+
+ROUTES = {
+    'upload': 'POST /api/upload',
+    'resume': 'GET /api/resume/<u>',
+    'deploy': 'POST /api/create-vercel-project',
+}
+# Latency samples kept per route and step; longer runs keep a uniform
+# sample so a soak run's own bookkeeping stays bounded
+RESERVOIR_SIZE = 20000
+SLO_METRICS = ('p50', 'p95', 'p99', 'max', 'error_rate', 'rejected_rate')
+
+
+class RouteStats:
+    """Counts and a reservoir of latencies for one route."""
+
+    def __init__(self, rng):
+        self.count = 0
+        self.errors = 0
+        self.rejected = 0
+        self.statuses = {}
+        self.samples = []
+        self._rng = rng
+        self._lock = threading.Lock()
+
+    def add(self, ms, status):
+        with self._lock:
+            self.count += 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if status == 429:
+                self.rejected += 1
+            elif status is None or status >= 400:
+                self.errors += 1
+            if len(self.samples) < RESERVOIR_SIZE:
+                self.samples.append(ms)
+            else:
+                i = self._rng.randrange(self.count)
+                if i < RESERVOIR_SIZE:
+                    self.samples[i] = ms
+
+    def summary(self, seconds):
+        samples = sorted(self.samples)
+
+        def quantile(q):
+            return round(samples[min(len(samples) - 1, int(len(samples) * q))], 2) if samples else None
+
+        return {
+            'requests': self.count,
+            'rps': round(self.count / seconds, 2),
+            'p50_ms': quantile(0.5),
+            'p95_ms': quantile(0.95),
+            'p99_ms': quantile(0.99),
+            'max_ms': round(samples[-1], 2) if samples else None,
+            'error_rate': round(self.errors / self.count, 4) if self.count else 0.0,
+            'rejected_rate': round(self.rejected / self.count, 4) if self.count else 0.0,
+            'statuses': {str(status): n for status, n in sorted(self.statuses.items(), key=str)},
+        }
+
+
+def rss_kb():
+    """Current resident set size; the peak where /proc isn't available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+class MemorySampler:
+    """Samples RSS (and traced memory) every `interval` seconds."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.samples = []
+        self._started = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def sample(self):
+        traced = tracemalloc.get_traced_memory()[0] // 1024 if tracemalloc.is_tracing() else None
+        self.samples.append([round(time.monotonic() - self._started, 1), rss_kb(), traced])
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        key, _, weight = part.partition('=')
+        key = key.strip()
+        if key not in ROUTES:
+            raise argparse.ArgumentTypeError(f"unknown mix key {key!r} (expected {', '.join(ROUTES)})")
+        mix[key] = float(weight or 1)
+    return mix
+
+
+def parse_slo(value):
+    """'upload.p95=1500' -> ('upload', 'p95', 1500.0)"""
+    target, _, limit = value.partition('=')
+    key, _, metric = target.partition('.')
+    if key not in ROUTES or metric not in SLO_METRICS or not limit:
+        raise argparse.ArgumentTypeError(
+            f"expected <{'|'.join(ROUTES)}>.<{'|'.join(SLO_METRICS)}>=<limit>, got {value!r}")
+    return key, metric, float(limit)
+
+
+def start_app(args, workdir):
+    """Serve api/index.py locally against fakes; returns (url, stop)."""
+    fake_vercel = FakeVercel(latency=args.vercel_latency).start()
+    os.environ['VERCEL_API_URL'] = fake_vercel.url
+    os.environ.setdefault('vtoken', 'load-token')
+    # The fake model has no quota and the synthetic users upload often
+    os.environ.setdefault('OPENAI_TPM', str(10 ** 9))
+    os.environ.setdefault('USER_UPLOADS_PER_MINUTE', '0')
+    os.environ.setdefault('RESUME_STORE_PATH', os.path.join(workdir, 'resumes.sqlite3'))
+    os.environ.setdefault('SKILL_INDEX_SNAPSHOT', os.path.join(workdir, 'skill_index.snapshot'))
+    os.environ.setdefault('ADMISSION_STORE_PATH', os.path.join(workdir, 'limits.sqlite3'))
+
+    from werkzeug.serving import make_server
+    import index
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    db = FakeFirestore()
+    for i in range(args.users):
+        db.data.setdefault('users', {})[f"load{i}"] = {
+            'resumeInfo': SAMPLE_RESUME, 'filename': 'cv.pdf', 'originalFilename': 'cv.pdf'}
+    db.latency = args.db_latency
+    index.get_db.set(db)
+    index.get_openai_client.set(FakeOpenAI(latency=args.openai_latency))
+
+    server = make_server('127.0.0.1', 0, index.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def stop():
+        server.shutdown()
+        fake_vercel.stop()
+
+    return f"http://127.0.0.1:{server.server_port}", stop
+
+
+def make_actions(url, args):
+    corpus = resume_corpus(args.corpus, max_pages=3, seed=17)
+    new_projects = iter(range(10 ** 9))
+
+    def upload(session, rng):
+        return session.post(f"{url}/api/upload", timeout=args.timeout, files={
+            'file': ('cv.pdf', rng.choice(corpus), 'application/pdf')}, data={
+            'username': f"load{rng.randrange(args.users)}", 'filename': 'cv.pdf'}).status_code
+
+    def resume(session, rng):
+        return session.get(f"{url}/api/resume/load{rng.randrange(args.users)}", timeout=args.timeout).status_code
+
+    def deploy(session, rng):
+        if rng.random() < args.new_projects:
+            username = f"load-new{next(new_projects)}-{os.getpid()}"
+        else:
+            username = f"load{rng.randrange(args.users)}"
+        return session.post(f"{url}/api/create-vercel-project", json={'username': username},
+                            timeout=args.timeout).status_code
+
+    return {'upload': upload, 'resume': resume, 'deploy': deploy}
+
+
+def run_step(actions, mix, concurrency, duration, seed):
+    """`concurrency` clients for `duration` seconds; returns (stats, seconds)."""
+    import requests
+
+    keys = list(mix)
+    weights = [mix[key] for key in keys]
+    stats = {key: RouteStats(random.Random(seed)) for key in keys}
+    deadline = time.monotonic() + duration
+
+    def client(worker):
+        rng = random.Random(seed * 1000 + worker)
+        with requests.Session() as session:
+            while time.monotonic() < deadline:
+                key = rng.choices(keys, weights)[0]
+                started = time.perf_counter()
+                try:
+                    status = actions[key](session, rng)
+                except requests.RequestException:
+                    status = None
+                stats[key].add((time.perf_counter() - started) * 1000, status)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats, time.monotonic() - started
+
+
+def top_growth(before, after, limit):
+    """Source lines whose traced allocations grew the most."""
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    diff = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'lineno')
+    return [{'line': str(stat.traceback[0]), 'size_diff_kb': stat.size_diff // 1024, 'count_diff': stat.count_diff}
+            for stat in diff[:limit] if stat.size_diff > 0]
+
+
+def check_slos(steps, slos, min_rps):
+    failures = []
+    for step in steps:
+        label = f"concurrency {step['concurrency']}"
+        for key, metric, limit in slos:
+            route = step['routes'].get(ROUTES[key])
+            if not route:
+                continue
+            name = metric if metric.endswith('rate') else f"{metric}_ms"
+            if route[name] is not None and route[name] > limit:
+                failures.append(f"{label}: {ROUTES[key]} {name} {route[name]} > {limit}")
+        if min_rps is not None and step['rps'] < min_rps:
+            failures.append(f"{label}: {step['rps']} requests/s < {min_rps}")
+    return failures
+
+
+def compare(steps, baseline, tolerance):
+    """Regressions against a baseline run: a route's p95 more than
+    `tolerance` slower, or a step's throughput more than `tolerance`
+    (as a fraction) lower."""
+    failures = []
+    base_steps = {step['concurrency']: step for step in baseline.get('steps', [])}
+    for step in steps:
+        base = base_steps.get(step['concurrency'])
+        if not base:
+            continue
+        label = f"concurrency {step['concurrency']}"
+        if step['rps'] < base['rps'] / (1 + tolerance):
+            failures.append(f"{label}: {base['rps']} -> {step['rps']} requests/s")
+        for route, result in step['routes'].items():
+            base_route = base['routes'].get(route)
+            if not base_route or result['p95_ms'] is None or base_route['p95_ms'] is None:
+                continue
+            # Differences under a millisecond are noise
+            if result['p95_ms'] > base_route['p95_ms'] * (1 + tolerance) + 1:
+                failures.append(f"{label}: {route} p95 {base_route['p95_ms']} ms -> {result['p95_ms']} ms")
+    return failures
+
+
+def print_step(step):
+    print(f"concurrency {step['concurrency']}: {step['requests']} requests in {step['seconds']}s, "
+          f"{step['rps']} requests/s")
+    for route, result in step['routes'].items():
+        print(f"  {route:<32} {result['rps']:>8.1f}/s  p50 {result['p50_ms'] or 0:>8.1f}  "
+              f"p95 {result['p95_ms'] or 0:>8.1f}  p99 {result['p99_ms'] or 0:>8.1f}  "
+              f"max {result['max_ms'] or 0:>8.1f} ms  errors {result['error_rate']:.2%}  "
+              f"rejected {result['rejected_rate']:.2%}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', help="load an already running app instead of a local one")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('resume=8,upload=1,deploy=1'),
+                        help="weighted route mix, e.g. resume=8,upload=1,deploy=1")
+    parser.add_argument('--concurrency', default='8', help="clients per step, e.g. 1,4,16")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds per step")
+    parser.add_argument('--warmup', type=float, default=2.0, help="unmeasured seconds before the first step")
+    parser.add_argument('--users', type=int, default=200, help="distinct usernames")
+    parser.add_argument('--corpus', type=int, default=50, help="distinct PDFs to upload")
+    parser.add_argument('--new-projects', type=float, default=0.1,
+                        help="fraction of deploy requests for a user without a project")
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--openai-latency', type=float, default=0.5)
+    parser.add_argument('--db-latency', type=float, default=0.005)
+    parser.add_argument('--vercel-latency', type=float, default=0.02)
+    parser.add_argument('--tracemalloc', action='store_true', help="trace Python allocations (slower)")
+    parser.add_argument('--sample-interval', type=float, default=1.0, help="seconds between memory samples")
+    parser.add_argument('--slo', type=parse_slo, action='append', default=[],
+                        help="fail above a limit, e.g. upload.p95=1500 or resume.error_rate=0.01")
+    parser.add_argument('--min-rps', type=float, help="fail below this many requests/s in any step")
+    parser.add_argument('--max-rss-growth-mb', type=float, help="fail if RSS grows more after warmup")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help="allowed p95 slowdown / throughput drop relative to the baseline")
+    args = parser.parse_args()
+    if args.save_baseline and args.compare:
+        parser.error("--compare with --save-baseline would compare the run with itself")
+    if args.compare and not os.path.exists(args.baseline):
+        parser.error(f"no baseline at {args.baseline}; record one with --save-baseline first")
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    workdir = tempfile.mkdtemp(prefix='load-')
+    local = args.url is None
+    if local:
+        url, stop = start_app(args, workdir)
+    else:
+        url, stop = args.url.rstrip('/'), (lambda: None)
+    actions = make_actions(url, args)
+
+    steps = []
+    memory = None
+    try:
+        if args.warmup:
+            run_step(actions, args.mix, max(levels), args.warmup, args.seed)
+        if local:
+            if args.tracemalloc:
+                tracemalloc.start()
+            sampler = MemorySampler(args.sample_interval)
+            sampler.sample()
+            before = tracemalloc.take_snapshot() if args.tracemalloc else None
+            sampler.start()
+        for i, concurrency in enumerate(levels):
+            stats, seconds = run_step(actions, args.mix, concurrency, args.duration, args.seed + i + 1)
+            routes = {ROUTES[key]: route.summary(seconds) for key, route in stats.items()}
+            total = sum(route['requests'] for route in routes.values())
+            steps.append({'concurrency': concurrency, 'seconds': round(seconds, 2), 'requests': total,
+                          'rps': round(total / seconds, 2), 'routes': routes})
+            print_step(steps[-1])
+        if local:
+            sampler.stop()
+            first, last = sampler.samples[0], sampler.samples[-1]
+            memory = {
+                'samples': sampler.samples,
+                'rss_start_kb': first[1],
+                'rss_end_kb': last[1],
+                'rss_growth_kb': last[1] - first[1],
+                'rss_peak_kb': max(sample[1] for sample in sampler.samples),
+            }
+            if args.tracemalloc:
+                memory['traced_growth_kb'] = last[2] - first[2]
+                memory['top_growth'] = top_growth(before, tracemalloc.take_snapshot(), 10)
+                tracemalloc.stop()
+    finally:
+        stop()
+
+    if memory:
+        print(f"RSS {memory['rss_start_kb'] // 1024} MB -> {memory['rss_end_kb'] // 1024} MB "
+              f"(peak {memory['rss_peak_kb'] // 1024} MB)")
+        if args.tracemalloc:
+            print(f"traced memory grew {memory['traced_growth_kb']} KB; largest growth:")
+            for stat in memory['top_growth']:
+                print(f"  {stat['size_diff_kb']:>8} KB {stat['count_diff']:>+8}  {stat['line']}")
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'url': args.url,
+            'mix': args.mix,
+            'duration': args.duration,
+            'openai_latency': args.openai_latency,
+            'db_latency': args.db_latency,
+            'vercel_latency': args.vercel_latency,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        },
+        'steps': steps,
+        'memory': memory,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline written to {args.baseline}")
+
+    failures = check_slos(steps, args.slo, args.min_rps)
+    if memory and args.max_rss_growth_mb is not None and memory['rss_growth_kb'] > args.max_rss_growth_mb * 1024:
+        failures.append(f"RSS grew {memory['rss_growth_kb'] // 1024} MB > {args.max_rss_growth_mb} MB")
+    if args.compare:
+        with open(args.baseline) as f:
+            failures += compare(steps, json.load(f), args.tolerance)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
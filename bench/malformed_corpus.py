@@ -0,0 +1,73 @@
+"""Corpus of damaged completions in the shapes gpt-3.5-turbo produces:
+code fences, prose around the object (with braces of its own), trailing
+commas, truncation at max_tokens, and plain-text headings instead of JSON.
+
+Each case is (kind, completion, expected document, fully_recoverable).
+Truncated cases can only be expected to recover the fields before the cut.
+"""
+import json
+import random
+import re
+
+from synthetic import FIRST_NAMES, LAST_NAMES, ROLES, SKILLS
+
+
+def sample_resume(rng):
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    return {
+        "Name": name,
+        "Email": f"{name.split()[0].lower()}@example.com",
+        "GitHub": f"https://github.com/{name.split()[0].lower()}",
+        "LinkedIn": "",
+        "Education": [f"BSc Computer Science, {rng.randint(2005, 2020)}"],
+        "Professional Experience": [
+            {"Role": rng.choice(ROLES), "Duration": f"{rng.randint(2010, 2020)} - present",
+             "Description": "Owned the {billing} pipeline, cut p99 latency by 40%."}
+            for _ in range(rng.randint(1, 4))
+        ],
+        "Projects": [
+            {"Name": f"Project {i}", "Description": "CLI for \"fast\" deploys",
+             "Technologies": rng.sample(SKILLS, 3)}
+            for i in range(rng.randint(1, 4))
+        ],
+        "Questions and Answers": [
+            {"Question": "Why this stack?", "Answer": "It scales, {mostly}."}
+        ],
+        "Skills": rng.sample(SKILLS, 6),
+    }
+
+
+def with_trailing_commas(text):
+    # Comma after the last member of every multi-line array/object
+    return re.sub(r'(["\d\]}])(\s*\n\s*[\]}])', r'\1,\2', text)
+
+
+def as_headings(doc):
+    lines = []
+    for key in ("Name", "Email", "GitHub", "Skills", "Education"):
+        lines.append(key)
+        values = doc[key] if isinstance(doc[key], list) else [doc[key]]
+        lines.extend(v for v in values if v)
+    return "\n".join(lines)
+
+
+def build_corpus(size=200, seed=7):
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(size // 10):
+        doc = sample_resume(rng)
+        pretty = json.dumps(doc, indent=2)
+        compact = json.dumps(doc)
+        cases.append(("clean", compact, doc, True))
+        cases.append(("fenced", f"```json\n{pretty}\n```", doc, True))
+        cases.append(("prose", f"Sure! Here is the {{extracted}} data:\n{pretty}\n"
+                               "Let me know if you need {anything} else.", doc, True))
+        cases.append(("trailing_commas", with_trailing_commas(pretty), doc, True))
+        cases.append(("fenced_trailing_commas",
+                      f"```json\n{with_trailing_commas(pretty)}\n```", doc, True))
+        for fraction in (0.3, 0.6, 0.9):
+            cut = pretty[:int(len(pretty) * fraction)]
+            cases.append((f"truncated_{int(fraction * 100)}", cut, doc, False))
+        cases.append(("fenced_truncated", "```json\n" + pretty[:int(len(pretty) * 0.8)], doc, False))
+        cases.append(("headings", as_headings(doc), doc, False))
+    return cases
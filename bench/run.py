@@ -0,0 +1,482 @@
+"""Offline per-stage micro-benchmarks for api/index.py.
+
+OpenAI, Firestore and Vercel are replaced by the stand-ins in fakes.py and
+fake_vercel.py, so no credentials or network access are needed.
+
+    python bench/run.py                          # run, print, write results JSON
+    python bench/run.py --only upload            # benchmarks whose name contains 'upload'
+    python bench/run.py --save-baseline          # store results as bench/baseline.json
+    python bench/run.py --compare                # fail if p50 regressed past --tolerance
+
+Results are written to --output (bench/results.json by default) as
+{"meta": {...}, "results": {name: {"p50_ms", "p95_ms", "mean_ms", "min_ms", "n", ...}}}.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+API_DIR = os.path.join(BENCH_DIR, '..', 'api')
+sys.path[:0] = [API_DIR, BENCH_DIR]
+
+from fake_vercel import FakeVercel
+from fakes import SAMPLE_RESUME, FakeFirestore, FakeOpenAI
+from malformed_corpus import build_corpus
+from synthetic import (SKILLS, make_pdf, make_resume_pdf, resume_corpus, resume_page_text, sectioned_resume_text,
+                       skill_profiles)
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, 'results.json')
+
+
+class Bench:
+    """Registry of named benchmarks; each is a zero-argument callable run
+    `iterations` times after `warmup` untimed runs."""
+
+    def __init__(self):
+        self.cases = []
+
+    def case(self, name, iterations=50, warmup=3):
+        def register(fn):
+            self.cases.append((name, fn, iterations, warmup))
+            return fn
+        return register
+
+    def run(self, only=None, scale=1.0):
+        results = {}
+        for name, fn, iterations, warmup in self.cases:
+            if only and not any(part in name for part in only):
+                continue
+            iterations = max(3, int(iterations * scale))
+            extra = {}
+            for _ in range(warmup):
+                fn()
+            samples = []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                extra = fn() or extra
+                samples.append((time.perf_counter() - started) * 1000)
+            samples.sort()
+            results[name] = {
+                'n': iterations,
+                'p50_ms': round(statistics.median(samples), 4),
+                'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+                'mean_ms': round(statistics.fmean(samples), 4),
+                'min_ms': round(samples[0], 4),
+                **extra,
+            }
+            print(f"  {name:<40} p50 {results[name]['p50_ms']:>9.3f} ms   "
+                  f"p95 {results[name]['p95_ms']:>9.3f} ms", flush=True)
+        return results
+
+
+def discard(fn, *args):
+    """Wrap fn(*args) so its return value isn't mistaken for extra metrics."""
+    def call():
+        fn(*args)
+    return call
+
+
+def setup_app(openai_latency):
+    fake_vercel = FakeVercel().start()
+    os.environ['VERCEL_API_URL'] = fake_vercel.url
+    os.environ.setdefault('vtoken', 'bench-token')
+    # The fake model has no quota; don't let the admission budget throttle it
+    os.environ.setdefault('OPENAI_TPM', str(10 ** 9))
+    # Benchmarks upload as the same user over and over
+    os.environ.setdefault('USER_UPLOADS_PER_MINUTE', '0')
+
+    import index
+    db = FakeFirestore()
+    openai = FakeOpenAI(latency=openai_latency)
+    index.get_db.set(db)
+    index.get_openai_client.set(openai)
+    return index, db, openai, fake_vercel
+
+
+def register_benchmarks(bench, index, db):
+    client = index.app.test_client()
+    counter = iter(range(10 ** 9))
+
+    pdfs = {pages: make_resume_pdf(pages, seed=pages) for pages in (1, 3, 10)}
+    for pages, pdf in pdfs.items():
+        bench.case(f"extract_text_from_pdf[{pages}p]", iterations=20 if pages > 3 else 50)(
+            discard(lambda pdf=pdf: index.extract_text_from_pdf(io.BytesIO(pdf))))
+
+    corpus = build_corpus(50)
+    by_kind = {}
+    for kind, text, _, _ in corpus:
+        by_kind.setdefault(kind, text)
+    for kind in ('clean', 'prose', 'trailing_commas', 'truncated_60'):
+        bench.case(f"parse_openai_response[{kind}]", iterations=500)(
+            discard(index.parse_openai_response, by_kind[kind]))
+
+    rng = random.Random(3)
+    long_text = "\n".join(resume_page_text(rng, i) for i in range(3))
+
+    @bench.case("prompt_build[3 pages]", iterations=200)
+    def prompt_build():
+        text = index.normalize_resume_text(long_text)
+        index.count_tokens(text, index.OPENAI_MODEL)
+        index.build_prompt(text)
+
+    # Tokens per document when one field comes back broken: a targeted
+    # re-ask (of just the Experience section) versus the whole extraction
+    # repeated
+    sectioned_text = sectioned_resume_text(random.Random(11))
+    broken = dict(SAMPLE_RESUME, **{'Professional Experience': [{'Role': 'Engineer'}]})
+
+    def reask_completion(messages):
+        if messages[-1]['content'].startswith('An earlier extraction'):
+            return json.dumps({'Professional Experience': SAMPLE_RESUME['Professional Experience']})
+        return json.dumps(broken)
+
+    for label, content in (('clean', None), ('reask', reask_completion)):
+        @bench.case(f"extract_resume_info[{label}]", iterations=100)
+        def extract(content=content):
+            fake = FakeOpenAI(content=content)
+            previous = index.get_openai_client()
+            index.get_openai_client.set(fake)
+            try:
+                index.extract_resume_info(sectioned_text)
+            finally:
+                index.get_openai_client.set(previous)
+            return {'llm_calls': fake.calls, 'tokens': fake.tokens}
+
+    # A model whose calls occasionally stall: one attempt per call versus
+    # a hedge after the backend's p95 ('p99_ms' covers every call so far)
+    def slow_tail(rng=random.Random(7)):
+        return 0.4 if rng.random() < 0.03 else rng.uniform(0.015, 0.025)
+
+    for label, hedge in (('slow tail', False), ('slow tail, hedged', True)):
+        latencies = []
+
+        @bench.case(f"extract_resume_info[{label}]", iterations=200)
+        def extract_hedged(hedge=hedge, latencies=latencies, router=index.HedgedRouter(
+                [index.ChatBackend('fake', lambda: tail_openai, index.OPENAI_MODEL)],
+                hedge=hedge, default_delay=0.05, min_delay=0.005)):
+            previous = index.llm_router
+            index.llm_router = router
+            started = time.perf_counter()
+            try:
+                index.extract_resume_info(long_text)
+            finally:
+                index.llm_router = previous
+            latencies.append((time.perf_counter() - started) * 1000)
+            ordered = sorted(latencies)
+            return {'p99_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 4),
+                    'hedges': router.hedges}
+
+    tail_openai = FakeOpenAI(latency=slow_tail)
+
+    # Re-uploading a resume whose Skills section changed: everything
+    # re-extracted and rewritten versus only the changed fields
+    def fields_completion(messages):
+        prompt = messages[-1]['content']
+        if prompt.startswith('Extract only the following fields'):
+            return json.dumps({f: v for f, v in SAMPLE_RESUME.items() if f'"{f}"' in prompt.split('Resume text:')[0]})
+        return json.dumps(SAMPLE_RESUME)
+
+    section_rng = random.Random(5)
+    before_text = sectioned_resume_text(random.Random(5))
+    after_text = sectioned_resume_text(random.Random(5), skills=section_rng.sample(SKILLS, 8))
+    before_pdf, after_pdf = make_pdf([before_text]), make_pdf([after_text])
+
+    for label, incremental in (('full', False), ('incremental', True)):
+        @bench.case(f"POST /api/upload [re-upload, {label}]", iterations=30)
+        def reupload(incremental=incremental):
+            fake = FakeOpenAI(content=fields_completion)
+            previous = index.get_openai_client(), index.INCREMENTAL_EXTRACTION
+            index.get_openai_client.set(fake)
+            index.INCREMENTAL_EXTRACTION = incremental
+            try:
+                for pdf in (before_pdf, after_pdf):
+                    index.extraction_cache.local.clear()
+                    db.data.pop('extraction_cache', None)
+                    fake.tokens, write_bytes = 0, db.write_bytes
+                    client.post('/api/upload', data={'file': (io.BytesIO(pdf), 'cv.pdf'),
+                                                      'username': 'bench-reupload', 'filename': 'cv.pdf'})
+            finally:
+                index.get_openai_client.set(previous[0])
+                index.INCREMENTAL_EXTRACTION = previous[1]
+            return {'tokens': fake.tokens, 'write_bytes': db.write_bytes - write_bytes}
+
+    @bench.case("GET /")
+    def home():
+        client.get('/')
+
+    @bench.case("GET /metrics", iterations=200)
+    def metrics():
+        client.get('/metrics')
+
+    db.collection('users').document('bench').set({'resumeInfo': SAMPLE_RESUME, 'filename': 'bench.pdf',
+                                                  'originalFilename': 'bench.pdf'})
+
+    @bench.case("GET /api/resume/<u> [cold]", iterations=200)
+    def resume_cold():
+        index.invalidate_resume('bench')
+        response = client.get('/api/resume/bench')
+        return {'bytes': len(response.data)}
+
+    @bench.case("GET /api/resume/<u> [warm]", iterations=200)
+    def resume_warm():
+        client.get('/api/resume/bench')
+
+    etag = client.get('/api/resume/bench').headers['ETag']
+
+    @bench.case("GET /api/resume/<u> [304]", iterations=200)
+    def resume_not_modified():
+        client.get('/api/resume/bench', headers={'If-None-Match': etag})
+
+    # Payload sizes for a long resume: full document vs. projected, compact
+    # and compressed responses ('bytes' is what goes over the wire)
+    long_resume = dict(SAMPLE_RESUME, **{
+        'LinkedIn': '', 'Education': [],
+        'Professional Experience': SAMPLE_RESUME['Professional Experience'] * 6,
+        'Projects': SAMPLE_RESUME['Projects'] * 8,
+        'Questions and Answers': SAMPLE_RESUME['Questions and Answers'] * 15,
+    })
+    db.collection('users').document('bench-long').set({'resumeInfo': long_resume, 'filename': 'long.pdf',
+                                                       'originalFilename': 'long.pdf'})
+    full_size = len(client.get('/api/resume/bench-long').data)
+    variants = [
+        ('full', '', {}),
+        ('fields=Name,Skills', '?fields=Name,Skills', {}),
+        ('compact', '?compact=1', {}),
+        ('gzip', '', {'Accept-Encoding': 'gzip'}),
+        ('br', '', {'Accept-Encoding': 'gzip, deflate, br'}),
+        ('fields+compact+gzip', '?fields=Name,Skills,Projects&compact=1', {'Accept-Encoding': 'gzip'}),
+    ]
+    for label, query, headers in variants:
+        @bench.case(f"GET /api/resume/<u> [{label}]", iterations=200)
+        def resume_variant(query=query, headers=headers):
+            index.invalidate_resume('bench-long')
+            response = client.get(f'/api/resume/bench-long{query}', headers=headers)
+            return {'bytes': len(response.data), 'full_bytes': full_size}
+
+    upload_corpus = resume_corpus(300, max_pages=3, seed=11)
+
+    @bench.case("POST /api/upload [miss]", iterations=30)
+    def upload_miss():
+        pdf = upload_corpus[next(counter) % len(upload_corpus)]
+        index.extraction_cache.local.clear()
+        db.data.pop('extraction_cache', None)
+        client.post('/api/upload', data={'file': (io.BytesIO(pdf), 'cv.pdf'),
+                                          'username': 'bench-upload', 'filename': 'cv.pdf'})
+
+    @bench.case("POST /api/upload [hit]", iterations=50)
+    def upload_hit():
+        client.post('/api/upload', data={'file': (io.BytesIO(pdfs[1]), 'cv.pdf'),
+                                          'username': 'bench-upload', 'filename': 'cv.pdf'})
+
+    # Memory for a 5MB upload (a resume page plus scanned-image sized
+    # padding). The request is built before tracing starts, so the peak is
+    # what the server side allocates.
+    large_pdf = make_pdf([resume_page_text(rng, 1)], padding=5 * 1024 * 1024)
+
+    def large_upload_environ(data):
+        from werkzeug.test import EnvironBuilder
+        return EnvironBuilder('/api/upload', method='POST', data={
+            'file': (io.BytesIO(data), 'cv.pdf'), 'username': 'bench-large', 'filename': 'cv.pdf'}).get_environ()
+
+    @bench.case("POST /api/upload [5MB, memory]", iterations=10)
+    def upload_large():
+        index.extraction_cache.local.clear()
+        db.data.pop('extraction_cache', None)
+        environ = large_upload_environ(large_pdf)
+        tracemalloc.start()
+        try:
+            status = client.open(environ).status_code
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {'status': status, 'peak_alloc_kb': peak // 1024,
+                'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+    not_pdf = b"\0" * len(large_pdf)
+
+    @bench.case("POST /api/upload [5MB, not a PDF]", iterations=20)
+    def upload_not_pdf():
+        return {'status': client.open(large_upload_environ(not_pdf)).status_code}
+
+    @bench.case("POST /api/upload/stream [miss]", iterations=30)
+    def upload_stream():
+        pdf = upload_corpus[next(counter) % len(upload_corpus)]
+        index.extraction_cache.local.clear()
+        db.data.pop('extraction_cache', None)
+        response = client.post('/api/upload/stream', data={'file': (io.BytesIO(pdf), 'cv.pdf'),
+                                                            'username': 'bench-stream', 'filename': 'cv.pdf'})
+        response.get_data()
+
+    @bench.case("POST /api/upload/batch [5 files]", iterations=10)
+    def upload_batch():
+        index.extraction_cache.local.clear()
+        db.data.pop('extraction_cache', None)
+        start = next(counter)
+        files = [(io.BytesIO(upload_corpus[(start + i) % len(upload_corpus)]), f'cv{i}.pdf') for i in range(5)]
+        response = client.post('/api/upload/batch', data={
+            'files': files, 'usernames': [f'batch{i}' for i in range(5)]})
+        response.get_data()
+
+    # Resume store backends against a Firestore with 20ms RPCs: what a
+    # write and a read cost the request, and how many commits reach
+    # Firestore when 20 users write 10 times each
+    from resume_store import FirestoreResumeStore, SQLiteResumeStore, WriteBehindResumeStore
+    store_dir = tempfile.mkdtemp(prefix='bench-store-')
+    for label in ('firestore', 'sqlite', 'write-behind'):
+        remote_db = FakeFirestore(latency=0.02)
+        remote = FirestoreResumeStore(lambda remote_db=remote_db: remote_db)
+        local = SQLiteResumeStore(os.path.join(store_dir, f'{label}.sqlite3'))
+        store = {'firestore': remote, 'sqlite': local,
+                 'write-behind': WriteBehindResumeStore(local, remote, interval=3600)}[label]
+        document = {'resumeInfo': SAMPLE_RESUME, 'filename': 'cv.pdf', 'originalFilename': 'cv.pdf'}
+
+        @bench.case(f"resume_store[{label}] set", iterations=50)
+        def store_set(store=store, document=document):
+            store.set(f"user{next(counter) % 20}", document)
+
+        @bench.case(f"resume_store[{label}] get", iterations=50)
+        def store_get(store=store):
+            store.get(f"user{next(counter) % 20}", [('resumeInfo',)])
+
+        @bench.case(f"resume_store[{label}] 200 writes", iterations=3, warmup=0)
+        def store_burst(store=store, remote_db=remote_db, document=document):
+            commits, writes = remote_db.commits, remote_db.writes
+            for i in range(200):
+                store.set(f"user{i % 20}", dict(document, filename=f'cv{i}.pdf'))
+            if isinstance(store, WriteBehindResumeStore):
+                store.drain()
+            return {'firestore_rpcs': remote_db.commits - commits + remote_db.writes - writes
+                    if not isinstance(store, WriteBehindResumeStore) else remote_db.commits - commits}
+
+    # Skill search over synthetic profiles. Indexes are built on first use
+    # (the 1M one takes a while); build, snapshot and reload times are
+    # reported with the queries
+    from skill_index import SkillIndex
+    skill_indexes = {}
+
+    def profile_index(size):
+        if size not in skill_indexes:
+            path = os.path.join(store_dir, f'skills-{size}.snapshot')
+            ix = SkillIndex(path)
+            started = time.perf_counter()
+            ix.build(skill_profiles(size))
+            build_s = time.perf_counter() - started
+            ix.save()
+            started = time.perf_counter()
+            SkillIndex(path).load()
+            load_s = time.perf_counter() - started
+            started = time.perf_counter()
+            ix.search(['python', 'go'])
+            skill_indexes[size] = (ix, {
+                'build_s': round(build_s, 2),
+                'load_s': round(load_s, 2),
+                'snapshot_kb': os.path.getsize(path) // 1024,
+                'first_query_ms': round((time.perf_counter() - started) * 1000, 2),
+                'terms': ix.terms(),
+            })
+        return skill_indexes[size]
+
+    queries = {
+        'all 2 skills': dict(skills=['python', 'kubernetes']),
+        'all 3 skills, rare': dict(skills=['python', 'docker', 'skill500']),
+        'any 3 skills': dict(skills=['rust', 'kafka', 'graphql'], mode='any'),
+        'any 3 skills, offset 1000': dict(skills=['rust', 'kafka', 'graphql'], mode='any', offset=1000),
+    }
+    for size, label in ((10 ** 4, '10k'), (10 ** 6, '1M')):
+        for query_label, query in queries.items():
+            @bench.case(f"skill_index[{label}] {query_label}", iterations=50)
+            def search(size=size, query=query):
+                ix, stats = profile_index(size)
+                total, _ = ix.search(**query)
+                return dict(stats, total=total)
+
+    @bench.case("GET /api/search [10k]", iterations=100)
+    def search_route():
+        index.skill_index = profile_index(10 ** 4)[0]
+        index.skill_index._loaded = True
+        client.get('/api/search?skills=python,kubernetes&limit=20')
+
+    @bench.case("POST /api/create-vercel-project", iterations=30)
+    def create_project():
+        client.post('/api/create-vercel-project', json={'username': f"bench{next(counter)}"})
+
+    client.post('/api/create-vercel-project', json={'username': 'bench-existing'})
+
+    @bench.case("POST /api/create-vercel-project [existing]", iterations=200)
+    def create_project_existing():
+        client.post('/api/create-vercel-project', json={'username': 'bench-existing'})
+
+
+def compare(results, baseline, tolerance):
+    """Return the benchmarks whose p50 is more than `tolerance` slower."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            continue
+        # Sub-100us differences are noise
+        allowed = base['p50_ms'] * (1 + tolerance) + 0.1
+        if result['p50_ms'] > allowed:
+            regressions.append((name, base['p50_ms'], result['p50_ms']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--only', action='append', help="run benchmarks whose name contains this")
+    parser.add_argument('--scale', type=float, default=1.0, help="multiply iteration counts")
+    parser.add_argument('--openai-latency', type=float, default=0.0)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=1.0,
+                        help="allowed p50 slowdown relative to the baseline (1.0 = twice as slow)")
+    args = parser.parse_args()
+
+    index, db, _, fake_vercel = setup_app(args.openai_latency)
+    bench = Bench()
+    register_benchmarks(bench, index, db)
+    try:
+        results = bench.run(args.only, args.scale)
+    finally:
+        fake_vercel.stop()
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'openai_latency': args.openai_latency,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline written to {args.baseline}")
+
+    if args.compare:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, base, now in regressions:
+            print(f"REGRESSION {name}: p50 {base:.3f} ms -> {now:.3f} ms")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
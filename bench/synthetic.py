@@ -0,0 +1,135 @@
+"""Synthetic resume PDFs for the benchmarks.
+
+PyPDF2 can read but not lay out text, so the documents are written by hand:
+one Helvetica content stream per page, which PyPDF2 extracts line by line.
+"""
+import random
+
+FIRST_NAMES = ["Ada", "Linus", "Grace", "Ken", "Barbara", "Guido", "Margaret", "Dennis"]
+LAST_NAMES = ["Lovelace", "Torvalds", "Hopper", "Thompson", "Liskov", "van Rossum", "Hamilton", "Ritchie"]
+SKILLS = ["Python", "Go", "Kubernetes", "React", "TypeScript", "PostgreSQL", "Docker",
+          "AWS", "Terraform", "Rust", "Flask", "Next.js", "Redis", "Kafka", "GraphQL"]
+ROLES = ["Software Engineer", "Backend Developer", "Data Engineer", "SRE", "Frontend Developer"]
+
+
+def _escape(line):
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def make_pdf(pages, padding=0):
+    """Build a PDF whose pages contain the given strings (one line per '\\n').
+    `padding` bytes go into an unreferenced stream, to make large files
+    (like scanned resumes) without more text."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for i, text in enumerate(pages):
+        page_id = 4 + 2 * i
+        kids.append(f"{page_id} 0 R")
+        stream = "BT /F1 10 Tf 50 750 Td 12 TL " + " ".join(
+            f"({_escape(line)}) '" for line in text.split('\n')) + " ET"
+        stream = stream.encode('latin-1', 'replace')
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode())
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    if padding:
+        # Binary-looking filler with a newline every 256 bytes, like image data
+        filler = (bytes(range(256)) * (padding // 256 + 1))[:padding]
+        objects.append(b"<< /Length %d >>\nstream\n" % padding + filler + b"\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def resume_page_text(rng, page_number, lines=45):
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    body = [f"{name} - Curriculum Vitae - page {page_number}"]
+    for _ in range(lines):
+        kind = rng.random()
+        if kind < 0.3:
+            body.append(f"{rng.choice(ROLES)}, {rng.randint(2010, 2024)} - present")
+        elif kind < 0.6:
+            body.append("Skills: " + ", ".join(rng.sample(SKILLS, 4)))
+        else:
+            body.append("Built and operated services handling "
+                        f"{rng.randint(1, 900)}k requests per day using {rng.choice(SKILLS)}.")
+    return "\n".join(body)
+
+
+def sectioned_resume_text(rng, skills=None):
+    """A one-page resume under the usual headings; `skills` overrides the
+    Skills section so two versions can differ in just that section."""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    lines = [name, f"{name.split()[0].lower()}@example.com", "Summary",
+             "Engineer who likes boring, reliable systems.", "Experience"]
+    for _ in range(4):
+        lines.append(f"{rng.choice(ROLES)}, {rng.randint(2010, 2024)} - present")
+        lines.append("Built and operated services handling "
+                     f"{rng.randint(1, 900)}k requests per day using {rng.choice(SKILLS)}.")
+    lines.append("Projects")
+    for _ in range(3):
+        lines.append(f"{rng.choice(SKILLS)} toolkit: internal tooling used by {rng.randint(2, 40)} teams.")
+    lines += ["Education", "BSc Computer Science", "Skills",
+              ", ".join(skills if skills is not None else rng.sample(SKILLS, 6))]
+    return "\n".join(lines)
+
+
+def make_resume_pdf(page_count, seed=0):
+    rng = random.Random(seed)
+    return make_pdf([resume_page_text(rng, i + 1) for i in range(page_count)])
+
+
+def resume_corpus(count, min_pages=1, max_pages=4, seed=0):
+    """`count` distinct resume PDFs with page counts in [min_pages, max_pages]."""
+    rng = random.Random(seed)
+    return [make_resume_pdf(rng.randint(min_pages, max_pages), seed=seed * 100003 + i)
+            for i in range(count)]
+
+
+def skill_profiles(count, vocabulary=2000, seed=0):
+    """Yield `count` (username, resumeInfo) pairs whose skills follow a
+    Zipf-like distribution: SKILLS are common, the rest of the
+    `vocabulary` ever rarer."""
+    rng = random.Random(seed)
+    terms = SKILLS + [f"Skill{i}" for i in range(vocabulary - len(SKILLS))]
+    cum_weights = []
+    total = 0.0
+    for rank in range(len(terms)):
+        total += 1.0 / (rank + 1)
+        cum_weights.append(total)
+    for i in range(count):
+        skills = list(set(rng.choices(terms, cum_weights=cum_weights, k=rng.randint(3, 10))))
+        technologies = rng.choices(terms, cum_weights=cum_weights, k=rng.randint(1, 4))
+        yield f"user{i}", {
+            'Skills': skills,
+            'Projects': [{'Name': 'Project', 'Technologies': technologies}],
+            'Professional Experience': [{'Role': rng.choice(ROLES)}],
+        }
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Write a synthetic resume PDF corpus")
+    parser.add_argument('--out', required=True)
+    parser.add_argument('--count', type=int, default=50)
+    parser.add_argument('--max-pages', type=int, default=4)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for i, pdf in enumerate(resume_corpus(args.count, max_pages=args.max_pages)):
+        with open(os.path.join(args.out, f"resume_{i:04d}.pdf"), 'wb') as f:
+            f.write(pdf)
+    print(f"wrote {args.count} PDFs to {args.out}")